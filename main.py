@@ -1,15 +1,42 @@
 #!/usr/bin/env python3
+import argparse
 import sys
+import time
 from pathlib import Path
 
+_STARTED = time.perf_counter()
+
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
-from src.app import create_app
+from src.single_instance import forward_to_running_instance
+from src.startup_profile import startup_profile
+
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description="Markdown Editor")
+    parser.add_argument("files", nargs="*", help="markdown files to open")
+    parser.add_argument("--new-instance", action="store_true",
+                        help="start a separate editor instead of using the running one")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print startup phase and import times to stderr")
+    # Qt's own options (-style, -platform, ...) are left for QApplication
+    args, _qt_args = parser.parse_known_args(argv)
+    return args
 
 
 def main():
-    app = create_app()
+    args = parse_arguments(sys.argv[1:])
+    if args.profile_startup:
+        startup_profile.enable(_STARTED)
+    startup_profile.mark("arguments parsed")
+    files = [str(Path(f).resolve()) for f in args.files]
+    # Before anything heavy is loaded: a running editor opens them instead
+    if not args.new_instance and forward_to_running_instance(files):
+        sys.exit(0)
+
+    from src.app import create_app
+    app = create_app(files, single_instance=not args.new_instance)
     sys.exit(app.run())
 
 
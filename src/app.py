@@ -1,17 +1,31 @@
 import sys
 from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QCoreApplication
 from PySide6.QtGui import QPalette, QColor
 
 from src.main_window import MainWindow
+from src.single_instance import InstanceServer
+from src.startup_profile import startup_profile
 from src.utils.theme_detector import ThemeDetector
 
 
 class MarkdownEditorApp:
-    def __init__(self):
+    def __init__(self, files=(), single_instance=True):
+        # QtWebEngine is loaded after the window is up; importing it that late
+        # needs shared OpenGL contexts from the start
+        QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
         self.app = QApplication(sys.argv)
+        startup_profile.mark("QApplication created")
         self._configure_app()
         self.window = MainWindow(self)
+        startup_profile.mark("main window built")
+        self.files = list(files)
+        self.instance_server = None
+        if single_instance:
+            # Later launches hand their files over instead of starting another editor
+            self.instance_server = InstanceServer(parent=self.app)
+            self.instance_server.files_received.connect(self.window.open_files)
+            self.instance_server.listen()
 
     def _configure_app(self):
         self.app.setApplicationName("Markdown Editor")
@@ -54,9 +68,15 @@ class MarkdownEditorApp:
         self.app.setPalette(self.app.style().standardPalette())
 
     def run(self) -> int:
+        if self.files:
+            self.window.open_files(self.files)
         self.window.show()
-        return self.app.exec()
+        try:
+            return self.app.exec()
+        finally:
+            if self.instance_server is not None:
+                self.instance_server.close()
 
 
-def create_app() -> MarkdownEditorApp:
-    return MarkdownEditorApp()
+def create_app(files=(), single_instance=True) -> MarkdownEditorApp:
+    return MarkdownEditorApp(files, single_instance)
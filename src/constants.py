@@ -1,8 +1,51 @@
 """Shared constants for the MarkdownEditor application."""
+import re
 
 MAX_RECENT_FILES = 10
-AUTOSAVE_INTERVAL = 30000  # 30 seconds
+AUTOSAVE_INTERVAL = 30000  # 30 seconds; only with the "autosave_to_file" setting
+SAVE_SHUTDOWN_TIMEOUT = 5.0  # seconds to wait for queued background saves on exit
+JOURNAL_FLUSH_INTERVAL = 1000     # milliseconds between recovery journal appends
+JOURNAL_CHECKPOINT_EDITS = 2000   # journaled edits per checkpoint (per MB of document)
+JOURNAL_CHECKPOINT_UNIT = 1024 * 1024  # characters; larger documents checkpoint less often
 DEBOUNCE_INTERVAL = 300    # milliseconds
+WATCH_SETTLE_DELAY = 200   # milliseconds external writes must settle before they are checked
 
 IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+# Inline base64 image; group 1 is its MIME type
+DATA_URI_PATTERN = re.compile(r"data:(image/[\w.+-]+);base64,[A-Za-z0-9+/=]+")
 MARKDOWN_EXTENSIONS = ('.md', '.markdown')
+IMAGE_DOWNLOAD_TIMEOUT = 15000            # milliseconds without data before a download fails
+IMAGE_DOWNLOAD_MAX_SIZE = 50 * 1024 * 1024  # bytes; larger downloads are aborted
+
+LARGE_FILE_THRESHOLD = 10 * 1024 * 1024  # bytes; "large_file_threshold" setting overrides
+LOAD_CHUNK_SIZE = 512 * 1024             # bytes decoded and inserted per event-loop tick
+ENCODING_SAMPLE_SIZE = 64 * 1024         # bytes sniffed to detect a file's encoding
+LARGE_PASTE_THRESHOLD = 512 * 1024       # characters; larger pastes are streamed in
+PASTE_CHUNK_SIZE = 64 * 1024             # characters pasted per event-loop tick
+HIGHLIGHT_SLICE = 2000                   # blocks rehighlighted per event-loop tick
+
+SEARCH_SLICE = 1024 * 1024       # characters scanned per event-loop tick when counting
+MATCH_POSITIONS_LIMIT = 100000   # more matches than this are counted but not indexed
+SEARCH_TICK_BUDGET = 0.015       # seconds of pattern matching per event-loop tick
+SEARCH_TIMEOUT = 5.0             # seconds of matching before a search gives up
+HIGHLIGHT_MARGIN_LINES = 50      # lines above/below the viewport that get match highlights
+OUTLINE_FILTER_LIMIT = 200       # ranked results shown by the outline filter
+
+LONG_LINE_THRESHOLD = 10000  # characters; longer lines skip inline highlighting
+LONG_LINE_VISIBLE = 200      # characters left visible when a long line is folded
+DATA_URI_FOLD_MIN = 1024     # characters; shorter inline data URIs stay visible
+
+UNDO_MEMORY_BUDGET = 64 * 1024 * 1024  # bytes of estimated undo history per document
+# Bytes of estimated memory background tabs may hold; past it the least
+# recently viewed are swapped out to compressed files until shown again
+SUSPEND_MEMORY_BUDGET = 256 * 1024 * 1024
+
+HISTORY_MAX_AGE = 30 * 24 * 60 * 60        # seconds local history keeps snapshots
+HISTORY_MAX_SIZE = 200 * 1024 * 1024       # bytes of stored chunks; oldest snapshots go first
+HISTORY_PRUNE_EVERY = 50                   # snapshots between retention passes
+HISTORY_MAX_DOCUMENT = 8 * 1024 * 1024     # characters; larger documents get no history
+HISTORY_CHUNK_MIN = 2 * 1024               # bytes; content-defined chunks of history snapshots
+HISTORY_CHUNK_MAX = 64 * 1024
+HISTORY_CHUNK_BITS = 13                    # about 8 KB past the minimum on average
+
+SINGLE_INSTANCE_TIMEOUT = 1000  # milliseconds a launch waits for the running editor to answer
@@ -0,0 +1,158 @@
+"""Document — one open document (tab) of the main window.
+
+A document owns its EditorWidget (and with it the QTextDocument, the
+highlighter state and the undo history), its FileManager state and its
+recovery journal. The window shares one preview, one outline, the file
+writer and the recent file list between all of them.
+
+A document in a background tab can be suspended to bound memory: its
+text goes to a zlib-compressed swap file and the editor is emptied, which
+releases the text and its layout, the highlighter's block state, the undo
+history and folded payloads. resume() puts the text back when the tab is
+shown again. The journal is paused in between; it already holds every
+edit made before the suspension, so crash recovery is unaffected.
+
+A document restored from the last session starts out deferred: it only
+knows its file and view state, and the file is read when the tab is
+first shown.
+"""
+import os
+import uuid
+import zlib
+from pathlib import Path
+from typing import Optional
+
+from PySide6.QtCore import QObject
+
+from src.editor import EditorWidget
+from src.file_manager import FileManager
+from src.recovery_journal import DocumentJournal
+
+SWAP_SUFFIX = ".swap"
+_SWAP_LEVEL = 1        # zlib level: fast, and markdown still shrinks about 3x
+_BLOCK_OVERHEAD = 200  # rough bytes per QTextBlock (block data, layout, highlighting)
+
+
+class Document(QObject):
+    def __init__(self, settings, writer, recent_files, recovery_dir, parent=None):
+        super().__init__(parent)
+        self.editor = EditorWidget()
+        self.file_manager = FileManager(settings, writer, recent_files)
+        self.journal = DocumentJournal(
+            self.editor.editor.document(), self.editor.folds, recovery_dir, self
+        )
+        self.last_viewed = 0  # activation counter: the least recently viewed are suspended first
+        self.layout_mode = "split"  # editor / preview / split, shown with this document
+        self._swap_path: Optional[Path] = None
+        self._deferred_file: Optional[Path] = None
+        self._view_state = (0, 0)  # cursor position and scroll value while suspended or deferred
+
+    @property
+    def is_suspended(self) -> bool:
+        return self._swap_path is not None
+
+    @property
+    def is_deferred(self) -> bool:
+        return self._deferred_file is not None
+
+    @property
+    def file_path(self) -> Optional[Path]:
+        """The document's file, also while it is deferred and not read yet."""
+        return self._deferred_file or self.file_manager.current_file
+
+    @property
+    def title(self) -> str:
+        """Tab label: the file name (or Untitled), starred while unsaved."""
+        path = self.file_path
+        name = path.name if path else "Untitled"
+        return f"* {name}" if self.file_manager.is_dirty else name
+
+    @property
+    def is_pristine(self) -> bool:
+        """An untouched new document, which opening a file may simply replace."""
+        fm = self.file_manager
+        return (self.file_path is None and not fm.is_dirty and not self.is_suspended
+                and self.editor.get_character_count() == 0)
+
+    def view_state(self):
+        """(cursor position, scroll value), also while suspended or deferred."""
+        if self.is_suspended or self.is_deferred:
+            return self._view_state
+        return self.editor.view_state()
+
+    def defer(self, path, view_state=(0, 0)):
+        """Stand for path without reading it until take_deferred()."""
+        self._deferred_file = Path(path)
+        self._view_state = tuple(view_state)
+
+    def take_deferred(self) -> Path:
+        """The file to read now; restore_view() applies the saved view state after."""
+        path, self._deferred_file = self._deferred_file, None
+        return path
+
+    def restore_view(self):
+        """Apply the view state kept while suspended or deferred, once."""
+        self.editor.restore_view_state(*self._view_state)
+        self._view_state = (0, 0)
+
+    def memory_estimate(self) -> int:
+        """Rough bytes the editor holds: text, per-block overhead, undo history, folds."""
+        if self.is_suspended:
+            return 0
+        document = self.editor.editor.document()
+        return (document.characterCount() * 2 + document.blockCount() * _BLOCK_OVERHEAD
+                + self.editor.undo_monitor.estimated_bytes
+                + self.editor.folds.payload_length * 2)
+
+    def get_text(self) -> str:
+        """The full text, read back from the swap file if suspended. Raises OSError."""
+        if self.is_suspended:
+            return self._read_swap()
+        return self.editor.get_text()
+
+    def suspend(self, swap_dir):
+        """Move the text to a swap file in swap_dir and empty the editor. Raises OSError."""
+        if self.is_suspended:
+            return
+        swap_dir = Path(swap_dir)
+        swap_dir.mkdir(parents=True, exist_ok=True)
+        path = swap_dir / f"{uuid.uuid4().hex}{SWAP_SUFFIX}"
+        data = zlib.compress(self.editor.get_text().encode("utf-8"), _SWAP_LEVEL)
+        with open(path, "wb") as f:
+            f.write(data)
+        self._view_state = self.editor.view_state()
+        self.journal.flush()
+        self.journal.pause()
+        self._swap_path = path
+        # setPlainText() also drops the undo history and the folds
+        self.editor.set_text("")
+
+    def resume(self, text: Optional[str] = None):
+        """Put the swapped-out text back, or text rebuilt elsewhere if given.
+
+        Raises OSError if the swap file cannot be read (it stays then).
+        """
+        if not self.is_suspended:
+            return
+        if text is None:
+            text = self._read_swap()
+        self.journal.pause()
+        self.editor.set_text(text)
+        self.discard_swap()
+        self.restore_view()
+
+    def discard_swap(self):
+        if self._swap_path is not None:
+            try:
+                os.unlink(self._swap_path)
+            except OSError:
+                pass
+            self._swap_path = None
+
+    def _read_swap(self) -> str:
+        with open(self._swap_path, "rb") as f:
+            data = f.read()
+        try:
+            return zlib.decompress(data).decode("utf-8")
+        except (zlib.error, UnicodeDecodeError) as e:
+            raise OSError(f"The swap file is damaged: {e}") from e
@@ -0,0 +1,92 @@
+"""ChunkedTextInserter — streams text into a QTextDocument from the event loop.
+
+One chunk is inserted per timer tick, so the window keeps painting, a progress
+indicator can update, and the operation can be cancelled between chunks.
+"""
+from typing import Iterator
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtGui import QTextCursor
+
+
+def split_chunks(text: str, size: int) -> Iterator[str]:
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+class ChunkedTextInserter(QObject):
+    progress = Signal(int, int)  # processed, total
+    finished = Signal(bool)      # True when every chunk was inserted
+
+    def __init__(self, editor, chunks, total: int, parent=None,
+                 cursor: QTextCursor = None, single_undo_step: bool = False):
+        """Insert at cursor (replacing its selection), or at the document end.
+
+        With single_undo_step every chunk joins the first chunk's edit block,
+        so undo removes the whole insertion at once.
+        """
+        super().__init__(parent)
+        self.editor = editor
+        self.total = max(total, 1)
+        self.processed = 0
+        self.error = None
+        self._chunks = iter(chunks)
+        if cursor is not None:
+            self._cursor = QTextCursor(cursor)
+        else:
+            self._cursor = QTextCursor(editor.document())
+            self._cursor.movePosition(QTextCursor.End)
+        self._single_undo_step = single_undo_step
+        self._running = False
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._insert_next)
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    @property
+    def position(self) -> int:
+        """Document position right after the text inserted so far."""
+        return self._cursor.position()
+
+    def start(self):
+        self._running = True
+        self._timer.start()
+
+    def cancel(self):
+        if self._running:
+            self._finish(False)
+
+    def _insert_next(self):
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._finish(True)
+            return
+        except (OSError, UnicodeDecodeError) as e:
+            self.error = e
+            self._finish(False)
+            return
+
+        if not self._single_undo_step:
+            self._cursor.insertText(chunk)
+        else:
+            if self.processed == 0:
+                self._cursor.beginEditBlock()
+            else:
+                self._cursor.joinPreviousEditBlock()
+            self._cursor.insertText(chunk)
+            self._cursor.endEditBlock()
+        self.processed += len(chunk)
+        self.progress.emit(min(self.processed, self.total), self.total)
+
+    def _finish(self, completed: bool):
+        self._timer.stop()
+        self._running = False
+        close = getattr(self._chunks, "close", None)
+        if close:
+            close()
+        self.finished.emit(completed)
@@ -0,0 +1,119 @@
+"""DocumentChangeBus — incremental change propagation for the editor document.
+
+QTextDocument.contentsChange reports every edit as (position, removed, added).
+The bus stamps each edit with a monotonically increasing revision and batches
+them until the next flush, so consumers can update incrementally and only pay
+for a full-text copy when they actually read the snapshot.
+"""
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from PySide6.QtCore import QObject, Signal
+
+
+@dataclass(frozen=True)
+class ContentChange:
+    position: int
+    removed: int
+    added: int
+    revision: int
+
+
+class StaleSnapshotError(RuntimeError):
+    """Raised when an unmaterialized snapshot is read after the document moved on."""
+
+
+class DocumentSnapshot:
+    """Immutable view of the document text at one revision.
+
+    The text is materialized on first access and shared by every later reader.
+    """
+
+    def __init__(self, revision: int, loader: Callable[[], str],
+                 is_current: Callable[[int], bool]):
+        self._revision = revision
+        self._loader = loader
+        self._is_current = is_current
+        self._text: Optional[str] = None
+
+    @property
+    def revision(self) -> int:
+        return self._revision
+
+    @property
+    def is_materialized(self) -> bool:
+        return self._text is not None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            if not self._is_current(self._revision):
+                raise StaleSnapshotError(
+                    f"Snapshot for revision {self._revision} was never materialized"
+                )
+            self._text = self._loader()
+            self._loader = None
+        return self._text
+
+
+@dataclass(frozen=True)
+class DocumentChangeSet:
+    revision: int
+    changes: Tuple[ContentChange, ...]
+    snapshot: DocumentSnapshot
+
+
+class DocumentChangeBus(QObject):
+    content_changed = Signal(object)   # ContentChange, emitted for every edit
+    changes_flushed = Signal(object)   # DocumentChangeSet, emitted by flush()
+
+    def __init__(self, document, text_provider: Callable[[], str] = None, parent=None):
+        super().__init__(parent)
+        self._document = document
+        self._text_provider = text_provider or document.toPlainText
+        self._revision = 0
+        self._pending = []
+        self._snapshot: Optional[DocumentSnapshot] = None
+        document.contentsChange.connect(self._on_contents_change)
+
+    @property
+    def revision(self) -> int:
+        return self._revision
+
+    @property
+    def has_pending_changes(self) -> bool:
+        return bool(self._pending)
+
+    def set_text_provider(self, provider: Callable[[], str]):
+        self._text_provider = provider
+        self._snapshot = None
+
+    def snapshot(self) -> DocumentSnapshot:
+        """Return the (shared) snapshot for the current revision."""
+        if self._snapshot is None or self._snapshot.revision != self._revision:
+            self._snapshot = DocumentSnapshot(
+                self._revision, self._text_provider, self._is_current
+            )
+        return self._snapshot
+
+    def flush(self) -> DocumentChangeSet:
+        """Emit and return every change recorded since the previous flush."""
+        change_set = DocumentChangeSet(
+            revision=self._revision,
+            changes=tuple(self._pending),
+            snapshot=self.snapshot(),
+        )
+        self._pending = []
+        self.changes_flushed.emit(change_set)
+        return change_set
+
+    def _is_current(self, revision: int) -> bool:
+        return revision == self._revision
+
+    def _on_contents_change(self, position: int, removed: int, added: int):
+        if removed == 0 and added == 0:
+            return
+        self._revision += 1
+        change = ContentChange(position, removed, added, self._revision)
+        self._pending.append(change)
+        self.content_changed.emit(change)
@@ -1,13 +1,18 @@
 import re
+import base64
+import binascii
+import hashlib
 import shutil
+import tempfile
+import uuid
 from typing import Tuple
 from pathlib import Path
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QPlainTextEdit, QFileDialog, QMessageBox, QInputDialog
 )
-from PySide6.QtCore import Signal, QTimer, QEvent, QUrl, QMimeData
+from PySide6.QtCore import Signal, QTimer, QEvent, QUrl, QMimeData, SIGNAL
 from PySide6.QtGui import (
-    QTextCursor, QKeyEvent, QFont, QColor, QTextCharFormat,
+    QTextCursor, QTextDocument, QKeyEvent, QFont, QColor, QTextCharFormat,
     QKeySequence, QShortcut, QDragEnterEvent, QDropEvent
 )
 from PySide6.QtWidgets import QTextEdit
@@ -16,28 +21,68 @@ from PySide6.QtCore import Qt
 from src.editor.toolbar import EditorToolbar
 from src.editor.find_replace import FindReplaceWidget
 from src.editor.syntax_highlighter import MarkdownHighlighter
+from src.editor.document_bus import DocumentChangeBus
+from src.editor.chunked_insert import ChunkedTextInserter, split_chunks
+from src.editor import line_ops
+from src.editor.folding import FoldRegistry, FOLD_OPEN, FOLD_PATTERN, DATA_URI_PATTERN
+from src.editor.text_diff import utf16_len, replace_changed_lines
+from src.editor.undo_budget import UndoMemoryMonitor
 from src.utils.image_handler import ImageHandler
-from src.constants import DEBOUNCE_INTERVAL, IMAGE_EXTENSIONS, MARKDOWN_EXTENSIONS
+from src.utils.image_downloader import ImageDownloader
+from src.utils.text_merge import split_lines
+from src.constants import (
+    DEBOUNCE_INTERVAL, IMAGE_EXTENSIONS, MARKDOWN_EXTENSIONS,
+    LONG_LINE_THRESHOLD, LONG_LINE_VISIBLE, DATA_URI_FOLD_MIN,
+    LARGE_PASTE_THRESHOLD, PASTE_CHUNK_SIZE, HIGHLIGHT_MARGIN_LINES
+)
+
+
+def _format_size(size: int) -> str:
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
 
 
 class EditorWidget(QWidget):
     text_changed = Signal(str)
+    document_changed = Signal(object)  # DocumentChangeSet, debounced
     image_download_status = Signal(str)  # status message for statusbar
+    undo_history_trimmed = Signal(int)  # estimated bytes released
+    replaced_all = Signal(int, float)  # Replace All: replacements made, seconds taken
+    large_paste_started = Signal(object)  # ChunkedTextInserter, before the first chunk
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.image_handler = ImageHandler()
+        # Pasted image URLs download in the background; each has a placeholder
+        self.image_downloader = ImageDownloader(self)
+        self.image_downloader.finished.connect(self._on_image_downloaded)
+        self._downloads = {}  # download id -> (placeholder text, url)
         self._debounce_timer = QTimer()
         self._debounce_timer.setSingleShot(True)
         self._debounce_timer.setInterval(DEBOUNCE_INTERVAL)
         self._debounce_timer.timeout.connect(self._emit_text_changed)
         self._zoom_level = 0  # relative to base size 12
+        self._large_file_mode = False
+        self._paste_in_progress = False
+
+        # Long-line safeguard: fold pathological lines, optionally stop wrapping
+        self.folds = FoldRegistry()
+        self.fold_long_lines = True
+        self.fold_data_uris = True
+        self.long_line_nowrap = True
+        self._long_line_guard_suspended = False
+        self._preview_images = {}  # data-URI hash -> decoded temp file
+        self._preview_image_dir = None
+        self._last_cursor_position = 0  # which side of a fold the caret came from
 
         self._setup_ui()
         self._connect_signals()
 
         # Install event filter on editor to catch Ctrl+V and Enter
         self.editor.installEventFilter(self)
+        # ...and on its viewport for double-click expansion of folds
+        self.editor.viewport().installEventFilter(self)
 
     def _setup_ui(self):
         layout = QVBoxLayout(self)
@@ -66,11 +111,31 @@ class EditorWidget(QWidget):
 
         # Find/Replace widget (below editor)
         self.find_replace = FindReplaceWidget(self.editor, self)
+        self.find_replace.replaced_all.connect(self.replaced_all)
         layout.addWidget(self.find_replace)
 
         # Syntax highlighter
         self.highlighter = MarkdownHighlighter(self.editor.document())
 
+        # Change bus: revisioned edit ranges + shared lazy snapshot
+        self.bus = DocumentChangeBus(
+            self.editor.document(), text_provider=self._expanded_text, parent=self
+        )
+        self.bus.content_changed.connect(self._on_content_change)
+
+        # Undo memory budget
+        self.undo_monitor = UndoMemoryMonitor(self.editor.document(), parent=self)
+        self.undo_monitor.history_trimmed.connect(self.undo_history_trimmed)
+
+        # Find matches near the viewport, merged with the current line highlight
+        self._match_selections = []
+        self._match_color = QColor("#fff3a3")
+        self.find_replace.highlights_changed.connect(self._update_match_highlights)
+        self.editor.verticalScrollBar().valueChanged.connect(self._update_match_highlights)
+
+        # Fold placeholders are atomic: the caret never stops inside one
+        self.editor.cursorPositionChanged.connect(self._keep_cursor_out_of_folds)
+
         # Current line highlight
         self.editor.cursorPositionChanged.connect(self._highlight_current_line)
         self._highlight_current_line()
@@ -112,10 +177,16 @@ class EditorWidget(QWidget):
             self.find_replace.show_replace()
 
     def _on_text_changed(self):
+        if self._paste_in_progress:
+            return  # one notification once the streamed paste is done
         self._debounce_timer.start()
 
     def _emit_text_changed(self):
-        self.text_changed.emit(self.editor.toPlainText())
+        change_set = self.bus.flush()
+        self.document_changed.emit(change_set)
+        # Legacy full-text broadcast; only materialize when someone listens
+        if self.receivers(SIGNAL("text_changed(QString)")) > 0:
+            self.text_changed.emit(change_set.snapshot.text)
 
     def _highlight_current_line(self):
         selections = []
@@ -129,15 +200,62 @@ class EditorWidget(QWidget):
             selection.cursor = self.editor.textCursor()
             selection.cursor.clearSelection()
             selections.append(selection)
-        self.editor.setExtraSelections(selections)
+        self.editor.setExtraSelections(selections + self._match_selections)
 
     def set_current_line_color(self, color: QColor):
         self._current_line_color = color
         self._highlight_current_line()
 
+    def set_match_highlight_color(self, color: QColor):
+        self._match_color = color
+        self._update_match_highlights()
+
+    def _visible_range(self) -> Tuple[int, int]:
+        """Document positions from the first to the last visible line, plus a margin."""
+        document = self.editor.document()
+        first = self.editor.firstVisibleBlock()
+        bottom = self.editor.cursorForPosition(self.editor.viewport().rect().bottomLeft()).block()
+        first = document.findBlockByNumber(max(0, first.blockNumber() - HIGHLIGHT_MARGIN_LINES))
+        last = document.findBlockByNumber(bottom.blockNumber() + HIGHLIGHT_MARGIN_LINES)
+        if not last.isValid():
+            last = document.lastBlock()
+        return first.position(), last.position() + last.length()
+
+    def _update_match_highlights(self):
+        """Rebuild the find-match selections for the lines around the viewport only."""
+        selections = []
+        spans = self.find_replace.match_spans(*self._visible_range())
+        if spans:
+            document = self.editor.document()
+            match_format = QTextCharFormat()
+            match_format.setBackground(self._match_color)
+            for start, end in spans:
+                selection = QTextEdit.ExtraSelection()
+                selection.format = match_format
+                selection.cursor = QTextCursor(document)
+                selection.cursor.setPosition(start)
+                selection.cursor.setPosition(end, QTextCursor.KeepAnchor)
+                selections.append(selection)
+        if selections or self._match_selections:
+            self._match_selections = selections
+            self._highlight_current_line()
+
     def eventFilter(self, obj, event: QEvent) -> bool:
         """Intercept key events from the editor widget"""
+        if obj == self.editor.viewport() and event.type() == QEvent.Resize:
+            # More (or fewer) lines are visible now
+            self._update_match_highlights()
+        if obj == self.editor.viewport() and event.type() == QEvent.MouseButtonDblClick:
+            cursor = self.editor.cursorForPosition(event.position().toPoint())
+            if self._fold_at(cursor) is not None:
+                self.editor.setTextCursor(cursor)
+                return self.expand_fold_at_cursor()
         if obj == self.editor and event.type() == QEvent.KeyPress:
+            # Copy/cut must carry folded content, not its placeholder
+            if event.matches(QKeySequence.Copy) and self._copy_expanded(cut=False):
+                return True
+            if event.matches(QKeySequence.Cut) and self._copy_expanded(cut=True):
+                return True
             # Ctrl+V paste handling
             if event.key() == Qt.Key_V and event.modifiers() == Qt.ControlModifier:
                 if self._handle_paste():
@@ -146,6 +264,9 @@ class EditorWidget(QWidget):
             if event.key() in (Qt.Key_Return, Qt.Key_Enter) and event.modifiers() == Qt.NoModifier:
                 if self._handle_enter():
                     return True
+            # Deleting into a fold placeholder deletes all of it
+            if event.key() in (Qt.Key_Backspace, Qt.Key_Delete):
+                self._select_whole_folds(event)
         # Drag and drop on editor
         if obj == self.editor:
             if event.type() == QEvent.DragEnter:
@@ -263,31 +384,382 @@ class EditorWidget(QWidget):
         if mime_data.hasText():
             text = mime_data.text().strip()
             if self.image_handler.is_image_url(text):
-                self.image_download_status.emit("Downloading image...")
-                self._insert_text("![Downloading image...]")
-                cursor = self.editor.textCursor()
-                start_pos = cursor.position() - len("![Downloading image...]")
+                self.download_image(text)
+                return True
 
-                image_path = self.image_handler.save_image_from_url(text)
+        # 3. Large plain text is streamed in instead of inserted in one go
+        if mime_data.hasText() and len(mime_data.text()) >= LARGE_PASTE_THRESHOLD:
+            if not self._paste_in_progress:
+                self.paste_large_text(mime_data.text())
+            return True
 
-                cursor.setPosition(start_pos)
-                cursor.setPosition(cursor.position() + len("![Downloading image...]"),
-                                   QTextCursor.KeepAnchor)
-                cursor.removeSelectedText()
-                self.editor.setTextCursor(cursor)
+        return False
 
-                if image_path:
-                    md_syntax = self.image_handler.get_markdown_image_syntax(image_path)
-                    self._insert_text(md_syntax)
-                    self.image_download_status.emit("Image inserted")
-                    return True
-                else:
-                    md_syntax = f"![image]({text})"
-                    self._insert_text(md_syntax)
-                    self.image_download_status.emit("Image download failed, URL inserted")
-                    return True
+    def download_image(self, url: str):
+        """Insert a placeholder at the caret and replace it once url is downloaded.
+
+        The placeholder carries a token of its own, so it is found again
+        wherever later edits have moved it; if it was deleted meanwhile,
+        the image is dropped.
+        """
+        download_id = self.image_downloader.download(url)
+        placeholder = f"![Downloading image {uuid.uuid4().hex[:8]}...]"
+        self._downloads[download_id] = (placeholder, url)
+        self._insert_text(placeholder)
+        self.image_download_status.emit("Downloading image...")
+
+    @property
+    def has_pending_downloads(self) -> bool:
+        return bool(self._downloads)
+
+    def _on_image_downloaded(self, download_id, data, error):
+        placeholder, url = self._downloads.pop(download_id)
+        cursor = self.editor.document().find(placeholder, 0, QTextDocument.FindCaseSensitively)
+        if cursor.isNull():
+            return  # deleted, or the document was replaced
+        image_path = None
+        if data is not None:
+            try:
+                image_path = self.image_handler.save_image_bytes(data)
+            except OSError as e:
+                error = f"could not save it: {e}"
+            else:
+                if image_path is None:
+                    error = "not an image"
+        # Its own edit, which leaves the caret where the user is typing
+        if image_path:
+            cursor.insertText(self.image_handler.get_markdown_image_syntax(image_path))
+            self.image_download_status.emit("Image inserted")
+        else:
+            cursor.insertText(f"![image]({url})")
+            self.image_download_status.emit(f"Image download failed ({error}), URL inserted")
+
+    def paste_large_text(self, text: str) -> ChunkedTextInserter:
+        """Insert text at the caret in chunks, as one undo step.
+
+        Line endings and tabs are normalized up front. Highlighting, folding
+        and the debounced change notification are held back until the last
+        chunk is in; the editor is read-only meanwhile. Cancelling reverts
+        the partial paste.
+        """
+        text = line_ops.normalize_pasted_text(text)
+        cursor = self.editor.textCursor()
+        start = cursor.selectionStart()
 
-        return False
+        self._paste_in_progress = True
+        self._long_line_guard_suspended = True
+        self.highlighter.suspend()
+        self.editor.setReadOnly(True)
+
+        paster = ChunkedTextInserter(
+            self.editor, split_chunks(text, PASTE_CHUNK_SIZE), len(text), self,
+            cursor=cursor, single_undo_step=True,
+        )
+        paster.finished.connect(
+            lambda completed: self._on_large_paste_finished(paster, start, completed)
+        )
+        self.large_paste_started.emit(paster)
+        paster.start()
+        return paster
+
+    def _on_large_paste_finished(self, paster: ChunkedTextInserter, start: int,
+                                 completed: bool):
+        doc = self.editor.document()
+        self.editor.setReadOnly(False)
+        self._long_line_guard_suspended = False
+        if not completed:
+            if paster.processed:
+                doc.undo()
+        else:
+            end = paster.position
+            cursor = self.editor.textCursor()
+            cursor.setPosition(end)
+            self.editor.setTextCursor(cursor)
+            self._fold_inserted_content(start, end)
+        self.highlighter.resume(
+            doc.findBlock(start).blockNumber(),
+            doc.findBlock(self.editor.textCursor().position()).blockNumber(),
+        )
+        self._paste_in_progress = False
+        self._highlight_current_line()
+        self._on_text_changed()
+
+    # ===== Long lines / folds =====
+
+    def _expanded_text(self) -> str:
+        return self.folds.expand(self.editor.toPlainText())
+
+    def _on_content_change(self, change):
+        if self._long_line_guard_suspended or change.added < DATA_URI_FOLD_MIN:
+            return
+        # Only a sizeable insertion can bring in a pathological line or an
+        # embedded image; typing never gets here. Fold once the edit is done.
+        start, end = change.position, change.position + change.added
+        QTimer.singleShot(0, lambda: self._fold_inserted_content(start, end))
+
+    def _fold_inserted_content(self, start: int, end: int):
+        """Fold data URIs and over-long lines in the blocks touching [start, end]."""
+        doc = self.editor.document()
+        block = doc.findBlock(min(start, doc.characterCount() - 1))
+        candidates = []
+        while block.isValid() and block.position() <= end:
+            if block.length() > LONG_LINE_THRESHOLD or (
+                    self.fold_data_uris and block.length() > DATA_URI_FOLD_MIN
+                    and "data:image/" in block.text()):
+                candidates.append(block)
+            block = block.next()
+        if not candidates:
+            return
+
+        cursor = QTextCursor(doc)
+        # Join the insertion that produced the content, so one undo reverts both
+        cursor.joinPreviousEditBlock()
+        self._long_line_guard_suspended = True
+        try:
+            for block in reversed(candidates):
+                if self.fold_data_uris:
+                    self._fold_block_data_uris(cursor, block)
+                if block.length() > LONG_LINE_THRESHOLD:
+                    if self.fold_long_lines:
+                        self._fold_block_tail(cursor, block)
+                    else:
+                        self._stop_wrapping_for_long_lines()
+        finally:
+            self._long_line_guard_suspended = False
+            cursor.endEditBlock()
+
+    def _fold_block_data_uris(self, cursor: QTextCursor, block):
+        text = block.text()
+        for match in reversed(list(DATA_URI_PATTERN.finditer(text))):
+            if len(match.group(0)) < DATA_URI_FOLD_MIN:
+                continue
+            cursor.setPosition(block.position() + utf16_len(text[:match.start()]))
+            cursor.setPosition(block.position() + utf16_len(text[:match.end()]),
+                               QTextCursor.KeepAnchor)
+            cursor.insertText(self.folds.fold_data_uri(match.group(0)))
+
+    def _fold_block_tail(self, cursor: QTextCursor, block):
+        text = block.text()
+        keep = self.folds.split_point(text, LONG_LINE_VISIBLE)
+        cursor.setPosition(block.position() + utf16_len(text[:keep]))
+        cursor.setPosition(block.position() + block.length() - 1, QTextCursor.KeepAnchor)
+        cursor.insertText(self.folds.fold_tail(text[keep:]))
+
+    def _stop_wrapping_for_long_lines(self):
+        if self.long_line_nowrap:
+            self.editor.setLineWrapMode(QPlainTextEdit.NoWrap)
+
+    def _fold_at(self, cursor: QTextCursor):
+        """Return the fold token match under cursor, or None."""
+        block = cursor.block()
+        if FOLD_OPEN not in block.text():
+            return None
+        text = block.text()
+        column = cursor.positionInBlock()
+        for match in FOLD_PATTERN.finditer(text):
+            if utf16_len(text[:match.start()]) <= column <= utf16_len(text[:match.end()]):
+                return match
+        return None
+
+    def _fold_around(self, position: int):
+        """(start, end) of the fold placeholder strictly containing position, or None."""
+        block = self.editor.document().findBlock(position)
+        text = block.text()
+        if FOLD_OPEN not in text:
+            return None
+        base = block.position()
+        for match in FOLD_PATTERN.finditer(text):
+            start = base + utf16_len(text[:match.start()])
+            if start >= position:
+                break
+            end = start + utf16_len(match.group(0))
+            if position < end:
+                return start, end
+        return None
+
+    def _keep_cursor_out_of_folds(self):
+        """Move the caret out of a fold placeholder it landed in, to its nearer edge.
+
+        Stepping in from one edge goes on to the other, so arrow keys cross
+        a token in one press.
+        A selection's anchor inside one moves out so that the whole token
+        is selected. Editing a token's text would lose its payload.
+        """
+        cursor = self.editor.textCursor()
+        position, anchor = cursor.position(), cursor.anchor()
+        previous = self._last_cursor_position
+        self._last_cursor_position = position
+        position_fold = self._fold_around(position)
+        anchor_fold = self._fold_around(anchor) if anchor != position else None
+        if position_fold is None and anchor_fold is None:
+            return
+        if position_fold is not None:
+            start, end = position_fold
+            if previous == start:
+                position = end  # stepped in from one edge: go on to the other
+            elif previous == end:
+                position = start
+            else:
+                position = start if position - start < end - position else end
+        if anchor_fold is not None:
+            anchor = anchor_fold[0] if anchor < position else anchor_fold[1]
+        elif cursor.anchor() == cursor.position():
+            anchor = position
+        cursor.setPosition(anchor)
+        cursor.setPosition(position, QTextCursor.KeepAnchor)
+        self._last_cursor_position = position
+        self.editor.setTextCursor(cursor)
+
+    def _select_whole_folds(self, event):
+        """Widen what Backspace/Delete is about to remove to whole fold placeholders."""
+        cursor = self.editor.textCursor()
+        if cursor.hasSelection():
+            return  # its edges are never inside a placeholder
+        probe = QTextCursor(cursor)
+        by_word = bool(event.modifiers() & Qt.ControlModifier)
+        if event.key() == Qt.Key_Backspace:
+            probe.movePosition(QTextCursor.PreviousWord if by_word
+                               else QTextCursor.PreviousCharacter, QTextCursor.KeepAnchor)
+        else:
+            probe.movePosition(QTextCursor.NextWord if by_word
+                               else QTextCursor.NextCharacter, QTextCursor.KeepAnchor)
+        start, end = probe.selectionStart(), probe.selectionEnd()
+        start_fold, end_fold = self._fold_around(start), self._fold_around(end)
+        if start_fold is None and end_fold is None:
+            return
+        start = start_fold[0] if start_fold else start
+        end = end_fold[1] if end_fold else end
+        # Qt deletes the selection instead, as one undoable step
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        self.editor.setTextCursor(cursor)
+
+    def expand_fold_at_cursor(self) -> bool:
+        """Replace the fold placeholder under the cursor with its content."""
+        cursor = self.editor.textCursor()
+        match = self._fold_at(cursor)
+        if match is None:
+            return False
+        payload = self.folds.payload(match.group(0))
+        if payload is None:
+            return False
+
+        block = cursor.block()
+        text = block.text()
+        edit = QTextCursor(block)
+        edit.setPosition(block.position() + utf16_len(text[:match.start()]))
+        edit.setPosition(block.position() + utf16_len(text[:match.end()]),
+                         QTextCursor.KeepAnchor)
+        self._long_line_guard_suspended = True
+        try:
+            edit.insertText(payload)
+        finally:
+            self._long_line_guard_suspended = False
+        if edit.block().length() > LONG_LINE_THRESHOLD:
+            self._stop_wrapping_for_long_lines()
+        return True
+
+    def _copy_expanded(self, cut: bool) -> bool:
+        """Put the expanded selection on the clipboard if it contains folds."""
+        cursor = self.editor.textCursor()
+        if not cursor.hasSelection():
+            return False
+        selected = cursor.selectedText().replace("\u2029", "\n")
+        if FOLD_OPEN not in selected:
+            return False
+        from PySide6.QtWidgets import QApplication
+        QApplication.clipboard().setText(self.folds.expand(selected))
+        if cut:
+            cursor.removeSelectedText()
+        return True
+
+    # ===== Embedded images =====
+
+    def get_preview_text(self) -> str:
+        """Document text for the preview, with embedded images served from files.
+
+        Keeps base64 payloads out of the HTML handed to setHtml.
+        """
+        if not len(self.folds):
+            return self.get_text()
+        return self.folds.expand(self.editor.toPlainText(), resolve=self._data_uri_preview_url)
+
+    def _data_uri_preview_url(self, payload: str):
+        match = DATA_URI_PATTERN.fullmatch(payload)
+        if not match:
+            return None
+        key = hashlib.sha1(payload.encode("ascii")).hexdigest()
+        path = self._preview_images.get(key)
+        if path is None:
+            try:
+                data = base64.b64decode(payload[payload.index(",") + 1:])
+            except (binascii.Error, ValueError):
+                return None
+            if self._preview_image_dir is None:
+                self._preview_image_dir = Path(tempfile.mkdtemp(prefix="mdeditor_embedded_"))
+                # Removed with the editor; the slot holds the path, not the dying widget
+                directory = str(self._preview_image_dir)
+                self.destroyed.connect(lambda: shutil.rmtree(directory, ignore_errors=True))
+            ext = match.group(1).split("/")[1].split("+")[0]
+            path = self._preview_image_dir / f"{key}.{ext}"
+            path.write_bytes(data)
+            self._preview_images[key] = path
+        return QUrl.fromLocalFile(str(path)).toString()
+
+    def discard_preview_images(self):
+        """Delete the embedded images decoded for the preview."""
+        if self._preview_image_dir is not None:
+            shutil.rmtree(self._preview_image_dir, ignore_errors=True)
+            self._preview_image_dir = None
+            self._preview_images.clear()
+
+    def extract_embedded_images(self) -> int:
+        """Save every base64 image data URI to images/ and reference it by path.
+
+        Returns the number of images extracted; all replacements are one undo step.
+        """
+        doc = self.editor.document()
+        spans = {}  # document start -> (end, uri)
+        visited = set()
+        for needle in (FOLD_OPEN, "data:image/"):
+            found = doc.find(needle)
+            while not found.isNull():
+                block = found.block()
+                if block.blockNumber() not in visited:
+                    visited.add(block.blockNumber())
+                    self._collect_data_uri_spans(block, spans)
+                found = doc.find(needle, block.position() + block.length())
+        if not spans:
+            return 0
+
+        count = 0
+        cursor = QTextCursor(doc)
+        cursor.beginEditBlock()
+        for start in sorted(spans, reverse=True):
+            end, uri = spans[start]
+            image_path = self.image_handler.save_image_from_data_uri(uri)
+            if image_path is None:
+                continue
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.insertText(image_path)
+            count += 1
+        cursor.endEditBlock()
+        return count
+
+    def _collect_data_uri_spans(self, block, spans: dict):
+        text = block.text()
+        base = block.position()
+        for match in FOLD_PATTERN.finditer(text):
+            payload = self.folds.payload(match.group(0))
+            if payload and payload.startswith("data:image/"):
+                spans[base + utf16_len(text[:match.start()])] = (
+                    base + utf16_len(text[:match.end()]), payload
+                )
+        for match in DATA_URI_PATTERN.finditer(text):
+            spans[base + utf16_len(text[:match.start()])] = (
+                base + utf16_len(text[:match.end()]), match.group(0)
+            )
 
     def _toggle_wrap(self, prefix: str, suffix: str):
         """Wrap/unwrap selection with prefix/suffix (toggle)."""
@@ -306,17 +778,15 @@ class EditorWidget(QWidget):
                 cursor.insertText(unwrapped)
             else:
                 # Check if the surrounding text has the wrapping
-                doc = self.editor.document()
-                full_text = doc.toPlainText()
                 before_start = max(0, start - len(prefix))
-                after_end = min(len(full_text), end + len(suffix))
+                after_end = end + len(suffix)
 
-                if (full_text[before_start:start] == prefix and
-                        full_text[end:after_end] == suffix):
+                if (self._text_range(before_start, start) == prefix and
+                        self._text_range(end, after_end) == suffix):
                     # Remove surrounding wrapping
                     cursor.setPosition(before_start)
                     cursor.setPosition(after_end, QTextCursor.KeepAnchor)
-                    cursor.insertText(full_text[before_start + len(prefix):after_end - len(suffix)])
+                    cursor.insertText(text)
                 else:
                     # Wrap
                     new_text = f"{prefix}{text}{suffix}"
@@ -354,37 +824,64 @@ class EditorWidget(QWidget):
         cursor.endEditBlock()
 
     def _prefix_lines(self, prefix: str):
-        """Apply prefix to all selected lines (or current line)."""
-        cursor = self.editor.textCursor()
-        cursor.beginEditBlock()
+        """Toggle prefix on all selected lines (or the current line).
 
-        if cursor.hasSelection():
-            start = cursor.selectionStart()
-            end = cursor.selectionEnd()
+        Adds the prefix to every line unless all of them already have it, in
+        which case it is removed.
+        """
+        self._transform_selected_lines(lambda lines: line_ops.toggle_prefix(lines, prefix)[0])
 
-            cursor.setPosition(start)
-            cursor.movePosition(QTextCursor.StartOfBlock)
-            start_block = cursor.blockNumber()
+    def _selected_block_range(self):
+        """First and last block touched by the selection (or the cursor)."""
+        cursor = self.editor.textCursor()
+        doc = self.editor.document()
+        start, end = cursor.selectionStart(), cursor.selectionEnd()
+        first = doc.findBlock(start)
+        last = doc.findBlock(end)
+        # A selection ending at the start of a line does not include that line
+        if end > start and end == last.position() and last != first:
+            last = last.previous()
+        return first, last
+
+    def _transform_selected_lines(self, transform):
+        """Rewrite the selected block range in one pass and one undo step."""
+        first, last = self._selected_block_range()
+        start = first.position()
+        end = last.position() + last.length() - 1
 
-            cursor.setPosition(end)
-            if cursor.atBlockStart() and end > start:
-                cursor.movePosition(QTextCursor.Left)
-            end_block = cursor.blockNumber()
+        cursor = self.editor.textCursor()
+        column = cursor.position() - start
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        old_text = cursor.selectedText()
+        new_text = "\n".join(transform(old_text.split("\u2029")))
+        new_length = utf16_len(new_text)
 
-            # Apply prefix to each line
-            cursor.setPosition(start)
-            cursor.movePosition(QTextCursor.StartOfBlock)
+        cursor.beginEditBlock()
+        cursor.insertText(new_text)
+        cursor.endEditBlock()
 
-            for i in range(end_block - start_block + 1):
-                cursor.movePosition(QTextCursor.StartOfBlock)
-                cursor.insertText(prefix)
-                if i < end_block - start_block:
-                    cursor.movePosition(QTextCursor.Down)
+        if first != last:
+            # Keep the rewritten lines selected
+            cursor.setPosition(start)
+            cursor.setPosition(start + new_length, QTextCursor.KeepAnchor)
         else:
-            cursor.movePosition(QTextCursor.StartOfBlock)
-            cursor.insertText(prefix)
-
-        cursor.endEditBlock()
+            # Keep the caret on the same text within the line
+            delta = new_length - (end - start)
+            cursor.setPosition(start + min(max(0, column + delta), new_length))
+        self.editor.setTextCursor(cursor)
+
+    def _text_range(self, start: int, end: int) -> str:
+        """Document text in [start, end) without copying the whole document."""
+        doc = self.editor.document()
+        start = max(0, start)
+        end = min(end, doc.characterCount() - 1)
+        if end <= start:
+            return ""
+        cursor = QTextCursor(doc)
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        return cursor.selectedText().replace("\u2029", "\n")
 
     def _insert_text(self, text: str):
         cursor = self.editor.textCursor()
@@ -473,10 +970,80 @@ class EditorWidget(QWidget):
             self._insert_text(md_syntax)
 
     def get_text(self) -> str:
-        return self.editor.toPlainText()
+        return self.bus.snapshot().text
 
     def set_text(self, text: str):
-        self.editor.setPlainText(text)
+        self.folds.clear()
+        self.editor.setLineWrapMode(QPlainTextEdit.WidgetWidth)
+        text = self._fold_new_text(text)
+        self._long_line_guard_suspended = True
+        try:
+            self.editor.setPlainText(text)
+        finally:
+            self._long_line_guard_suspended = False
+
+    def replace_text(self, text: str) -> bool:
+        """Change the document to text as one undoable edit, rewriting only changed lines.
+
+        Unlike set_text(), the undo history, the cursor and the folds of
+        unchanged lines survive. Returns False if text is already there.
+        """
+        self._long_line_guard_suspended = True
+        try:
+            return replace_changed_lines(
+                self.editor.document(),
+                split_lines(self.editor.toPlainText()),
+                split_lines(text),
+                compare=self.folds.expand,
+                render=self._fold_new_text,
+            ) > 0
+        finally:
+            self._long_line_guard_suspended = False
+
+    def _fold_new_text(self, text: str) -> str:
+        if self.fold_data_uris:
+            text = self.folds.fold_data_uris(text, DATA_URI_FOLD_MIN)
+        if self.fold_long_lines:
+            text = self.folds.fold_long_lines(text, LONG_LINE_THRESHOLD, LONG_LINE_VISIBLE)
+        return text
+
+    def load_chunks(self, chunks, total: int) -> ChunkedTextInserter:
+        """Replace the document with streamed chunks. Call start() on the result.
+
+        The editor is read-only and emits no text signals until loading ends;
+        the load is not undoable.
+        """
+        self._debounce_timer.stop()
+        self.folds.clear()
+        self.editor.setLineWrapMode(QPlainTextEdit.WidgetWidth)
+        self.editor.blockSignals(True)
+        self.editor.setPlainText("")
+        self.editor.setReadOnly(True)
+        self.editor.document().setUndoRedoEnabled(False)
+        loader = ChunkedTextInserter(self.editor, chunks, total, self)
+        loader.finished.connect(self._on_chunked_load_finished)
+        return loader
+
+    def _on_chunked_load_finished(self, completed: bool):
+        self.editor.document().setUndoRedoEnabled(True)
+        self.editor.setReadOnly(False)
+        self.editor.blockSignals(False)
+        cursor = self.editor.textCursor()
+        cursor.movePosition(QTextCursor.Start)
+        self.editor.setTextCursor(cursor)
+        self._highlight_current_line()
+        self._on_text_changed()
+
+    @property
+    def is_large_file_mode(self) -> bool:
+        return self._large_file_mode
+
+    def set_large_file_mode(self, enabled: bool):
+        """Detach syntax highlighting while a large file is open."""
+        if enabled == self._large_file_mode:
+            return
+        self._large_file_mode = enabled
+        self.highlighter.setDocument(None if enabled else self.editor.document())
 
     def set_base_path(self, path: str):
         self.image_handler.set_base_path(path)
@@ -488,14 +1055,31 @@ class EditorWidget(QWidget):
         return line, col
 
     def get_character_count(self) -> int:
-        return len(self.editor.toPlainText())
+        # characterCount() includes the trailing paragraph separator
+        return self.editor.document().characterCount() - 1
 
     def get_word_count(self) -> int:
-        text = self.editor.toPlainText().strip()
+        # Folded payloads (embedded images, long-line tails) are not prose
+        text = FoldRegistry.strip(self.editor.toPlainText()).strip()
         if not text:
             return 0
         return len(text.split())
 
+    def get_diagnostics(self) -> dict:
+        """Document and memory statistics for the diagnostics dialog."""
+        doc = self.editor.document()
+        monitor = self.undo_monitor
+        return {
+            "Characters": f"{self.get_character_count():,}",
+            "Lines": f"{doc.blockCount():,}",
+            "Revision": f"{self.bus.revision:,}",
+            "Folded regions": f"{len(self.folds):,}",
+            "Undo steps": f"{monitor.undo_steps:,} (redo {monitor.redo_steps:,})",
+            "Undo memory (est.)": f"{_format_size(monitor.estimated_bytes)}"
+                                  f" of {_format_size(monitor.budget)}",
+            "Large file mode": "on" if self._large_file_mode else "off",
+        }
+
     def zoom_in(self):
         self._zoom_level += 1
         self._apply_zoom()
@@ -539,10 +1123,12 @@ class EditorWidget(QWidget):
         self.editor.redo()
 
     def cut(self):
-        self.editor.cut()
+        if not self._copy_expanded(cut=True):
+            self.editor.cut()
 
     def copy(self):
-        self.editor.copy()
+        if not self._copy_expanded(cut=False):
+            self.editor.copy()
 
     def paste(self):
         self.editor.paste()
@@ -565,6 +1151,9 @@ class EditorWidget(QWidget):
     def connect_text_changed(self, slot):
         self.editor.textChanged.connect(slot)
 
+    def connect_document_changed(self, slot):
+        self.document_changed.connect(slot)
+
     def connect_cursor_changed(self, slot):
         self.editor.cursorPositionChanged.connect(slot)
 
@@ -576,5 +1165,16 @@ class EditorWidget(QWidget):
         maximum = scrollbar.maximum()
         return scrollbar.value() / maximum if maximum > 0 else 0.0
 
+    def view_state(self) -> Tuple[int, int]:
+        """(cursor position, first visible line), for restore_view_state()."""
+        return self.editor.textCursor().position(), self.editor.verticalScrollBar().value()
+
+    def restore_view_state(self, position: int, scroll: int):
+        """Put the cursor and the scroll position back (clamped to the current text)."""
+        cursor = self.editor.textCursor()
+        cursor.setPosition(max(0, min(position, self.get_character_count())))
+        self.editor.setTextCursor(cursor)
+        self.editor.verticalScrollBar().setValue(scroll)
+
     def set_dark_mode(self, is_dark):
         self.highlighter.set_dark_mode(is_dark)
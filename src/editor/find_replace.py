@@ -1,18 +1,41 @@
-import re
+import time
 from PySide6.QtWidgets import (
     QWidget, QHBoxLayout, QVBoxLayout, QLineEdit,
     QPushButton, QCheckBox, QLabel
 )
-from PySide6.QtCore import Signal, Qt
-from PySide6.QtGui import QKeySequence, QShortcut, QTextDocument
+from PySide6.QtCore import Signal, Qt, QRegularExpression, QTimer
+from PySide6.QtGui import QKeySequence, QShortcut, QTextDocument, QTextCursor
+
+from src.editor.text_diff import replace_spans
+from src.editor.folding import FOLD_OPEN, FOLD_CLOSE
+from src.editor.search_engine import (
+    DocumentTextCache, MatchCountJob, MatchIndex, MatchIndexJob, SearchQuery, compile_pattern,
+    parse_replacement, has_group_references, expand_replacement, collect_replacements
+)
+from src.constants import DEBOUNCE_INTERVAL
 
 
 class FindReplaceWidget(QWidget):
     closed = Signal()
+    highlights_changed = Signal()  # match_spans() would return something different
+    replaced_all = Signal(int, float)  # replacements made, seconds taken
 
     def __init__(self, editor, parent=None):
         super().__init__(parent)
         self.editor = editor
+        self._text_cache = DocumentTextCache(editor.document(), self)
+        self._count_job = None
+        # (needle, case_sensitive, revision, positions) of the last finished count
+        self._last_count = None
+        # Match spans of the current query, built in the background
+        self._index = None
+        self._index_job = None
+        self._scope = None  # QTextCursor spanning the find-in-selection range
+        # Re-index after edits, once typing pauses
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(DEBOUNCE_INTERVAL)
+        self._refresh_timer.timeout.connect(self._refresh_matches)
         self._setup_ui()
         self._connect_signals()
         self.hide()
@@ -32,6 +55,15 @@ class FindReplaceWidget(QWidget):
         self.find_input.setPlaceholderText("Search...")
         self.case_check = QCheckBox("Aa")
         self.case_check.setToolTip("Match Case")
+        self.word_check = QCheckBox("W")
+        self.word_check.setToolTip("Whole Word")
+        self.regex_check = QCheckBox(".*")
+        self.regex_check.setToolTip("Regular Expression")
+        self.selection_check = QCheckBox("Sel")
+        self.selection_check.setToolTip("Find in Selection")
+        self.highlight_check = QCheckBox("Mark")
+        self.highlight_check.setToolTip("Highlight All Matches")
+        self.highlight_check.setChecked(True)
         self.find_prev_btn = QPushButton("<")
         self.find_prev_btn.setToolTip("Previous (Shift+Enter)")
         self.find_prev_btn.setFixedWidth(30)
@@ -39,7 +71,7 @@ class FindReplaceWidget(QWidget):
         self.find_next_btn.setToolTip("Next (Enter)")
         self.find_next_btn.setFixedWidth(30)
         self.match_label = QLabel("")
-        self.match_label.setFixedWidth(60)
+        self.match_label.setFixedWidth(90)
         self.close_btn = QPushButton("X")
         self.close_btn.setToolTip("Close (Esc)")
         self.close_btn.setFixedWidth(24)
@@ -47,6 +79,10 @@ class FindReplaceWidget(QWidget):
         find_row.addWidget(find_label)
         find_row.addWidget(self.find_input)
         find_row.addWidget(self.case_check)
+        find_row.addWidget(self.word_check)
+        find_row.addWidget(self.regex_check)
+        find_row.addWidget(self.selection_check)
+        find_row.addWidget(self.highlight_check)
         find_row.addWidget(self.find_prev_btn)
         find_row.addWidget(self.find_next_btn)
         find_row.addWidget(self.match_label)
@@ -85,6 +121,11 @@ class FindReplaceWidget(QWidget):
         self.replace_all_btn.clicked.connect(self.replace_all)
         self.close_btn.clicked.connect(self.close_find)
         self.case_check.toggled.connect(lambda: self._on_find_text_changed(self.find_input.text()))
+        self.word_check.toggled.connect(lambda: self._on_find_text_changed(self.find_input.text()))
+        self.regex_check.toggled.connect(lambda: self._on_find_text_changed(self.find_input.text()))
+        self.selection_check.toggled.connect(self._on_selection_scope_toggled)
+        self.highlight_check.toggled.connect(self._on_highlight_toggled)
+        self.editor.document().contentsChange.connect(self._on_document_edited)
 
     def show_find(self):
         self.replace_row_widget.hide()
@@ -99,6 +140,9 @@ class FindReplaceWidget(QWidget):
         self.find_input.selectAll()
 
     def close_find(self):
+        self._refresh_timer.stop()
+        self._cancel_count()
+        self._cancel_index()
         self.hide()
         self.editor.setFocus()
         self.closed.emit()
@@ -115,77 +159,337 @@ class FindReplaceWidget(QWidget):
         flags = QTextDocument.FindFlags()
         if self.case_check.isChecked():
             flags |= QTextDocument.FindCaseSensitively
+        if self.word_check.isChecked():
+            flags |= QTextDocument.FindWholeWords
         return flags
 
+    def _query(self, text: str = None) -> SearchQuery:
+        return SearchQuery(
+            self.find_input.text() if text is None else text,
+            case_sensitive=self.case_check.isChecked(),
+            regex=self.regex_check.isChecked(),
+            whole_word=self.word_check.isChecked(),
+        )
+
+    def _scope_range(self):
+        if self._scope is None:
+            return None
+        return self._scope.selectionStart(), self._scope.selectionEnd()
+
+    def _on_selection_scope_toggled(self, checked):
+        cursor = self.editor.textCursor()
+        if checked and cursor.hasSelection():
+            self._scope = QTextCursor(cursor)
+        else:
+            self._scope = None
+            if checked:
+                # Nothing selected to search in
+                self.selection_check.blockSignals(True)
+                self.selection_check.setChecked(False)
+                self.selection_check.blockSignals(False)
+        self._on_find_text_changed(self.find_input.text())
+
     def _on_find_text_changed(self, text):
         if not text:
+            self._cancel_count()
+            self._cancel_index()
             self.match_label.setText("")
             return
         self._count_matches(text)
-        # Find from current position
-        if not self.editor.find(text, self._get_find_flags()):
-            # Wrap around from start
-            from PySide6.QtGui import QTextCursor
-            cursor = self.editor.textCursor()
-            cursor.movePosition(QTextCursor.Start)
-            self.editor.setTextCursor(cursor)
-            self.editor.find(text, self._get_find_flags())
+        # Find from the start of the current match, so a growing query stays on it
+        self._select_match(forward=True, from_selection_start=True)
 
     def _count_matches(self, text):
-        content = self.editor.toPlainText()
-        if self.case_check.isChecked():
-            count = content.count(text)
+        """Count matches in the background; small documents finish immediately."""
+        self._cancel_count()
+        query = self._query(text)
+        # Regex, whole-word and in-selection counts come from the match index
+        counted_by_index = not query.is_literal or self._scope is not None
+        if counted_by_index or self.highlight_check.isChecked():
+            index = self._match_index(query)
+            if index is None:
+                return
+            if counted_by_index:
+                if index.complete:
+                    self.match_label.setText(f"{len(index)} found")
+                return
+
+        case_sensitive = query.case_sensitive
+        if case_sensitive:
+            haystack, needle = self._text_cache.text(), text
         else:
-            count = content.lower().count(text.lower())
+            haystack, needle = self._text_cache.lowered(), text.lower()
+
+        # A query grown by appending characters only needs the previous matches rechecked
+        candidates = None
+        revision = self._text_cache.revision
+        if self._last_count is not None:
+            last_needle, last_case, last_revision, positions = self._last_count
+            if (positions is not None and last_case == case_sensitive
+                    and last_revision == revision
+                    and len(needle) > len(last_needle) and needle.startswith(last_needle)):
+                candidates = positions
+
+        job = MatchCountJob(haystack, needle, candidates, self)
+        job.progress.connect(lambda count: self.match_label.setText(f"{count} found\u2026"))
+        job.finished.connect(
+            lambda count: self._on_count_finished(job, case_sensitive, revision, count)
+        )
+        self._count_job = job
+        self.match_label.setText("counting\u2026")
+        job.start()
+
+    def _on_count_finished(self, job, case_sensitive, revision, count):
+        self._last_count = (job.needle, case_sensitive, revision, job.positions)
+        if self._count_job is job:
+            self._count_job = None
+        job.deleteLater()
         self.match_label.setText(f"{count} found")
 
-    def find_next(self):
-        text = self.find_input.text()
-        if not text:
+    def _cancel_count(self):
+        if self._count_job is not None:
+            self._count_job.cancel()
+            self._count_job.deleteLater()
+            self._count_job = None
+
+    # ===== Match index =====
+
+    def _match_index(self, query: SearchQuery):
+        """Index of query's matches at the current revision, built in the background.
+
+        Returns None (and says so in the label) if the regex is invalid.
+        """
+        pattern = compile_pattern(query)
+        if not pattern.isValid():
+            self._cancel_index()
+            self.match_label.setText("Invalid regex")
+            self.match_label.setToolTip(pattern.errorString())
+            return None
+        self.match_label.setToolTip("")
+
+        key = (query, self._text_cache.revision, self._scope_range())
+        if self._index is not None and self._index.key == key:
+            return self._index
+
+        self._cancel_index()
+        index = MatchIndex(key)
+        job = MatchIndexJob(pattern, self._text_cache.text(), index, self._scope_range(), self)
+        job.progress.connect(lambda count: self._on_index_progress(job, count))
+        job.finished.connect(lambda completed: self._on_index_finished(job, completed))
+        self._index, self._index_job = index, job
+        job.start()
+        self.highlights_changed.emit()
+        return index
+
+    def _index_counts(self, job) -> bool:
+        # The literal whole-document count comes from MatchCountJob instead
+        query = job.index.key[0]
+        return job is self._index_job and (not query.is_literal or job.index.key[2] is not None)
+
+    def _on_index_progress(self, job, count):
+        if self._index_counts(job):
+            self.match_label.setText(f"{count} found\u2026")
+        if job is self._index_job:
+            self.highlights_changed.emit()
+
+    def _on_index_finished(self, job, completed):
+        if self._index_counts(job):
+            if completed:
+                self.match_label.setText(f"{len(job.index)} found")
+            else:
+                self.match_label.setText("Timed out")
+                self.match_label.setToolTip("The pattern took too long to match")
+        if self._index_job is job:
+            self._index_job = None
+            self.highlights_changed.emit()
+        job.deleteLater()
+
+    def _cancel_index(self):
+        if self._index_job is not None:
+            self._index_job.cancel()
+            self._index_job.deleteLater()
+            self._index_job = None
+        if self._index is not None:
+            self._index = None
+            self.highlights_changed.emit()
+
+    def _on_document_edited(self, position, removed, added):
+        if removed == 0 and added == 0:
             return
-        if not self.editor.find(text, self._get_find_flags()):
-            # Wrap around
-            cursor = self.editor.textCursor()
-            cursor.movePosition(cursor.Start)
-            self.editor.setTextCursor(cursor)
-            self.editor.find(text, self._get_find_flags())
+        # The index holds positions of the previous revision
+        self._cancel_index()
+        if not self.isHidden() and self.find_input.text():
+            self._refresh_timer.start()
+
+    def _refresh_matches(self):
+        if not self.isHidden() and self.find_input.text():
+            self._count_matches(self.find_input.text())
+
+    # ===== Highlight all =====
+
+    def _on_highlight_toggled(self, checked):
+        if checked and self.find_input.text():
+            self._count_matches(self.find_input.text())
+        self.highlights_changed.emit()
+
+    def match_spans(self, start: int, end: int):
+        """(start, end) of the current query's matches starting in [start, end).
+
+        Empty unless the find bar is open with Highlight All on; while the
+        index is still building, only the matches found so far.
+        """
+        index = self._index
+        if (self.isHidden() or not self.highlight_check.isChecked() or index is None
+                or index.key[1] != self._text_cache.revision):
+            return []
+        return list(index.spans_between(start, end))
+
+    def _complete_index(self, query: SearchQuery):
+        """The finished index for query, matching synchronously if needed.
+
+        None if the regex is invalid or matching timed out.
+        """
+        index = self._match_index(query)
+        if index is None:
+            return None
+        if not index.complete and self._index_job is not None:
+            self._index_job.run()
+        return index if index.complete else None
+
+    # ===== Navigation =====
+
+    def _select_match(self, forward: bool, from_selection_start: bool = False) -> bool:
+        query = self._query()
+        if not query.text:
+            return False
+        index = self._match_index(query)
+        if index is None:
+            return False
+        # Qt would search inside fold placeholders: finish the index instead
+        if not index.complete and (self._scope is not None or self._text_cache.has_folds):
+            index = self._complete_index(query)
+            if index is None:
+                return False
+
+        cursor = self.editor.textCursor()
+        if not index.complete:
+            # Still indexing: let Qt search from the cursor meanwhile
+            return self._find_with_qt(query, forward)
+
+        if forward:
+            position = cursor.selectionStart() if from_selection_start else cursor.selectionEnd()
+            span = index.next_match(position)
+        else:
+            span = index.previous_match(cursor.selectionStart())
+        if span is None:
+            return False
+        cursor.setPosition(span[0])
+        cursor.setPosition(span[1], QTextCursor.KeepAnchor)
+        self.editor.setTextCursor(cursor)
+        return True
+
+    def _find_with_qt(self, query: SearchQuery, forward: bool) -> bool:
+        flags = self._get_find_flags()
+        if not forward:
+            flags |= QTextDocument.FindBackward
+        target = query.text if query.is_literal else compile_pattern(query)
+        if self.editor.find(target, flags):
+            return True
+        # Wrap around
+        cursor = self.editor.textCursor()
+        cursor.movePosition(QTextCursor.Start if forward else QTextCursor.End)
+        self.editor.setTextCursor(cursor)
+        return self.editor.find(target, flags)
+
+    def find_next(self):
+        self._select_match(forward=True)
 
     def find_previous(self):
-        text = self.find_input.text()
-        if not text:
-            return
-        flags = self._get_find_flags() | QTextDocument.FindBackward
-        if not self.editor.find(text, flags):
-            # Wrap around
-            cursor = self.editor.textCursor()
-            cursor.movePosition(cursor.End)
-            self.editor.setTextCursor(cursor)
-            self.editor.find(text, flags)
+        self._select_match(forward=False)
 
     def replace(self):
         cursor = self.editor.textCursor()
         if cursor.hasSelection() and self._matches_current(cursor):
-            cursor.insertText(self.replace_input.text())
+            cursor.insertText(self._replacement_for(cursor))
         self.find_next()
 
+    def _replacement_for(self, cursor) -> str:
+        """What Replace All would put in place of the selected match."""
+        query = self._query()
+        if not query.regex:
+            return self.replace_input.text()
+        parts = parse_replacement(self.replace_input.text())
+        if not has_group_references(parts):
+            return "".join(parts)
+        pattern = compile_pattern(query)
+        # The match at the selection in the document, so lookarounds and \b
+        # see the same context as in Replace All
+        match = pattern.match(self._text_cache.text(), cursor.selectionStart(),
+                              QRegularExpression.NormalMatch,
+                              QRegularExpression.AnchorAtOffsetMatchOption)
+        if not match.hasMatch() or match.capturedEnd() != cursor.selectionEnd():
+            anchored = QRegularExpression(
+                QRegularExpression.anchoredPattern(pattern.pattern()), pattern.patternOptions()
+            )
+            match = anchored.match(cursor.selectedText())
+        return expand_replacement(parts, match)
+
     def replace_all(self):
+        """Replace every match as one undo step, editing only the matched spans."""
         text = self.find_input.text()
         if not text:
             return
-        replacement = self.replace_input.text()
-        content = self.editor.toPlainText()
-        if self.case_check.isChecked():
-            new_content = content.replace(text, replacement)
+        query = self._query()
+        if query.regex:
+            parts = parse_replacement(self.replace_input.text())
         else:
-            new_content = re.sub(re.escape(text), replacement, content, flags=re.IGNORECASE)
-        if new_content != content:
-            self.editor.selectAll()
-            self.editor.textCursor().insertText(new_content)
-        self._count_matches(self.find_input.text())
+            parts = (self.replace_input.text(),)
+
+        pattern = compile_pattern(query)
+        if not pattern.isValid():
+            self.match_label.setText("Invalid regex")
+            return
+
+        started = time.perf_counter()
+        if has_group_references(parts):
+            edits = collect_replacements(pattern, self._text_cache.text(), parts,
+                                         self._scope_range())
+        else:
+            # The same text everywhere: reuse the spans already indexed for find
+            index = self._complete_index(query)
+            replacement = "".join(parts)
+            edits = None if index is None else [
+                (start, end, replacement) for start, end in zip(index.starts, index.ends)
+            ]
+        if edits is None:
+            self.match_label.setText("Timed out")
+            return
+
+        count = replace_spans(self.editor.document(), edits)
+        elapsed = time.perf_counter() - started
+        self.match_label.setText(f"{count} replaced")
+        self.replaced_all.emit(count, elapsed)
 
     def _matches_current(self, cursor):
         selected = cursor.selectedText()
-        find_text = self.find_input.text()
-        if self.case_check.isChecked():
-            return selected == find_text
-        return selected.lower() == find_text.lower()
+        if FOLD_OPEN in selected or FOLD_CLOSE in selected:
+            return False  # never replace (part of) a fold placeholder
+        query = self._query()
+        scope = self._scope_range()
+        if scope and not (scope[0] <= cursor.selectionStart() and cursor.selectionEnd() <= scope[1]):
+            return False
+        if query.is_literal:
+            if query.case_sensitive:
+                return selected == query.text
+            return selected.lower() == query.text.lower()
+
+        pattern = compile_pattern(query)
+        if not pattern.isValid():
+            return False
+        index = self._index
+        if index is not None and index.complete and index.key[1] == self._text_cache.revision:
+            return index.contains(cursor.selectionStart(), cursor.selectionEnd())
+        anchored = QRegularExpression(
+            QRegularExpression.anchoredPattern(pattern.pattern()), pattern.patternOptions()
+        )
+        return anchored.match(selected).hasMatch()
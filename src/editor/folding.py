@@ -0,0 +1,148 @@
+"""FoldRegistry — keeps oversized content out of the editor document.
+
+Folded content is replaced in the QTextDocument by a short placeholder token.
+The payload lives here and expand() puts it back, so saving, preview and
+export always see the original text while layout and highlighting only
+ever deal with the placeholder. Search skips placeholders altogether (see
+mask()), and the editor moves and deletes them as a whole, so a token
+can't be damaged and lose the payload it stands for.
+
+Payloads are kept until clear() because undo can bring a deleted token back.
+"""
+import re
+from typing import Callable, Dict, Optional
+
+from src.constants import DATA_URI_PATTERN
+
+FOLD_OPEN = "\u27ea"   # ⟪
+FOLD_CLOSE = "\u27eb"  # ⟫
+FOLD_PATTERN = re.compile(FOLD_OPEN + r"folded #(\d+)[^" + FOLD_CLOSE + r"\n]*" + FOLD_CLOSE)
+FOLD_MASK = "\x00"  # stands in for each character of a token in searched text
+
+
+class FoldRegistry:
+    def __init__(self):
+        self._payloads = {}
+        self._next_id = 1
+
+    def __len__(self):
+        return len(self._payloads)
+
+    @property
+    def payload_length(self) -> int:
+        """Characters held in payloads (kept out of the document, but still in memory)."""
+        return sum(map(len, self._payloads.values()))
+
+    @property
+    def next_id(self) -> int:
+        """Id the next fold will get; ids are never reused, not even after clear()."""
+        return self._next_id
+
+    def payloads_since(self, fold_id: int) -> Dict[int, str]:
+        """Payloads of the folds made since next_id was fold_id."""
+        return {key: value for key, value in self._payloads.items() if key >= fold_id}
+
+    def restore(self, payloads: Dict[int, str]):
+        """Add previously recorded payloads (e.g. from a recovery journal)."""
+        self._payloads.update(payloads)
+        self._next_id = max(self._next_id, max(payloads, default=0) + 1)
+
+    def fold(self, payload: str, label: str) -> str:
+        """Store payload and return the placeholder token that stands in for it."""
+        fold_id = self._next_id
+        self._next_id += 1
+        self._payloads[fold_id] = payload
+        return f"{FOLD_OPEN}folded #{fold_id}: {label}{FOLD_CLOSE}"
+
+    def payload(self, token: str) -> Optional[str]:
+        match = FOLD_PATTERN.fullmatch(token)
+        if not match:
+            return None
+        return self._payloads.get(int(match.group(1)))
+
+    def expand(self, text: str, resolve: Callable[[str], Optional[str]] = None) -> str:
+        """Replace every known placeholder token in text with its payload.
+
+        resolve, if given, may substitute a payload (e.g. a data URI with a
+        file URL for the preview); returning None keeps the payload.
+        """
+        if not self._payloads or FOLD_OPEN not in text:
+            return text
+        return FOLD_PATTERN.sub(lambda m: self._expand_match(m, resolve), text)
+
+    def _expand_match(self, match, resolve) -> str:
+        payload = self._payloads.get(int(match.group(1)))
+        if payload is None:
+            return match.group(0)
+        if resolve is not None:
+            resolved = resolve(payload)
+            if resolved is not None:
+                return resolved
+        # A folded long line may itself contain folded content
+        return self.expand(payload, resolve)
+
+    @staticmethod
+    def strip(text: str) -> str:
+        """Remove placeholder tokens, e.g. before counting words."""
+        if FOLD_OPEN not in text:
+            return text
+        return FOLD_PATTERN.sub("", text)
+
+    @staticmethod
+    def mask(text: str) -> str:
+        """Overwrite placeholder tokens with FOLD_MASK, keeping every offset.
+
+        Nothing typed in a search box matches the mask, and a regex match
+        that contains it spans a token and must be skipped.
+        """
+        if FOLD_OPEN not in text:
+            return text
+        return FOLD_PATTERN.sub(lambda m: FOLD_MASK * len(m.group(0)), text)
+
+    def clear(self):
+        self._payloads.clear()
+
+    # ===== Long lines =====
+
+    def fold_tail(self, tail: str) -> str:
+        """Fold the hidden remainder of a long line."""
+        return self.fold(tail, f"{len(tail):,} more characters, double-click to expand")
+
+    @staticmethod
+    def split_point(line: str, keep: int) -> int:
+        """Move keep past any placeholder token it would cut in half."""
+        for match in FOLD_PATTERN.finditer(line):
+            if match.start() >= keep:
+                break
+            if match.end() > keep:
+                return match.end()
+        return keep
+
+    def fold_long_line(self, line: str, keep: int) -> str:
+        """Keep the first `keep` characters of line and fold the rest."""
+        keep = self.split_point(line, keep)
+        return line[:keep] + self.fold_tail(line[keep:])
+
+    def fold_long_lines(self, text: str, threshold: int, keep: int) -> str:
+        """Fold every line of text longer than threshold characters."""
+        if len(text) < threshold:
+            return text
+        pattern = re.compile(r"^[^\n]{%d,}" % threshold, re.MULTILINE)
+        return pattern.sub(lambda m: self.fold_long_line(m.group(0), keep), text)
+
+    # ===== Inline data-URI images =====
+
+    def fold_data_uri(self, uri: str) -> str:
+        mime = uri[len("data:"):uri.index(";")]
+        size_kb = len(uri) * 3 // 4 // 1024
+        return self.fold(uri, f"{mime}, {size_kb:,} KB embedded")
+
+    def fold_data_uris(self, text: str, min_length: int) -> str:
+        """Fold every base64 image data URI of at least min_length characters."""
+        if "data:image/" not in text:
+            return text
+        return DATA_URI_PATTERN.sub(
+            lambda m: self.fold_data_uri(m.group(0))
+            if len(m.group(0)) >= min_length else m.group(0),
+            text,
+        )
@@ -0,0 +1,397 @@
+"""Search support for FindReplaceWidget — cached document text, counting and match indexes.
+
+DocumentTextCache keeps the document's plain text, and its lowercase copy for
+case-insensitive search, until the next edit; fold placeholders in it are
+masked so that nothing is found inside them. MatchCountJob counts a needle
+a slice per event-loop tick, so typing in the search box never waits for a
+full scan of a large document.
+
+Regex and whole-word searches go through QRegularExpression (PCRE2), whose
+match limit stops catastrophic backtracking inside a single call. A
+MatchIndexJob collects the match spans of one query into a MatchIndex, a
+time slice per tick and within SEARCH_TIMEOUT overall; navigation then
+bisects the index instead of rescanning from the cursor.
+
+Replace All turns matches into (start, end, replacement) edits; regex
+replacements may refer to groups with $1, ${1} or ${name} (see
+parse_replacement).
+"""
+import re
+import time
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple, Union
+
+from PySide6.QtCore import QObject, QTimer, Signal, QRegularExpression
+
+from src.editor.folding import FoldRegistry, FOLD_MASK, FOLD_OPEN
+from src.constants import (
+    SEARCH_SLICE, MATCH_POSITIONS_LIMIT, SEARCH_TICK_BUDGET, SEARCH_TIMEOUT
+)
+
+NARROW_SLICE = 20000  # candidate positions checked per tick
+
+
+class DocumentTextCache(QObject):
+    """Plain text of a document and its lowercase copy, cached per edit revision.
+
+    Fold placeholder tokens are overwritten with FOLD_MASK (offsets are kept):
+    finding or replacing text inside one would break the token and lose the
+    content it stands for.
+    """
+
+    def __init__(self, document, parent=None):
+        super().__init__(parent)
+        self._document = document
+        self._revision = 0
+        self._text: Optional[str] = None
+        self._lowered: Optional[str] = None
+        self._has_folds = False
+        document.contentsChange.connect(self._on_contents_change)
+
+    @property
+    def revision(self) -> int:
+        return self._revision
+
+    def text(self) -> str:
+        if self._text is None:
+            text = self._document.toPlainText()
+            self._has_folds = FOLD_OPEN in text
+            self._text = FoldRegistry.mask(text) if self._has_folds else text
+        return self._text
+
+    @property
+    def has_folds(self) -> bool:
+        """Whether text() masked any fold placeholder."""
+        self.text()
+        return self._has_folds
+
+    def lowered(self) -> str:
+        if self._lowered is None:
+            self._lowered = self.text().lower()
+        return self._lowered
+
+    def _on_contents_change(self, position: int, removed: int, added: int):
+        if removed == 0 and added == 0:
+            return
+        self._revision += 1
+        self._text = None
+        self._lowered = None
+
+
+class MatchCountJob(QObject):
+    """Count non-overlapping occurrences of needle in haystack, like str.count.
+
+    With candidates — every occurrence of a prefix of needle — only those
+    positions are checked, so a query that grows by appending characters
+    narrows the previous result instead of rescanning the document.
+
+    positions holds every (possibly overlapping) occurrence once finished,
+    or None if there were more than MATCH_POSITIONS_LIMIT.
+    """
+    progress = Signal(int)  # partial count
+    finished = Signal(int)  # final count
+
+    def __init__(self, haystack: str, needle: str,
+                 candidates: Optional[List[int]] = None, parent=None):
+        super().__init__(parent)
+        self.haystack = haystack
+        self.needle = needle
+        self.count = 0
+        self.positions: Optional[List[int]] = []
+        self._candidates = candidates
+        self._pos = 0          # haystack offset, or index into candidates
+        self._last_end = 0     # end of the last counted match (narrowing)
+        self._running = False
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._step)
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def start(self):
+        """Run the first slice now; small documents finish before this returns."""
+        self._running = True
+        self._step()
+        if self._running:
+            self._timer.start()
+
+    def cancel(self):
+        self._timer.stop()
+        self._running = False
+
+    def _step(self):
+        if self._candidates is None:
+            done = self._scan_slice()
+        else:
+            done = self._narrow_slice()
+        if done:
+            self._timer.stop()
+            self._running = False
+            self.finished.emit(self.count)
+        else:
+            self.progress.emit(self.count)
+
+    def _scan_slice(self) -> bool:
+        haystack, needle = self.haystack, self.needle
+        size = len(haystack)
+        end = min(self._pos + SEARCH_SLICE, size)
+        if end < size:
+            # A needle without a newline never straddles a line break
+            newline = haystack.find("\n", end) if "\n" not in needle else -1
+            end = size if newline < 0 else newline + 1
+
+        found = haystack.count(needle, self._pos, end)
+        self.count += found
+        if self.positions is not None:
+            if len(self.positions) + found > MATCH_POSITIONS_LIMIT:
+                self.positions = None
+            else:
+                index = haystack.find(needle, self._pos, end)
+                while index >= 0:
+                    self.positions.append(index)
+                    index = haystack.find(needle, index + 1, end)
+                if len(self.positions) > MATCH_POSITIONS_LIMIT:
+                    self.positions = None
+        self._pos = end
+        return end >= size
+
+    def _narrow_slice(self) -> bool:
+        haystack, needle = self.haystack, self.needle
+        size = len(needle)
+        stop = min(self._pos + NARROW_SLICE, len(self._candidates))
+        for position in self._candidates[self._pos:stop]:
+            if haystack.startswith(needle, position):
+                self.positions.append(position)
+                if position >= self._last_end:
+                    self.count += 1
+                    self._last_end = position + size
+        self._pos = stop
+        return stop >= len(self._candidates)
+
+
+@dataclass(frozen=True)
+class SearchQuery:
+    text: str
+    case_sensitive: bool = False
+    regex: bool = False
+    whole_word: bool = False
+
+    @property
+    def is_literal(self) -> bool:
+        return not self.regex and not self.whole_word
+
+
+@lru_cache(maxsize=64)
+def compile_pattern(query: SearchQuery) -> QRegularExpression:
+    """Compiled (and cached) pattern for query; check isValid() before use."""
+    pattern = query.text if query.regex else QRegularExpression.escape(query.text)
+    if query.whole_word:
+        pattern = r"\b(?:" + pattern + r")\b"
+    options = (QRegularExpression.MultilineOption
+               | QRegularExpression.UseUnicodePropertiesOption)
+    if not query.case_sensitive:
+        options |= QRegularExpression.CaseInsensitiveOption
+    regex = QRegularExpression(pattern, options)
+    if regex.isValid():
+        regex.optimize()
+    return regex
+
+
+class MatchIndex:
+    """Sorted document spans of every non-empty match of one query at one revision."""
+
+    def __init__(self, key):
+        self.key = key
+        self.starts = array("q")
+        self.ends = array("q")
+        self.complete = False
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add(self, start: int, end: int):
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def next_match(self, position: int, wrap: bool = True) -> Optional[Tuple[int, int]]:
+        """First match starting at or after position."""
+        i = bisect_left(self.starts, position)
+        if i == len(self.starts):
+            if not wrap or not self.starts:
+                return None
+            i = 0
+        return self.starts[i], self.ends[i]
+
+    def previous_match(self, position: int, wrap: bool = True) -> Optional[Tuple[int, int]]:
+        """Last match starting before position."""
+        i = bisect_left(self.starts, position) - 1
+        if i < 0:
+            if not wrap or not self.starts:
+                return None
+            i = len(self.starts) - 1
+        return self.starts[i], self.ends[i]
+
+    def contains(self, start: int, end: int) -> bool:
+        i = bisect_left(self.starts, start)
+        return i < len(self.starts) and self.starts[i] == start and self.ends[i] == end
+
+    def spans_between(self, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        """Matches that start inside [start, end)."""
+        i = bisect_left(self.starts, start)
+        while i < len(self.starts) and self.starts[i] < end:
+            yield self.starts[i], self.ends[i]
+            i += 1
+
+
+class MatchIndexJob(QObject):
+    """Fill a MatchIndex from pattern matches over text, a time slice per tick.
+
+    scope limits matching to the (start, end) document range. Matches
+    running into masked fold placeholders are skipped.
+    """
+    progress = Signal(int)   # matches found so far
+    finished = Signal(bool)  # True if the index is complete
+
+    def __init__(self, pattern: QRegularExpression, text: str, index: MatchIndex,
+                 scope: Optional[Tuple[int, int]] = None, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.timed_out = False
+        self._scope_end = scope[1] if scope else None
+        self._matches = pattern.globalMatch(text, scope[0] if scope else 0)
+        self._elapsed = 0.0
+        self._running = False
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._step)
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def start(self):
+        """Run the first slice now; small documents finish before this returns."""
+        self._running = True
+        self._step()
+        if self._running:
+            self._timer.start()
+
+    def run(self) -> bool:
+        """Finish synchronously (still bounded by SEARCH_TIMEOUT)."""
+        self._running = True
+        self._timer.stop()
+        while self._running:
+            self._step()
+        return self.index.complete
+
+    def cancel(self):
+        self._timer.stop()
+        self._running = False
+
+    def _step(self):
+        started = time.perf_counter()
+        deadline = started + SEARCH_TICK_BUDGET
+        matches, index, scope_end = self._matches, self.index, self._scope_end
+        done = True
+        while matches.hasNext():
+            match = matches.next()
+            start, end = match.capturedStart(), match.capturedEnd()
+            if scope_end is not None and end > scope_end:
+                break
+            if end > start and FOLD_MASK not in match.captured(0):
+                index.add(start, end)
+            if time.perf_counter() > deadline:
+                done = False
+                break
+
+        self._elapsed += time.perf_counter() - started
+        if done:
+            index.complete = True
+            self._finish(True)
+        elif self._elapsed > SEARCH_TIMEOUT:
+            self.timed_out = True
+            self._finish(False)
+        elif self._timer.isActive():
+            # Nobody can see progress while run() blocks the event loop
+            self.progress.emit(len(index))
+
+    def _finish(self, completed: bool):
+        self._timer.stop()
+        self._running = False
+        self.finished.emit(completed)
+
+
+_REPLACEMENT_TOKEN = re.compile(r"\$(?:(\d)|\{(\w+)\}|(\$))|\\([nt\\])")
+_ESCAPES = {"n": "\n", "t": "\t", "\\": "\\"}
+
+
+@lru_cache(maxsize=64)
+def parse_replacement(template: str) -> Tuple[Union[str, Tuple], ...]:
+    """Split a regex replacement template into literal text and group references.
+
+    $0-$9 and ${n} insert a numbered group ($0 is the whole match), ${name}
+    a named one and $$ a dollar sign; \\n, \\t and \\\\ insert a newline, a tab
+    and a backslash. Returns literal strings and (group,) tuples.
+    """
+    parts = []
+    literal = []
+    pos = 0
+    for token in _REPLACEMENT_TOKEN.finditer(template):
+        literal.append(template[pos:token.start()])
+        number, name, dollar, escape = token.groups()
+        if dollar:
+            literal.append("$")
+        elif escape:
+            literal.append(_ESCAPES[escape])
+        else:
+            parts.append("".join(literal))
+            literal = []
+            group = number or name
+            parts.append((int(group) if group.isdigit() else group,))
+        pos = token.end()
+    literal.append(template[pos:])
+    parts.append("".join(literal))
+    return tuple(part for part in parts if part != "")
+
+
+def has_group_references(parts) -> bool:
+    return any(isinstance(part, tuple) for part in parts)
+
+
+def expand_replacement(parts, match) -> str:
+    """Replacement text for one QRegularExpressionMatch."""
+    return "".join(part if isinstance(part, str) else match.captured(part[0])
+                   for part in parts)
+
+
+def collect_replacements(pattern: QRegularExpression, text: str, parts,
+                         scope: Optional[Tuple[int, int]] = None
+                         ) -> Optional[List[Tuple[int, int, str]]]:
+    """(start, end, replacement) for every non-empty match of pattern in text.
+
+    Matches running into masked fold placeholders are left alone.
+
+    Used when the replacement depends on each match's groups. Returns None
+    if matching takes longer than SEARCH_TIMEOUT.
+    """
+    deadline = time.perf_counter() + SEARCH_TIMEOUT
+    scope_end = scope[1] if scope else None
+    matches = pattern.globalMatch(text, scope[0] if scope else 0)
+    edits = []
+    while matches.hasNext():
+        match = matches.next()
+        start, end = match.capturedStart(), match.capturedEnd()
+        if scope_end is not None and end > scope_end:
+            break
+        if end > start and FOLD_MASK not in match.captured(0):
+            edits.append((start, end, expand_replacement(parts, match)))
+        if time.perf_counter() > deadline:
+            return None
+    return edits
@@ -1,13 +1,58 @@
 import re
+from PySide6.QtCore import QTimer
 from PySide6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor, QFont
 
+from src.constants import LONG_LINE_THRESHOLD, HIGHLIGHT_SLICE
+
 
 class MarkdownHighlighter(QSyntaxHighlighter):
     def __init__(self, parent=None, is_dark=False):
         super().__init__(parent)
         self._is_dark = is_dark
+        self._suspended = False
+        self._pending_blocks = None  # (next, last) block numbers to rehighlight
+        self._rehighlight_timer = QTimer(self)
+        self._rehighlight_timer.setInterval(0)
+        self._rehighlight_timer.timeout.connect(self._rehighlight_slice)
         self._build_rules()
 
+    @property
+    def is_suspended(self) -> bool:
+        return self._suspended
+
+    def suspend(self):
+        """Leave blocks unformatted until resume(), e.g. while a paste streams in."""
+        self._suspended = True
+
+    def resume(self, first_block: int, last_block: int):
+        """Resume and rehighlight the given block range a slice per event-loop tick."""
+        self._suspended = False
+        if self.document() is None:
+            return
+        if self._pending_blocks is not None:
+            first_block = min(first_block, self._pending_blocks[0])
+            last_block = max(last_block, self._pending_blocks[1])
+        self._pending_blocks = (first_block, last_block)
+        self._rehighlight_timer.start()
+
+    def _rehighlight_slice(self):
+        document = self.document()
+        if document is None or self._pending_blocks is None:
+            self._pending_blocks = None
+            self._rehighlight_timer.stop()
+            return
+        number, last = self._pending_blocks
+        block = document.findBlockByNumber(number)
+        end = min(number + HIGHLIGHT_SLICE, last + 1)
+        while block.isValid() and block.blockNumber() < end:
+            self.rehighlightBlock(block)
+            block = block.next()
+        if not block.isValid() or block.blockNumber() > last:
+            self._pending_blocks = None
+            self._rehighlight_timer.stop()
+        else:
+            self._pending_blocks = (block.blockNumber(), last)
+
     def set_dark_mode(self, is_dark):
         self._is_dark = is_dark
         self._build_rules()
@@ -112,6 +157,12 @@ class MarkdownHighlighter(QSyntaxHighlighter):
         self._rules.append((re.compile(r'^\s*-\s+\[[ xX]\]\s', re.MULTILINE), fmt))
 
     def highlightBlock(self, text):
+        if self._suspended:
+            return
+        # Pathological lines (minified JSON, base64) would make every
+        # keystroke on them rescan megabytes; leave them unformatted.
+        if len(text) > LONG_LINE_THRESHOLD:
+            return
         for pattern, fmt in self._rules:
             for match in pattern.finditer(text):
                 start = match.start()
@@ -0,0 +1,163 @@
+"""Minimal-span document edits.
+
+Rewriting a whole document with selectAll() + insertText() makes the undo
+stack hold a full copy of the old text. replace_changed_span() trims the
+common prefix and suffix first, so only the span that actually differs is
+removed and inserted — and recorded for undo. replace_spans() does the same
+for many known spans at once, e.g. every match of a Replace All, and
+replace_changed_lines() for the runs of lines a line diff finds, e.g. when
+a file changed on disk is reloaded.
+"""
+from difflib import SequenceMatcher
+from itertools import accumulate
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from PySide6.QtGui import QTextCursor
+
+_SCAN_BLOCK = 64 * 1024
+_GROUP_GAP = 4096  # characters between edits that still share one change notification
+
+
+def utf16_len(text: str) -> int:
+    """Length of text in QTextDocument positions (UTF-16 code units)."""
+    if text.isascii():
+        return len(text)
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _common_prefix_len(a: str, b: str, limit: int) -> int:
+    # Compare whole blocks at C speed, then bisect inside the first mismatch
+    pos = 0
+    while pos < limit:
+        end = min(pos + _SCAN_BLOCK, limit)
+        if a[pos:end] == b[pos:end]:
+            pos = end
+            continue
+        lo, hi = pos, end
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if a[pos:mid] == b[pos:mid]:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+    return limit
+
+
+def _common_suffix_len(a: str, b: str, limit: int) -> int:
+    size = 0
+    len_a, len_b = len(a), len(b)
+    while size < limit:
+        step = min(_SCAN_BLOCK, limit - size)
+        if a[len_a - size - step:len_a - size] == b[len_b - size - step:len_b - size]:
+            size += step
+            continue
+        lo, hi = size, size + step
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if a[len_a - mid:len_a - size] == b[len_b - mid:len_b - size]:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+    return limit
+
+
+def common_affixes(old: str, new: str) -> Tuple[int, int]:
+    """Return (prefix, suffix) lengths shared by old and new, never overlapping."""
+    limit = min(len(old), len(new))
+    prefix = _common_prefix_len(old, new, limit)
+    suffix = _common_suffix_len(old, new, limit - prefix)
+    return prefix, suffix
+
+
+def replace_changed_span(document, old: str, new: str) -> bool:
+    """Turn document (whose plain text is old) into new by editing only the changed span.
+
+    Returns False if there was nothing to change.
+    """
+    if old == new:
+        return False
+    prefix, suffix = common_affixes(old, new)
+    start = utf16_len(old[:prefix])
+    end = start + utf16_len(old[prefix:len(old) - suffix])
+
+    cursor = QTextCursor(document)
+    cursor.setPosition(start)
+    cursor.setPosition(end, QTextCursor.KeepAnchor)
+    cursor.insertText(new[prefix:len(new) - suffix])
+    return True
+
+
+def replace_spans(document, edits: Iterable[Tuple[int, int, str]]) -> int:
+    """Apply (start, end, replacement) edits as one undo step.
+
+    edits must be sorted by start and not overlap. They are applied back to
+    front, so the positions of the ones still to come stay valid, and each
+    edit removes and inserts only its own span.
+
+    Qt reports everything inside one edit block as a single change from the
+    first to the last edit, which would rehighlight every block in between.
+    Edits more than _GROUP_GAP apart therefore get their own edit block,
+    joined to the first for undo. Returns the number of edits applied.
+    """
+    edits = list(edits)
+    if not edits:
+        return 0
+    cursor = QTextCursor(document)
+    group_start = None
+    for start, end, replacement in reversed(edits):
+        if group_start is None:
+            cursor.beginEditBlock()
+        elif group_start - end > _GROUP_GAP:
+            cursor.endEditBlock()
+            cursor.joinPreviousEditBlock()
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        cursor.insertText(replacement)
+        group_start = start
+    cursor.endEditBlock()
+    return len(edits)
+
+
+def replace_changed_lines(document, old_lines: List[str], new_lines: List[str],
+                          compare: Optional[Callable[[str], str]] = None,
+                          render: Optional[Callable[[str], str]] = None) -> int:
+    """Turn document into new_lines by replacing only the runs of lines that differ.
+
+    old_lines are the document's lines, each with its "\n" (see
+    text_merge.split_lines). compare, if given, maps a document line to
+    the form new_lines use (e.g. with folds expanded); render maps inserted
+    text to the form the document holds. Applied as one undo step; returns
+    the number of runs replaced.
+    """
+    if compare is not None:
+        compared = [compare(line) for line in old_lines]
+    else:
+        compared = old_lines
+    # Trim unchanged lines at both ends before the (quadratic) line matcher
+    limit = min(len(compared), len(new_lines))
+    prefix = 0
+    while prefix < limit and compared[prefix] == new_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < limit - prefix
+           and compared[-1 - suffix] == new_lines[-1 - suffix]):
+        suffix += 1
+    old_middle = compared[prefix:len(compared) - suffix]
+    new_middle = new_lines[prefix:len(new_lines) - suffix]
+    if old_middle == new_middle:
+        return 0
+
+    offsets = list(accumulate(map(utf16_len, old_lines)))
+    offsets.insert(0, 0)
+    edits = []
+    matcher = SequenceMatcher(None, old_middle, new_middle, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        replacement = "".join(new_middle[j1:j2])
+        if render is not None:
+            replacement = render(replacement)
+        edits.append((offsets[prefix + i1], offsets[prefix + i2], replacement))
+    return replace_spans(document, edits)
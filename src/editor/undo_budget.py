@@ -0,0 +1,116 @@
+"""UndoMemoryMonitor — keeps a QTextDocument's undo history under a memory budget.
+
+Qt does not report how much memory the undo stack holds. An undo step keeps
+the text it removed, and the text it inserted stays in the document's fragment
+buffer while the step can still be undone or redone, so a step costs roughly
+(removed + added) UTF-16 code units. The monitor tracks that estimate per step
+from contentsChange and the document's undo/redo counters.
+
+Qt has no API to drop individual old steps, so past the budget the history is
+cleared as a whole (which also lets Qt compact its fragment buffer) and
+history_trimmed reports how much was released. That happens once the next step
+is recorded, never right after the step that crossed the budget: a large
+Replace All or paste can always be undone straight away.
+"""
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from src.constants import UNDO_MEMORY_BUDGET
+
+
+class UndoMemoryMonitor(QObject):
+    history_trimmed = Signal(int)  # estimated bytes released
+
+    def __init__(self, document, budget: int = UNDO_MEMORY_BUDGET, parent=None):
+        super().__init__(parent)
+        self._document = document
+        self.budget = budget
+        # [undo counter after the step, estimated bytes]; redo is a stack
+        self._undo = []
+        self._redo = []
+        self._bytes = 0
+        self._command_added = False
+        self._trim_pending = False
+        self._sync_counters()
+        document.undoCommandAdded.connect(self._on_undo_command_added)
+        document.contentsChange.connect(self._on_contents_change)
+
+    @property
+    def estimated_bytes(self) -> int:
+        return self._bytes
+
+    @property
+    def undo_steps(self) -> int:
+        return len(self._undo)
+
+    @property
+    def redo_steps(self) -> int:
+        return len(self._redo)
+
+    @property
+    def over_budget(self) -> bool:
+        """Whether recording the next step will clear the history."""
+        return self._bytes > self.budget
+
+    def trim(self) -> int:
+        """Clear the undo/redo history now; returns the estimated bytes released."""
+        self._trim_pending = False
+        released = self._bytes
+        self._document.clearUndoRedoStacks()
+        self._reset()
+        if released:
+            self.history_trimmed.emit(released)
+        return released
+
+    def _reset(self):
+        self._undo = []
+        self._redo = []
+        self._bytes = 0
+        self._sync_counters()
+
+    def _sync_counters(self):
+        self._undo_count = self._document.availableUndoSteps()
+
+    def _on_undo_command_added(self):
+        # Fires before the matching contentsChange; undo/redo never fire it
+        self._command_added = True
+
+    def _on_contents_change(self, position: int, removed: int, added: int):
+        size = (removed + added) * 2
+        undo_count = self._document.availableUndoSteps()
+        # availableRedoSteps() is unreliable here; isRedoAvailable() is not
+        redo_available = self._document.isRedoAvailable()
+
+        if undo_count == 0 and not redo_available:
+            # setPlainText(), undo disabled, or the stacks were cleared
+            self._command_added = False
+            self._reset()
+            return
+
+        if self._command_added and undo_count == self._undo_count and self._undo:
+            # joinPreviousEditBlock(): reported as added, but it grew the last step
+            self._command_added = False
+            self._undo[-1][1] += size
+            self._bytes += size
+        elif self._command_added:
+            self._command_added = False
+            self._bytes -= sum(step[1] for step in self._redo)
+            self._redo = []
+            if self._bytes > self.budget and not self._trim_pending:
+                # The steps before this one are over the budget. Never clear
+                # the stacks from inside the document's own edit.
+                self._trim_pending = True
+                QTimer.singleShot(0, self.trim)
+            self._undo.append([undo_count, size])
+            self._bytes += size
+        elif undo_count < self._undo_count:
+            while self._undo and self._undo[-1][0] > undo_count:
+                self._redo.append(self._undo.pop())
+        elif undo_count > self._undo_count:
+            while self._redo and self._redo[-1][0] <= undo_count:
+                self._undo.append(self._redo.pop())
+        elif not redo_available and self._undo:
+            # Typing merged into the previous command
+            self._undo[-1][1] += size
+            self._bytes += size
+
+        self._undo_count = undo_count
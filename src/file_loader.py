@@ -0,0 +1,165 @@
+"""Text file loading — encoding sniffing and chunked decoding from a memory map.
+
+detect_encoding() looks at the first bytes of a file: a byte-order mark
+decides outright; otherwise UTF-16 without a BOM is recognised by its NUL
+bytes, and the first of UTF-8, CP949, the locale's encoding and CP1252
+that decodes the sample cleanly wins (Latin-1 decodes anything). CP949
+also has to read as Korean: it accepts ASCII trail bytes, so most
+Western text decodes as CP949 too, into syllables Korean hardly uses.
+
+TextSource decodes a file from a read-only memory map a chunk at a time,
+so a large file is never held as one bytes object plus one str; line
+endings are normalised to "\n" as open() in text mode would. Bytes that
+turn out to be invalid after the sample are replaced with U+FFFD
+(TextSource.replaced tells). While decoding it also computes the text's
+content_digest and length, which is all the dirty tracking needs.
+"""
+import codecs
+import hashlib
+import locale
+import mmap
+import os
+import re
+from pathlib import Path
+from typing import Iterator, Optional
+
+from src.constants import LOAD_CHUNK_SIZE, ENCODING_SAMPLE_SIZE
+from src.file_writer import DIGEST_SIZE, TextEncoding, UTF8
+
+_BOMS = (
+    # UTF-32 LE first: its BOM starts with the UTF-16 LE one
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+_FALLBACK_CODECS = ("utf-8", "cp949")  # then the locale's encoding, cp1252, latin-1
+# A CP949 double-byte character; group 1 is set for a trail byte outside KS X 1001
+_CP949_PAIR = re.compile(rb"[\x81-\xfe](?:[\xa1-\xfe]|([\x41-\xa0]))")
+
+
+def _decodes(sample: bytes, codec: str, final: bool) -> bool:
+    try:
+        # Incremental, so a character cut off by the end of the sample is fine
+        codecs.getincrementaldecoder(codec)("strict").decode(sample, final)
+    except (UnicodeDecodeError, LookupError):
+        return False
+    return True
+
+
+def _reads_as_korean(sample: bytes) -> bool:
+    """Whether a sample that decodes as CP949 is Korean, not another code page.
+
+    A CP1252 letter like Ä followed by an ASCII letter is a valid CP949 pair,
+    but one of the extension's rarely used syllables; Korean text keeps
+    mostly to the KS X 1001 set, whose trail bytes are 0xA1-0xFE.
+    """
+    # Decoding succeeded, so scanning from the start keeps to whole pairs
+    pairs = _CP949_PAIR.findall(sample)
+    return 2 * sum(map(bool, pairs)) <= len(pairs)
+
+
+def detect_encoding(sample: bytes, complete: bool = False) -> TextEncoding:
+    """Guess the encoding of a file from its first bytes.
+
+    complete means sample is the whole file (no character is cut off).
+    """
+    for bom, codec in _BOMS:
+        if sample.startswith(bom):
+            return TextEncoding(codec, bom)
+    if not sample:
+        return UTF8
+
+    # Mostly-ASCII UTF-16 has a NUL in every other byte
+    pairs = len(sample) // 2
+    if pairs and sample.count(0) > pairs // 2:
+        odd_nuls = sample[1::2].count(0)
+        even_nuls = sample[0::2].count(0)
+        if odd_nuls > even_nuls * 4:
+            return TextEncoding("utf-16-le")
+        if even_nuls > odd_nuls * 4:
+            return TextEncoding("utf-16-be")
+
+    candidates = list(_FALLBACK_CODECS)
+    preferred = codecs.lookup(locale.getpreferredencoding(False)).name
+    candidates += [preferred, "cp1252"]
+    for codec in candidates:
+        name = codecs.lookup(codec).name
+        if not _decodes(sample, name, complete):
+            continue
+        if name == "cp949" and not _reads_as_korean(sample):
+            continue
+        return TextEncoding(name)
+    return TextEncoding("latin-1")
+
+
+class TextSource:
+    """A text file opened for decoding, with its encoding sniffed from the first bytes."""
+
+    def __init__(self, path, encoding: Optional[TextEncoding] = None):
+        """Raises OSError. encoding skips detection (e.g. to reread a known file)."""
+        self.path = Path(path)
+        self.size = os.stat(self.path).st_size
+        if encoding is None:
+            with open(self.path, "rb") as f:
+                sample = f.read(ENCODING_SAMPLE_SIZE)
+            encoding = detect_encoding(sample, complete=len(sample) >= self.size)
+        self.encoding = encoding
+        self.consumed = 0       # bytes decoded so far, for progress
+        self.replaced = False   # True once invalid bytes were replaced with U+FFFD
+        self.length = 0         # characters decoded so far
+        self.digest: Optional[bytes] = None  # content_digest of the text, once fully read
+
+    def chunks(self, chunk_size: int = LOAD_CHUNK_SIZE) -> Iterator[str]:
+        """Decoded text, about chunk_size bytes at a time. Raises OSError."""
+        decoder = codecs.getincrementaldecoder(self.encoding.codec)("strict")
+        hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        self.consumed = self.length = 0
+        self.replaced = False
+        carry_cr = False
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                view = b""  # an empty file cannot be mapped
+            else:
+                view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                size = len(view)
+                bom = self.encoding.bom
+                position = len(bom) if bom and view[:len(bom)] == bom else 0
+                while True:
+                    end = min(position + chunk_size, size)
+                    final = end >= size
+                    text = self._decode(decoder, view[position:end], final)
+                    position = self.consumed = end
+                    # Universal newlines; a "\r" at the end may be half of "\r\n"
+                    if carry_cr:
+                        text = "\r" + text
+                    carry_cr = not final and text.endswith("\r")
+                    if carry_cr:
+                        text = text[:-1]
+                    if "\r" in text:
+                        text = text.replace("\r\n", "\n").replace("\r", "\n")
+                    if text:
+                        hasher.update(text.encode("utf-8"))
+                        self.length += len(text)
+                        yield text
+                    if final:
+                        break
+            finally:
+                if isinstance(view, mmap.mmap):
+                    view.close()
+        self.digest = hasher.digest()
+
+    def read(self) -> str:
+        """The whole decoded text at once (for files below the large-file threshold)."""
+        return "".join(self.chunks())
+
+    def _decode(self, decoder, data: bytes, final: bool) -> str:
+        try:
+            return decoder.decode(data, final)
+        except UnicodeDecodeError:
+            # The sample looked fine but this part does not: keep going, but say so
+            decoder.errors = "replace"
+            self.replaced = True
+            return decoder.decode(data, final)
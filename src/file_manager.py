@@ -2,25 +2,67 @@
 
 Separated from MainWindow to follow Single Responsibility Principle.
 No UI dependencies — pure Python + QSettings for persistence.
+
+The saved state is kept as the text's length and content digest rather
+than a second full copy of the document. Only the base a three-way merge
+needs is kept, zlib-compressed, and not at all for large files.
 """
+import zlib
 from pathlib import Path
 
-from src.constants import MAX_RECENT_FILES
+from src.constants import MAX_RECENT_FILES, LARGE_FILE_THRESHOLD, SAVE_SHUTDOWN_TIMEOUT
+from src.file_loader import TextSource
+from src.file_writer import FileWriter, UTF8, content_digest
+
+_MERGE_BASE_LEVEL = 1  # zlib level: markdown still shrinks about 3x, at a fraction of the time
+
+_EMPTY_DIGEST = content_digest("")
 
 
 class FileManager:
-    def __init__(self, settings):
+    def __init__(self, settings, writer=None, recent_files=None):
+        """writer and recent_files may be shared by the file managers of one window."""
         self.settings = settings
         self.current_file = None
         self.base_path = Path.cwd()
         self._dirty = False
-        self._saved_text = ""
-        self.recent_files = self._load_recent_files()
+        self._saved_length = 0
+        self._saved_digest = _EMPTY_DIGEST
+        self.encoding = UTF8  # of the current file; saves keep it
+        self.decoding_errors = False  # invalid bytes were replaced while loading
+        self._merge_base = None  # compressed saved text, for merging external changes
+        self.large_file_mode = False
+        # Set writer.on_finished to hear about background saves
+        self.writer = writer if writer is not None else FileWriter()
+        if recent_files is None:
+            recent_files = self.load_recent_files(settings)
+        self.recent_files = recent_files  # updated in place, so sharing it works
 
     @property
     def is_dirty(self):
         return self._dirty
 
+    @property
+    def saved_digest(self) -> bytes:
+        """content_digest of the text as last loaded or saved."""
+        return self._saved_digest
+
+    def matches_saved(self, text) -> bool:
+        """True if text is the text as last loaded or saved (the length check is free)."""
+        return len(text) == self._saved_length and content_digest(text) == self._saved_digest
+
+    def base_text(self):
+        """The text as last loaded or saved, or None if it was not kept (large files)."""
+        if self._merge_base is None:
+            return None
+        return zlib.decompress(self._merge_base).decode("utf-8")
+
+    def _set_merge_base(self, text):
+        if text is None or len(text) >= self.large_file_threshold:
+            self._merge_base = None
+        else:
+            self._merge_base = zlib.compress(text.encode("utf-8"), _MERGE_BASE_LEVEL)
+
     def get_initial_dir(self):
         if self.current_file:
             return str(self.current_file.parent)
@@ -29,54 +71,140 @@ class FileManager:
             return last_dir
         return ""
 
+    @property
+    def large_file_threshold(self):
+        value = self.settings.value("large_file_threshold", LARGE_FILE_THRESHOLD)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return LARGE_FILE_THRESHOLD
+
+    def is_large_file(self, file_path):
+        """True if the file should be opened in large-file mode. Raises OSError."""
+        return Path(file_path).stat().st_size >= self.large_file_threshold
+
     def load_file(self, file_path):
-        """Load file content. Returns content string. Raises OSError on failure."""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        """Load file content in its detected encoding. Returns content string.
+
+        Raises OSError on failure.
+        """
+        source = TextSource(file_path)
+        content = source.read()
+        self.finish_load(file_path, source, content)
+        return content
+
+    def open_text(self, file_path):
+        """TextSource for streaming file_path; call finish_load() once its chunks are consumed.
+
+        Raises OSError.
+        """
+        return TextSource(file_path)
+
+    def finish_load(self, file_path, source, text=None):
+        """Make file_path the current document, saved as fully read from source.
+
+        text, if given, is what source decoded to; it becomes the merge base.
+        """
         self.current_file = Path(file_path)
         self.base_path = self.current_file.parent
         self._dirty = False
-        self._saved_text = content
+        self.accept_disk_version(source, text)
         self.add_recent_file(file_path)
         self.settings.setValue("last_directory", str(self.current_file.parent))
-        return content
+
+    def disk_change(self):
+        """(text, TextSource) of the current file if something else changed it
+        since we loaded or saved it; None if it has not changed.
+
+        The file's mtime and size are checked first, so this is cheap until
+        they change; then its content digest, so a touch or a rewrite of the
+        same content does not count. Raises OSError, FileNotFoundError if the
+        file is gone.
+        """
+        path = self.current_file
+        if path is None or self.writer.is_busy(path):
+            return None  # nothing on disk, or our own save is under way
+        digest, unchanged = self.writer.last_written(path)
+        if unchanged:
+            return None
+        source = TextSource(path)
+        text = source.read()
+        if source.digest == digest:
+            self.writer.remember(path, digest)  # only the metadata changed
+            return None
+        return text, source
+
+    def accept_disk_version(self, source, text=None):
+        """Take the file as fully read from source as the saved state.
+
+        The document itself is not touched: after keeping local edits over
+        an external change, mark_dirty() then compares them with the file.
+        """
+        self._saved_length = source.length
+        self._saved_digest = source.digest
+        self.encoding = source.encoding
+        self.decoding_errors = source.replaced
+        self._set_merge_base(text)
+        self.writer.remember(source.path, source.digest)
 
     def write_file(self, path, content):
-        """Write content to file. Raises OSError on failure."""
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        """Atomically write content to file; returns a SaveResult.
+
+        Raises OSError on failure, or UnicodeEncodeError if self.encoding
+        cannot represent content (nothing is written then).
+
+        Skips the write if path already holds content from our last save.
+        """
+        return self.writer.write(path, content, self.encoding)
+
+    def write_file_async(self, path, content):
+        """Queue an atomic write on the writer thread (see FileWriter.write_async)."""
+        self.writer.write_async(path, content, self.encoding)
+
+    def shutdown(self):
+        """Let queued background saves finish before the application exits."""
+        self.writer.close(SAVE_SHUTDOWN_TIMEOUT)
 
     def mark_dirty(self, current_text):
         """Mark as dirty if text differs from saved. Returns True if state changed."""
-        if not self._dirty and current_text != self._saved_text:
+        if not self._dirty and not self.matches_saved(current_text):
             self._dirty = True
             return True
         return False
 
-    def mark_saved(self, text):
-        """Clear dirty flag after save."""
+    def mark_saved(self, text, digest=None):
+        """Clear dirty flag after save; digest, if known, is content_digest(text)."""
         self._dirty = False
-        self._saved_text = text
+        self._saved_length = len(text)
+        self._saved_digest = digest if digest is not None else content_digest(text)
+        self._set_merge_base(text)
 
     def new_file(self):
         """Reset state for a new file."""
         self.current_file = None
         self._dirty = False
-        self._saved_text = ""
+        self._saved_length = 0
+        self._saved_digest = _EMPTY_DIGEST
+        self.encoding = UTF8
+        self.decoding_errors = False
+        self._merge_base = None
 
     def get_title(self):
         """Get window title string based on current state."""
         title = "Markdown Editor"
         if self.current_file:
             title = f"{self.current_file.name} - {title}"
+        if self.large_file_mode:
+            title = f"[Large File Mode] {title}"
         if self._dirty:
             title = f"* {title}"
         return title
 
     # ===== Recent Files =====
 
-    def _load_recent_files(self):
-        files = self.settings.value("recent_files", [])
+    @staticmethod
+    def load_recent_files(settings):
+        files = settings.value("recent_files", [])
         if files is None:
             return []
         return [f for f in files if Path(f).exists()]
@@ -88,9 +216,9 @@ class FileManager:
         if file_path in self.recent_files:
             self.recent_files.remove(file_path)
         self.recent_files.insert(0, file_path)
-        self.recent_files = self.recent_files[:MAX_RECENT_FILES]
+        del self.recent_files[MAX_RECENT_FILES:]
         self.save_recent_files()
 
     def clear_recent_files(self):
-        self.recent_files = []
+        self.recent_files.clear()
         self.save_recent_files()
@@ -0,0 +1,91 @@
+"""FileWatcher — notices when the open file or the images it shows change on disk.
+
+QFileSystemWatcher reports every write, and other tools often write a file
+in several steps or replace it by renaming a new file over it, which ends
+the watch on the old one. Events are therefore left to settle for
+WATCH_SETTLE_DELAY before anything is reported, and replaced paths are
+watched again.
+
+Only the notification happens here. Whether the document really changed
+is for FileManager.disk_change() to decide (mtime and size first, then
+the content digest); images count as changed when their mtime or size did.
+"""
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from PySide6.QtCore import QObject, QFileSystemWatcher, QTimer, Signal
+
+from src.constants import WATCH_SETTLE_DELAY
+from src.file_writer import stat_key
+
+
+class FileWatcher(QObject):
+    document_changed = Signal()  # the document's file was written, replaced or removed
+    images_changed = Signal()    # at least one watched image has new content
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_file_changed)
+        self._document: Optional[Path] = None
+        self._images: Dict[Path, Optional[Tuple[int, int]]] = {}  # path -> stat_key
+        self._changed: Set[Path] = set()
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.setInterval(WATCH_SETTLE_DELAY)
+        self._settle_timer.timeout.connect(self._settle)
+
+    @property
+    def document(self) -> Optional[Path]:
+        return self._document
+
+    def watch_document(self, path):
+        """Watch path (None: nothing) as the document, instead of the previous one."""
+        path = Path(path) if path is not None else None
+        if path == self._document:
+            self._add(path)  # a save may have replaced the file
+            return
+        if self._document is not None and self._document not in self._images:
+            self._remove(self._document)
+        self._document = path
+        self._add(path)
+
+    def watch_images(self, paths: Iterable[Path]):
+        """Watch exactly these image files (in addition to the document)."""
+        wanted = set(paths)
+        for path in set(self._images) - wanted:
+            del self._images[path]
+            if path != self._document:
+                self._remove(path)
+        for path in wanted - set(self._images):
+            self._images[path] = stat_key(path)
+            self._add(path)
+
+    def _add(self, path: Optional[Path]):
+        if path is None or str(path) in self._watcher.files():
+            return
+        if path.exists():
+            self._watcher.addPath(str(path))
+
+    def _remove(self, path: Path):
+        if str(path) in self._watcher.files():
+            self._watcher.removePath(str(path))
+
+    def _on_file_changed(self, path: str):
+        self._changed.add(Path(path))
+        self._settle_timer.start()  # restarted by every event until writes stop
+
+    def _settle(self):
+        changed, self._changed = self._changed, set()
+        for path in changed:
+            self._add(path)  # watch the file that replaced it, if any
+        if self._document in changed:
+            self.document_changed.emit()
+        images_changed = False
+        for path in changed & set(self._images):
+            key = stat_key(path)
+            if key != self._images[path]:
+                self._images[path] = key
+                images_changed = True
+        if images_changed:
+            self.images_changed.emit()
@@ -0,0 +1,293 @@
+"""Crash-safe file saving — atomic writes, unchanged-content check, background writer.
+
+atomic_write() encodes the text (TextEncoding: codec plus byte-order mark,
+platform line endings), writes it to a temporary file next to the target,
+fsyncs it and renames it over the target, so a crash or a full disk
+mid-save leaves either the old file or the new one, never a truncated mix.
+
+FileWriter remembers a digest of the content last written to each path
+and skips a save whose content matches it, unless the file on disk has
+changed since (last_written() lets others ask the same question). Its
+background thread serves autosaves: queued saves of the same path
+coalesce to the newest content, and each result is handed to a callback
+on the writer thread. No Qt here — the caller decides how to get results
+back to its own thread. Given a LocalHistory, every save that writes also
+snapshots the text there, always on the writer thread, so an explicit
+save returns as soon as the file is written.
+"""
+import hashlib
+import os
+import stat
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+DIGEST_SIZE = 16
+
+
+class TextEncoding(NamedTuple):
+    codec: str          # Python codec name, e.g. "utf-8", "utf-16-le", "cp949"
+    bom: bytes = b""    # byte-order mark written before the text
+
+    @property
+    def name(self) -> str:
+        """Label for the status bar, e.g. "UTF-8 with BOM" or "UTF-16 LE"."""
+        label = self.codec.upper().replace("-LE", " LE").replace("-BE", " BE")
+        if self.bom and self.codec == "utf-8":
+            label += " with BOM"
+        return label
+
+
+UTF8 = TextEncoding("utf-8")
+
+
+class SaveResult(NamedTuple):
+    path: Path
+    content: str
+    written: bool            # False if skipped because nothing changed
+    elapsed: float           # seconds
+    error: Optional[Exception] = None
+    digest: Optional[bytes] = None  # content_digest(content), if it got that far
+
+
+def content_digest(content: str) -> bytes:
+    """Digest of text as it is held in memory (independent of the file encoding)."""
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+@lru_cache(maxsize=1)
+def _default_mode() -> int:
+    """Permissions a new file gets from open(): 0o666 less the umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def atomic_write(path, content: str, encoding: TextEncoding = UTF8):
+    """Replace path with content via temp file, fsync and rename.
+
+    Raises OSError, or UnicodeEncodeError if the encoding cannot represent
+    content. The file keeps its permissions; a symlink keeps pointing at
+    the (replaced) file it pointed at before.
+    """
+    if os.linesep != "\n":
+        content = content.replace("\n", os.linesep)
+    data = encoding.bom + content.encode(encoding.codec)
+    target = Path(os.path.realpath(path))
+    try:
+        mode = stat.S_IMODE(target.stat().st_mode)
+    except FileNotFoundError:
+        mode = _default_mode()
+
+    fd, temp_path = tempfile.mkstemp(dir=str(target.parent), prefix=f".{target.name}.",
+                                     suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, target)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(target.parent)
+
+
+def _fsync_directory(directory: Path):
+    """Make the rename itself durable (POSIX only; best effort)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    try:
+        fd = os.open(str(directory), os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def stat_key(path) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of path, or None if it cannot be stat'ed; cheap change detection."""
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return info.st_mtime_ns, info.st_size
+
+
+class FileWriter:
+    """Writes files atomically, skipping unchanged content; optionally in the background.
+
+    on_finished(SaveResult) is called on the writer thread after each
+    background save, including failed ones (result.error is set).
+    """
+
+    def __init__(self, on_finished: Optional[Callable[[SaveResult], None]] = None,
+                 history=None):
+        self.on_finished = on_finished
+        self.history = history  # LocalHistory, or None for no snapshots
+        self._lock = threading.Condition()
+        # path -> (digest of the content last written, (mtime_ns, size) after writing)
+        self._written: Dict[Path, Tuple[bytes, Optional[Tuple[int, int]]]] = {}
+        self._pending: Dict[Path, Tuple[str, TextEncoding]] = {}  # newest queued save per path
+        self._active: Optional[Path] = None  # path the thread is writing now
+        # (path, content, reason, digest) of written saves still to snapshot
+        self._snapshots: List[Tuple[Path, str, str, bytes]] = []
+        self._snapshotting = False
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+
+    def remember(self, path, digest: bytes):
+        """Record that path holds text with this content_digest, e.g. right after loading it."""
+        path = Path(path)
+        with self._lock:
+            self._written[path] = (digest, stat_key(path))
+
+    def last_written(self, path) -> Tuple[Optional[bytes], bool]:
+        """(digest of the content last written to or loaded from path, or None;
+        whether the file's mtime and size are still what they were then)."""
+        path = Path(path)
+        with self._lock:
+            record = self._written.get(path)
+        if record is None:
+            return None, False
+        return record[0], record[1] == stat_key(path)
+
+    def is_busy(self, path) -> bool:
+        """True while a background save of path is queued or being written."""
+        path = Path(path)
+        with self._lock:
+            return path in self._pending or self._active == path
+
+    def write(self, path, content: str, encoding: TextEncoding = UTF8) -> SaveResult:
+        """Save now on the calling thread. Raises OSError or UnicodeEncodeError.
+
+        A queued background save of the same path is dropped (this one is
+        newer), and one already in progress is waited for first.
+        """
+        path = Path(path)
+        with self._lock:
+            self._pending.pop(path, None)
+            while self._active == path:
+                self._lock.wait()
+        result = self._write(path, content, encoding)
+        if result.written and self.history is not None:
+            with self._lock:
+                self._snapshots.append((path, content, "save", result.digest))
+                self._start_thread()
+                self._lock.notify_all()
+        return result
+
+    def write_async(self, path, content: str, encoding: TextEncoding = UTF8):
+        """Queue a background save; replaces any save of path still waiting."""
+        path = Path(path)
+        with self._lock:
+            if self._closing:
+                return
+            self._pending[path] = (content, encoding)
+            self._start_thread()
+            self._lock.notify_all()
+
+    def _start_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="FileWriter", daemon=True)
+            self._thread.start()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued save and snapshot has finished; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._busy():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def _busy(self) -> bool:
+        return bool(self._pending or self._active is not None
+                    or self._snapshots or self._snapshotting)
+
+    def close(self, timeout: Optional[float] = None):
+        """Finish queued saves and snapshots and stop the thread (waiting at most timeout)."""
+        with self._lock:
+            self._closing = True
+            self._lock.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _write(self, path: Path, content: str, encoding: TextEncoding) -> SaveResult:
+        started = time.perf_counter()
+        digest = content_digest(content)
+        with self._lock:
+            record = self._written.get(path)
+        if record is not None and record == (digest, stat_key(path)):
+            return SaveResult(path, content, False, time.perf_counter() - started,
+                              digest=digest)
+        atomic_write(path, content, encoding)
+        with self._lock:
+            self._written[path] = (digest, stat_key(path))
+        return SaveResult(path, content, True, time.perf_counter() - started, digest=digest)
+
+    def _snapshot(self, path: Path, content: str, reason: str, digest: bytes):
+        try:
+            self.history.snapshot(path, content, reason, digest)
+        except (OSError, ValueError):
+            pass  # the file is saved; only this version is missing from history
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._snapshots and not self._closing:
+                    self._lock.wait()
+                # Saves first: a snapshot only matters once its file is safe
+                if self._pending:
+                    path = next(iter(self._pending))
+                    content, encoding = self._pending.pop(path)
+                    self._active = path
+                elif self._snapshots:
+                    snapshot = self._snapshots.pop(0)
+                    self._snapshotting = True
+                else:
+                    return  # closing with nothing left to do
+            if self._snapshotting:
+                self._run_snapshot(snapshot)
+            else:
+                self._run_save(path, content, encoding)
+
+    def _run_save(self, path: Path, content: str, encoding: TextEncoding):
+        started = time.perf_counter()
+        result = None
+        try:
+            try:
+                result = self._write(path, content, encoding)
+            except (OSError, ValueError) as e:  # ValueError: unencodable text
+                result = SaveResult(path, content, False, time.perf_counter() - started, e)
+            if self.on_finished is not None:
+                self.on_finished(result)
+        finally:
+            with self._lock:
+                self._active = None
+                if result is not None and result.written and self.history is not None:
+                    self._snapshots.append((path, content, "autosave", result.digest))
+                self._lock.notify_all()
+
+    def _run_snapshot(self, snapshot: Tuple[Path, str, str, bytes]):
+        try:
+            self._snapshot(*snapshot)
+        finally:
+            with self._lock:
+                self._snapshotting = False
+                self._lock.notify_all()
@@ -0,0 +1,96 @@
+from PySide6.QtWidgets import (
+    QDialog, QDialogButtonBox, QLabel, QListWidget, QListWidgetItem,
+    QPlainTextEdit, QSplitter, QVBoxLayout, QWidget
+)
+from PySide6.QtCore import Qt, QDateTime
+from PySide6.QtGui import QFont
+
+from src.local_history import diff_lines
+
+_SNAPSHOT_ROLE = Qt.UserRole + 1
+
+
+class HistoryDialog(QDialog):
+    """Versions of one file from the local history, each diffed against the editor.
+
+    exec() returns Accepted with restored_text set when the user restores one.
+    """
+
+    def __init__(self, history, path, current_text, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.current_text = current_text
+        self.restored_text = None
+        self._selected_text = None
+        self.setWindowTitle(f"Local History - {path.name}")
+        self.resize(900, 600)
+        self._setup_ui()
+        for snapshot in history.versions(path):
+            when = QDateTime.fromMSecsSinceEpoch(int(snapshot.time * 1000))
+            item = QListWidgetItem(
+                f"{when.toString('yyyy-MM-dd hh:mm:ss')}  {snapshot.reason}  "
+                f"({snapshot.length:,} characters)"
+            )
+            item.setData(_SNAPSHOT_ROLE, snapshot)
+            self.versions.addItem(item)
+        if self.versions.count():
+            self.versions.setCurrentRow(0)
+        else:
+            self.diff_view.setPlainText("No versions yet: they are recorded when the file is saved.")
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        splitter = QSplitter(Qt.Horizontal)
+        self.versions = QListWidget()
+        self.versions.currentItemChanged.connect(self._show_version)
+        splitter.addWidget(self.versions)
+
+        right = QWidget()
+        right_layout = QVBoxLayout(right)
+        right_layout.setContentsMargins(0, 0, 0, 0)
+        self.summary = QLabel("")
+        right_layout.addWidget(self.summary)
+        self.diff_view = QPlainTextEdit()
+        self.diff_view.setReadOnly(True)
+        self.diff_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        font = QFont("Consolas")
+        font.setStyleHint(QFont.Monospace)
+        self.diff_view.setFont(font)
+        right_layout.addWidget(self.diff_view)
+        splitter.addWidget(right)
+        splitter.setSizes([300, 600])
+        layout.addWidget(splitter)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        self.restore_button = buttons.addButton("Restore", QDialogButtonBox.AcceptRole)
+        self.restore_button.setEnabled(False)
+        buttons.accepted.connect(self._restore)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def _show_version(self, item, _previous=None):
+        self._selected_text = None
+        self.restore_button.setEnabled(False)
+        if item is None:
+            return
+        snapshot = item.data(_SNAPSHOT_ROLE)
+        try:
+            text = self.history.text(snapshot)
+        except (OSError, ValueError) as e:
+            self.summary.setText("")
+            self.diff_view.setPlainText(f"This version could not be read:\n{e}")
+            return
+        lines = diff_lines(text, self.current_text, "Version", "Editor")
+        added = sum(1 for line in lines if line.startswith("+") and not line.startswith("+++"))
+        removed = sum(1 for line in lines if line.startswith("-") and not line.startswith("---"))
+        self.summary.setText(f"Compared with the editor: +{added} -{removed} lines"
+                             if lines else "Same as the editor")
+        self.diff_view.setPlainText("".join(lines))
+        self._selected_text = text
+        self.restore_button.setEnabled(bool(lines))
+
+    def _restore(self):
+        if self._selected_text is not None:
+            self.restored_text = self._selected_text
+            self.accept()
@@ -0,0 +1,385 @@
+"""LocalHistory — earlier versions of documents, kept without git.
+
+Every save and autosave that writes a file also snapshots its text here.
+The text (as UTF-8) is cut into chunks at content-defined boundaries: a
+gear rolling hash over the bytes ends a chunk where its top bits are all
+zero, so an edit changes only the chunks around it and the boundaries
+after it fall where they did before. Chunks are named by their digest and
+stored zlib-compressed once, however many versions or files share them.
+
+The cost of a snapshot follows what changed. The previous version of the
+file is read back from its chunks (nothing is kept in memory between
+snapshots); the bytes it shares with the new version at the start and at
+the end are found by plain comparison, and only the chunks in between are
+cut, hashed, compressed and written. The rest of the chunk list is reused
+as it is. Documents over HISTORY_MAX_DOCUMENT characters are not recorded:
+cutting them from scratch would take seconds.
+
+Layout of the history directory:
+
+    chunks/ab/abcdef...      zlib-compressed chunk, named by its digest
+    documents/<key>.jsonl    one JSON line per snapshot of one file:
+        {"id": "...", "time": t, "reason": "save" | "autosave", "path": "...",
+         "digest": "...", "length": n, "chunks": [["abcdef...", stored, size], ...]}
+
+Listing reads only the small per-file index. prune() drops snapshots
+older than the maximum age, then the oldest ones until the chunks still
+referenced fit the size budget (each file keeps its newest snapshot),
+and deletes the chunks nothing refers to any more. No Qt here: snapshots
+are taken on the file writer's thread.
+"""
+import difflib
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.constants import (
+    HISTORY_MAX_AGE, HISTORY_MAX_SIZE, HISTORY_PRUNE_EVERY, HISTORY_MAX_DOCUMENT,
+    HISTORY_CHUNK_MIN, HISTORY_CHUNK_MAX, HISTORY_CHUNK_BITS,
+)
+from src.file_writer import atomic_write, content_digest
+from src.utils.text_merge import split_lines
+
+_CHUNK_LEVEL = 6          # zlib level: chunks are small and written once
+_COMPARE_BLOCK = 64 * 1024  # bytes compared at a time when looking for shared ends
+_U64 = (1 << 64) - 1
+_MASK = ((1 << HISTORY_CHUNK_BITS) - 1) << (64 - HISTORY_CHUNK_BITS)
+# One random 64-bit value per byte value, the same in every run
+_GEAR = [int.from_bytes(hashlib.blake2b(bytes([i]), digest_size=8).digest(), "big")
+         for i in range(256)]
+
+ChunkRef = Tuple[str, int, int]  # (chunk digest, stored bytes, raw bytes)
+
+
+class Snapshot(NamedTuple):
+    id: str
+    path: Path
+    time: float               # epoch seconds
+    reason: str               # "save" or "autosave"
+    length: int               # characters
+    digest: bytes             # content_digest of the text
+    chunks: Tuple[ChunkRef, ...]
+
+    @property
+    def size(self) -> int:
+        """Bytes of UTF-8 text."""
+        return sum(chunk[2] for chunk in self.chunks)
+
+
+def chunk_ends(data: bytes, start: int = 0) -> Iterator[int]:
+    """End offsets of the content-defined chunks of data, cutting from start.
+
+    Where a chunk ends depends only on the bytes since it started, so
+    cutting from any earlier boundary gives the same chunks.
+    """
+    gear, size = _GEAR, len(data)
+    while start < size:
+        end = min(start + HISTORY_CHUNK_MAX, size)
+        i = min(start + HISTORY_CHUNK_MIN, end)
+        h = 0
+        while i < end:
+            h = ((h << 1) + gear[data[i]]) & _U64
+            i += 1
+            if not h & _MASK:
+                break
+        yield i
+        start = i
+
+
+def _common_prefix(a: bytes, b: bytes) -> int:
+    limit = min(len(a), len(b))
+    start = 0
+    while start < limit:
+        end = min(start + _COMPARE_BLOCK, limit)
+        if a[start:end] != b[start:end]:
+            return start + next(i for i in range(end - start) if a[start + i] != b[start + i])
+        start = end
+    return limit
+
+
+def _common_suffix(a: bytes, b: bytes, limit: int) -> int:
+    done = 0
+    while done < limit:
+        step = min(_COMPARE_BLOCK, limit - done)
+        a_end, b_end = len(a) - done, len(b) - done
+        if a[a_end - step:a_end] != b[b_end - step:b_end]:
+            return done + next(i for i in range(step) if a[a_end - 1 - i] != b[b_end - 1 - i])
+        done += step
+    return limit
+
+
+def diff_lines(old: str, new: str, old_label: str = "", new_label: str = "",
+               context: int = 3) -> List[str]:
+    """Unified diff of two versions, as lines ending in "\\n"."""
+    return [line if line.endswith("\n") else line + "\n"
+            for line in difflib.unified_diff(split_lines(old), split_lines(new),
+                                             old_label, new_label, n=context)]
+
+
+class LocalHistory:
+    """Snapshots of files in directory; safe to use from several threads."""
+
+    def __init__(self, directory, max_age: float = HISTORY_MAX_AGE,
+                 max_size: int = HISTORY_MAX_SIZE):
+        self.directory = Path(directory)
+        self.max_age = max_age
+        self.max_size = max_size
+        self._lock = threading.RLock()
+        self._until_prune = 0  # snapshots before the next prune(); the first one prunes
+
+    @staticmethod
+    def _key(path) -> str:
+        real = os.path.realpath(path)
+        return hashlib.blake2b(real.encode("utf-8", "surrogateescape"),
+                               digest_size=16).hexdigest()
+
+    def _index_path(self, key: str) -> Path:
+        return self.directory / "documents" / f"{key}.jsonl"
+
+    def _chunk_path(self, chunk_id: str) -> Path:
+        return self.directory / "chunks" / chunk_id[:2] / chunk_id
+
+    # ===== Snapshots =====
+
+    def snapshot(self, path, text: str, reason: str = "save",
+                 digest: Optional[bytes] = None) -> Optional[Snapshot]:
+        """Record text as the newest version of path; None if it already is.
+
+        Also None, and nothing recorded, for text over HISTORY_MAX_DOCUMENT
+        characters. digest, if known, is content_digest(text). Raises OSError.
+        """
+        if len(text) > HISTORY_MAX_DOCUMENT:
+            return None
+        digest = digest if digest is not None else content_digest(text)
+        key = self._key(path)
+        with self._lock:
+            newest = self._newest(key)
+            if newest is not None and newest.digest == digest:
+                return None
+            data = text.encode("utf-8")
+            chunks = self._store(data, self._previous_version(newest))
+            now = time.time()
+            snapshot = Snapshot(f"{time.time_ns():x}", Path(os.path.realpath(path)), now,
+                                reason, len(text), digest, chunks)
+            index = self._index_path(key)
+            index.parent.mkdir(parents=True, exist_ok=True)
+            with open(index, "a", encoding="utf-8") as f:
+                f.write(self._encode(snapshot))
+            if self._until_prune <= 0:
+                self.prune(now)
+            else:
+                self._until_prune -= 1
+            return snapshot
+
+    def _previous_version(self, newest: Optional[Snapshot]):
+        """(bytes, chunks) of newest, read back from its chunks."""
+        if newest is None:
+            return None
+        try:
+            return self._read_bytes(newest), newest.chunks
+        except (OSError, ValueError):
+            return None  # damaged: store the new version from scratch
+
+    def _store(self, data: bytes, previous) -> Tuple[ChunkRef, ...]:
+        """Chunks of data, writing the ones not stored yet; previous: (bytes, chunks)."""
+        if previous is None:
+            return tuple(self._store_range(data, 0, chunk_ends(data)))
+        old, old_chunks = previous
+        prefix = _common_prefix(old, data)
+        suffix = _common_suffix(old, data, min(len(old), len(data)) - prefix)
+
+        # Chunks that lie within the shared start are kept; the last chunk
+        # ended with the data rather than at a boundary, so it never is
+        head: List[ChunkRef] = []
+        position = 0
+        for chunk in old_chunks[:-1]:
+            if position + chunk[2] > prefix:
+                break
+            head.append(chunk)
+            position += chunk[2]
+
+        # Old chunk starts within the shared end, as offsets into data
+        shift = len(data) - len(old)
+        old_starts: Dict[int, int] = {}
+        offset = 0
+        for i, chunk in enumerate(old_chunks):
+            if offset >= len(old) - suffix:
+                old_starts[offset + shift] = i
+            offset += chunk[2]
+
+        chunks = head
+        start = position
+        for end in chunk_ends(data, position):
+            chunks.append(self._write_chunk(data[start:end]))
+            start = end
+            if end in old_starts:
+                # Cut from the same bytes as before: the old chunks follow
+                chunks.extend(old_chunks[old_starts[end]:])
+                break
+        return tuple(chunks)
+
+    def _store_range(self, data: bytes, start: int, ends: Iterator[int]) -> Iterator[ChunkRef]:
+        for end in ends:
+            yield self._write_chunk(data[start:end])
+            start = end
+
+    def _write_chunk(self, chunk: bytes) -> ChunkRef:
+        chunk_id = hashlib.blake2b(chunk, digest_size=16).hexdigest()
+        path = self._chunk_path(chunk_id)
+        try:
+            return chunk_id, path.stat().st_size, len(chunk)  # stored already
+        except FileNotFoundError:
+            pass
+        compressed = zlib.compress(chunk, _CHUNK_LEVEL)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(f".{chunk_id}.{threading.get_ident()}.tmp")
+        with open(temp, "wb") as f:
+            f.write(compressed)
+        os.replace(temp, path)  # a chunk is never seen half written
+        return chunk_id, len(compressed), len(chunk)
+
+    # ===== Reading =====
+
+    def versions(self, path) -> List[Snapshot]:
+        """Snapshots of path, newest first."""
+        with self._lock:
+            return self._read_index(self._key(path))[::-1]
+
+    def _newest(self, key: str) -> Optional[Snapshot]:
+        snapshots = self._read_index(key)
+        return snapshots[-1] if snapshots else None
+
+    def text(self, snapshot: Snapshot) -> str:
+        """The text of a snapshot. Raises OSError, or ValueError if a chunk is damaged."""
+        return self._read_bytes(snapshot).decode("utf-8")
+
+    def _read_bytes(self, snapshot: Snapshot) -> bytes:
+        parts = []
+        for chunk_id, _stored, size in snapshot.chunks:
+            with open(self._chunk_path(chunk_id), "rb") as f:
+                try:
+                    chunk = zlib.decompress(f.read())
+                except zlib.error as e:
+                    raise ValueError(f"damaged history chunk {chunk_id}: {e}") from e
+            if len(chunk) != size or hashlib.blake2b(chunk, digest_size=16).hexdigest() != chunk_id:
+                raise ValueError(f"damaged history chunk {chunk_id}")
+            parts.append(chunk)
+        return b"".join(parts)
+
+    def diff(self, old: Snapshot, new: Snapshot, context: int = 3) -> List[str]:
+        """Unified diff from one snapshot to another. Raises OSError, ValueError."""
+        if old.digest == new.digest:
+            return []
+        return diff_lines(self.text(old), self.text(new), old.id, new.id, context)
+
+    def _read_index(self, key: str) -> List[Snapshot]:
+        try:
+            with open(self._index_path(key), encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        snapshots = []
+        for line in lines:
+            try:
+                snapshots.append(self._decode(line))
+            except (ValueError, KeyError, TypeError):
+                continue  # a line cut short by a crash
+        return snapshots
+
+    @staticmethod
+    def _encode(snapshot: Snapshot) -> str:
+        return json.dumps({
+            "id": snapshot.id, "time": snapshot.time, "reason": snapshot.reason,
+            "path": str(snapshot.path), "digest": snapshot.digest.hex(),
+            "length": snapshot.length, "chunks": [list(chunk) for chunk in snapshot.chunks],
+        }, ensure_ascii=False) + "\n"
+
+    @staticmethod
+    def _decode(line: str) -> Snapshot:
+        record = json.loads(line)
+        return Snapshot(record["id"], Path(record["path"]), float(record["time"]),
+                        record["reason"], int(record["length"]), bytes.fromhex(record["digest"]),
+                        tuple((str(c), int(stored), int(size))
+                              for c, stored, size in record["chunks"]))
+
+    # ===== Retention =====
+
+    def total_size(self) -> int:
+        """Stored bytes of all chunks the snapshots refer to."""
+        with self._lock:
+            sizes = {}
+            for snapshots in self._read_all().values():
+                for snapshot in snapshots:
+                    sizes.update((chunk[0], chunk[1]) for chunk in snapshot.chunks)
+            return sum(sizes.values())
+
+    def _read_all(self) -> Dict[str, List[Snapshot]]:
+        try:
+            names = os.listdir(self.directory / "documents")
+        except FileNotFoundError:
+            return {}
+        return {name[:-len(".jsonl")]: self._read_index(name[:-len(".jsonl")])
+                for name in names if name.endswith(".jsonl")}
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Apply the age and size limits; returns how many snapshots were dropped."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._until_prune = HISTORY_PRUNE_EVERY
+            indexes = self._read_all()
+            cutoff = now - self.max_age
+            kept = {key: [s for s in snapshots[:-1] if s.time >= cutoff] + snapshots[-1:]
+                    for key, snapshots in indexes.items()}
+
+            references: Dict[str, int] = {}
+            sizes: Dict[str, int] = {}
+            for snapshots in kept.values():
+                for snapshot in snapshots:
+                    for chunk_id, stored, _size in snapshot.chunks:
+                        references[chunk_id] = references.get(chunk_id, 0) + 1
+                        sizes[chunk_id] = stored
+            total = sum(sizes.values())
+            # Oldest first; the newest snapshot of each file always stays
+            candidates = sorted((s for snapshots in kept.values() for s in snapshots[:-1]),
+                                key=lambda s: s.time)
+            dropped_ids = set()
+            for snapshot in candidates:
+                if total <= self.max_size:
+                    break
+                dropped_ids.add(snapshot.id)
+                for chunk_id, stored, _size in snapshot.chunks:
+                    references[chunk_id] -= 1
+                    if references[chunk_id] == 0:
+                        del references[chunk_id]
+                        total -= stored
+
+            dropped = 0
+            for key, snapshots in indexes.items():
+                remaining = [s for s in kept[key] if s.id not in dropped_ids]
+                if len(remaining) != len(snapshots):
+                    dropped += len(snapshots) - len(remaining)
+                    atomic_write(self._index_path(key),
+                                 "".join(self._encode(s) for s in remaining))
+            self._delete_unreferenced(references)
+            return dropped
+
+    def _delete_unreferenced(self, references: Dict[str, int]):
+        chunks = self.directory / "chunks"
+        try:
+            buckets = list(os.scandir(chunks))
+        except FileNotFoundError:
+            return
+        for bucket in buckets:
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name not in references:
+                    try:
+                        os.unlink(entry.path)
+                    except OSError:
+                        pass
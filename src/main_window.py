@@ -1,39 +1,88 @@
+import json
 import os
+import shutil
 import subprocess
 import sys
+import tempfile
 from pathlib import Path
 from PySide6.QtWidgets import (
     QMainWindow, QSplitter, QFileDialog, QMessageBox,
     QStatusBar, QLabel, QWidget, QHBoxLayout, QMenu,
-    QFontDialog, QDockWidget
+    QFontDialog, QDockWidget, QProgressDialog, QTabWidget
 )
-from PySide6.QtCore import Qt, QTimer, QSettings
+from PySide6.QtCore import Qt, QTimer, QSettings, QStandardPaths, QDateTime, QEvent, Signal
 from PySide6.QtGui import QAction, QKeySequence, QColor, QFont, QTextCursor, QActionGroup
 
-from src.editor import EditorWidget
 from src.preview import PreviewWidget
-from src.export import PDFExporter
 from src.styles.theme import Theme, ThemeColors
 from src.outline_widget import OutlineWidget
+from src.document import Document
+from src.file_loader import TextSource
 from src.file_manager import FileManager
-from src.constants import AUTOSAVE_INTERVAL
+from src.file_watcher import FileWatcher
+from src.file_writer import FileWriter, UTF8
+from src.history_dialog import HistoryDialog
+from src.local_history import LocalHistory
+from src.startup_profile import startup_profile
+from src.recovery_journal import find_orphaned_journals, recover, discard_journal
+from src.utils.text_merge import merge3, MINE_LABEL
+from src.constants import AUTOSAVE_INTERVAL, SAVE_SHUTDOWN_TIMEOUT, SUSPEND_MEMORY_BUDGET
 
 
 class MainWindow(QMainWindow):
-    def __init__(self, app_instance=None):
+    # Emitted on the writer thread; queued to the GUI thread
+    _background_save_finished = Signal(object)  # SaveResult
+
+    def __init__(self, app_instance=None, recovery_dir=None, history_dir=None, settings=None):
         super().__init__()
         self.app_instance = app_instance
-        self.settings = QSettings("MarkdownEditor", "MarkdownEditor")
-        self.file_manager = FileManager(self.settings)
+        if settings is None:
+            settings = QSettings("MarkdownEditor", "MarkdownEditor")
+        self.settings = settings
+        if history_dir is None:
+            history_dir = Path(QStandardPaths.writableLocation(
+                QStandardPaths.AppLocalDataLocation)) / "history"
+        self.history = LocalHistory(history_dir)
+        # Shared by the documents of all tabs; every save it writes is snapshotted
+        self.writer = FileWriter(self._background_save_finished.emit, self.history)
+        self._recent_files = FileManager.load_recent_files(self.settings)
+        self.file_watcher = FileWatcher(self)  # follows the current document
+        self._checking_disk = False
+        self.documents = []
+        self.current_document = None
+        self.suspend_budget = SUSPEND_MEMORY_BUDGET
+        self._views = 0  # activations so far, for Document.last_viewed
+        self._swap_dir = None
+        self._editor_font = None
+        self._layout_mode = "split"
+        self._awaiting_first_paint = False
 
         self._setup_ui()
+        self._setup_recovery(recovery_dir)
         self._setup_menubar()
         self._setup_statusbar()
         self._setup_outline()
         self._apply_theme()
         self._connect_signals()
+        self._new_document()
         self._setup_autosave()
         self._restore_state()
+        self._restore_session()
+        # After the window is up, offer what a crashed session left behind
+        QTimer.singleShot(0, self._offer_recovery)
+
+    # --- The current document's parts ---
+    @property
+    def editor(self):
+        return self.current_document.editor
+
+    @property
+    def file_manager(self):
+        return self.current_document.file_manager
+
+    @property
+    def journal(self):
+        return self.current_document.journal
 
     # --- Property shims for backward compatibility (tests access these directly) ---
     @property
@@ -60,21 +109,13 @@ class MainWindow(QMainWindow):
     def _dirty(self, value):
         self.file_manager._dirty = value
 
-    @property
-    def _saved_text(self):
-        return self.file_manager._saved_text
-
-    @_saved_text.setter
-    def _saved_text(self, value):
-        self.file_manager._saved_text = value
-
     @property
     def recent_files(self):
-        return self.file_manager.recent_files
+        return self._recent_files
 
     @recent_files.setter
     def recent_files(self, value):
-        self.file_manager.recent_files = value
+        self._recent_files[:] = value  # the list is shared with every FileManager
 
     def _setup_ui(self):
         self.setWindowTitle("Markdown Editor")
@@ -85,11 +126,14 @@ class MainWindow(QMainWindow):
         self.splitter = QSplitter(Qt.Horizontal)
         self.splitter.setHandleWidth(5)
 
-        # Editor and Preview
-        self.editor = EditorWidget(self)
+        # One tab per document, all sharing the preview
+        self.tabs = QTabWidget(self)
+        self.tabs.setDocumentMode(True)
+        self.tabs.setTabsClosable(True)
+        self.tabs.setMovable(True)
         self.preview = PreviewWidget(self)
 
-        self.splitter.addWidget(self.editor)
+        self.splitter.addWidget(self.tabs)
         self.splitter.addWidget(self.preview)
         self.splitter.setSizes([700, 700])
 
@@ -103,7 +147,8 @@ class MainWindow(QMainWindow):
         self.addDockWidget(Qt.RightDockWidgetArea, self.outline_dock)
         self.outline_dock.hide()
 
-        self.outline.heading_clicked.connect(self.editor.go_to_line)
+        self.outline.heading_clicked.connect(lambda line: self.editor.go_to_line(line))
+        self.outline.section_changed.connect(self._update_section)
 
     def _setup_menubar(self):
         menubar = self.menuBar()
@@ -137,6 +182,20 @@ class MainWindow(QMainWindow):
         save_as_action.triggered.connect(self._save_file_as)
         file_menu.addAction(save_as_action)
 
+        self.autosave_to_file_action = QAction("Auto-save to File", self)
+        self.autosave_to_file_action.setCheckable(True)
+        self.autosave_to_file_action.setChecked(
+            self.settings.value("autosave_to_file", False, type=bool)
+        )
+        self.autosave_to_file_action.toggled.connect(
+            lambda checked: self.settings.setValue("autosave_to_file", checked)
+        )
+        file_menu.addAction(self.autosave_to_file_action)
+
+        history_action = QAction("Local History...", self)
+        history_action.triggered.connect(self._show_local_history)
+        file_menu.addAction(history_action)
+
         file_menu.addSeparator()
 
         export_pdf_action = QAction("Export to PDF...", self)
@@ -150,6 +209,11 @@ class MainWindow(QMainWindow):
 
         file_menu.addSeparator()
 
+        close_tab_action = QAction("Close Tab", self)
+        close_tab_action.setShortcut(QKeySequence.Close)
+        close_tab_action.triggered.connect(lambda: self._close_document(self.current_document))
+        file_menu.addAction(close_tab_action)
+
         exit_action = QAction("Exit", self)
         exit_action.setShortcut(QKeySequence.Quit)
         exit_action.triggered.connect(self.close)
@@ -160,126 +224,136 @@ class MainWindow(QMainWindow):
 
         undo_action = QAction("Undo", self)
         undo_action.setShortcut(QKeySequence.Undo)
-        undo_action.triggered.connect(self.editor.undo)
+        undo_action.triggered.connect(lambda: self.editor.undo())
         edit_menu.addAction(undo_action)
 
         redo_action = QAction("Redo", self)
         redo_action.setShortcut(QKeySequence.Redo)
-        redo_action.triggered.connect(self.editor.redo)
+        redo_action.triggered.connect(lambda: self.editor.redo())
         edit_menu.addAction(redo_action)
 
         edit_menu.addSeparator()
 
         cut_action = QAction("Cut", self)
         cut_action.setShortcut(QKeySequence.Cut)
-        cut_action.triggered.connect(self.editor.cut)
+        cut_action.triggered.connect(lambda: self.editor.cut())
         edit_menu.addAction(cut_action)
 
         copy_action = QAction("Copy", self)
         copy_action.setShortcut(QKeySequence.Copy)
-        copy_action.triggered.connect(self.editor.copy)
+        copy_action.triggered.connect(lambda: self.editor.copy())
         edit_menu.addAction(copy_action)
 
         paste_action = QAction("Paste", self)
         paste_action.setShortcut(QKeySequence.Paste)
-        paste_action.triggered.connect(self.editor.paste)
+        paste_action.triggered.connect(lambda: self.editor.paste())
         edit_menu.addAction(paste_action)
 
         edit_menu.addSeparator()
 
         select_all_action = QAction("Select All", self)
         select_all_action.setShortcut(QKeySequence.SelectAll)
-        select_all_action.triggered.connect(self.editor.select_all)
+        select_all_action.triggered.connect(lambda: self.editor.select_all())
         edit_menu.addAction(select_all_action)
 
         edit_menu.addSeparator()
 
         find_action = QAction("Find...", self)
         find_action.setShortcut(QKeySequence.Find)
-        find_action.triggered.connect(self.editor.show_find)
+        find_action.triggered.connect(lambda: self.editor.show_find())
         edit_menu.addAction(find_action)
 
         replace_action = QAction("Replace...", self)
         replace_action.setShortcut(QKeySequence("Ctrl+H"))
-        replace_action.triggered.connect(self.editor.show_replace)
+        replace_action.triggered.connect(lambda: self.editor.show_replace())
         edit_menu.addAction(replace_action)
 
+        edit_menu.addSeparator()
+
+        expand_fold_action = QAction("Expand Folded Text", self)
+        expand_fold_action.setShortcut(QKeySequence("Ctrl+Shift+."))
+        expand_fold_action.triggered.connect(lambda: self.editor.expand_fold_at_cursor())
+        edit_menu.addAction(expand_fold_action)
+
+        extract_images_action = QAction("Extract Embedded Images", self)
+        extract_images_action.triggered.connect(self._extract_embedded_images)
+        edit_menu.addAction(extract_images_action)
+
         # ===== Format menu =====
         format_menu = menubar.addMenu("Format")
 
-        bold_action = QAction("Bold", self)
-        bold_action.setShortcut(QKeySequence("Ctrl+B"))
-        bold_action.triggered.connect(self.editor.toolbar.bold_clicked.emit)
+        # Shortcuts live on the editor toolbar (the menu only shows them);
+        # registering them twice makes them ambiguous and neither fires
+        bold_action = QAction("Bold\tCtrl+B", self)
+        bold_action.triggered.connect(lambda: self.editor.toolbar.bold_clicked.emit())
         format_menu.addAction(bold_action)
 
-        italic_action = QAction("Italic", self)
-        italic_action.setShortcut(QKeySequence("Ctrl+I"))
-        italic_action.triggered.connect(self.editor.toolbar.italic_clicked.emit)
+        italic_action = QAction("Italic\tCtrl+I", self)
+        italic_action.triggered.connect(lambda: self.editor.toolbar.italic_clicked.emit())
         format_menu.addAction(italic_action)
 
-        strikethrough_action = QAction("Strikethrough", self)
-        strikethrough_action.setShortcut(QKeySequence("Ctrl+Shift+X"))
-        strikethrough_action.triggered.connect(self.editor.toolbar.strikethrough_clicked.emit)
+        strikethrough_action = QAction("Strikethrough\tCtrl+Shift+X", self)
+        strikethrough_action.triggered.connect(lambda: self.editor.toolbar.strikethrough_clicked.emit())
         format_menu.addAction(strikethrough_action)
 
         format_menu.addSeparator()
 
         h1_action = QAction("Heading 1", self)
-        h1_action.triggered.connect(self.editor.toolbar.heading1_clicked.emit)
+        h1_action.triggered.connect(lambda: self.editor.toolbar.heading1_clicked.emit())
         format_menu.addAction(h1_action)
 
         h2_action = QAction("Heading 2", self)
-        h2_action.triggered.connect(self.editor.toolbar.heading2_clicked.emit)
+        h2_action.triggered.connect(lambda: self.editor.toolbar.heading2_clicked.emit())
         format_menu.addAction(h2_action)
 
         h3_action = QAction("Heading 3", self)
-        h3_action.triggered.connect(self.editor.toolbar.heading3_clicked.emit)
+        h3_action.triggered.connect(lambda: self.editor.toolbar.heading3_clicked.emit())
         format_menu.addAction(h3_action)
 
         format_menu.addSeparator()
 
         code_action = QAction("Inline Code", self)
-        code_action.triggered.connect(self.editor.toolbar.code_clicked.emit)
+        code_action.triggered.connect(lambda: self.editor.toolbar.code_clicked.emit())
         format_menu.addAction(code_action)
 
         code_block_action = QAction("Code Block", self)
-        code_block_action.triggered.connect(self.editor.toolbar.code_block_clicked.emit)
+        code_block_action.triggered.connect(lambda: self.editor.toolbar.code_block_clicked.emit())
         format_menu.addAction(code_block_action)
 
         format_menu.addSeparator()
 
         quote_action = QAction("Blockquote", self)
-        quote_action.triggered.connect(self.editor.toolbar.quote_clicked.emit)
+        quote_action.triggered.connect(lambda: self.editor.toolbar.quote_clicked.emit())
         format_menu.addAction(quote_action)
 
         bullet_action = QAction("Bullet List", self)
-        bullet_action.triggered.connect(self.editor.toolbar.bullet_list_clicked.emit)
+        bullet_action.triggered.connect(lambda: self.editor.toolbar.bullet_list_clicked.emit())
         format_menu.addAction(bullet_action)
 
         numbered_action = QAction("Numbered List", self)
-        numbered_action.triggered.connect(self.editor.toolbar.numbered_list_clicked.emit)
+        numbered_action.triggered.connect(lambda: self.editor.toolbar.numbered_list_clicked.emit())
         format_menu.addAction(numbered_action)
 
         checklist_action = QAction("Checklist", self)
-        checklist_action.triggered.connect(self.editor.toolbar.checklist_clicked.emit)
+        checklist_action.triggered.connect(lambda: self.editor.toolbar.checklist_clicked.emit())
         format_menu.addAction(checklist_action)
 
         format_menu.addSeparator()
 
         table_action = QAction("Insert Table", self)
-        table_action.triggered.connect(self.editor.toolbar.table_clicked.emit)
+        table_action.triggered.connect(lambda: self.editor.toolbar.table_clicked.emit())
         format_menu.addAction(table_action)
 
         link_action = QAction("Insert Link", self)
-        link_action.triggered.connect(self.editor.toolbar.link_clicked.emit)
+        link_action.triggered.connect(lambda: self.editor.toolbar.link_clicked.emit())
         format_menu.addAction(link_action)
 
         image_action = QAction("Insert Image", self)
-        image_action.triggered.connect(self.editor.toolbar.image_clicked.emit)
+        image_action.triggered.connect(lambda: self.editor.toolbar.image_clicked.emit())
         format_menu.addAction(image_action)
 
         hr_action = QAction("Horizontal Rule", self)
-        hr_action.triggered.connect(self.editor.toolbar.horizontal_rule_clicked.emit)
+        hr_action.triggered.connect(lambda: self.editor.toolbar.horizontal_rule_clicked.emit())
         format_menu.addAction(hr_action)
 
         # ===== View menu =====
@@ -313,6 +387,19 @@ class MainWindow(QMainWindow):
 
         view_menu.addSeparator()
 
+        # Tabs
+        next_tab_action = QAction("Next Tab", self)
+        next_tab_action.setShortcut(QKeySequence.NextChild)
+        next_tab_action.triggered.connect(lambda: self._switch_tab(1))
+        view_menu.addAction(next_tab_action)
+
+        previous_tab_action = QAction("Previous Tab", self)
+        previous_tab_action.setShortcut(QKeySequence.PreviousChild)
+        previous_tab_action.triggered.connect(lambda: self._switch_tab(-1))
+        view_menu.addAction(previous_tab_action)
+
+        view_menu.addSeparator()
+
         # Outline toggle
         self.toggle_outline_action = QAction("Show Outline", self)
         self.toggle_outline_action.setShortcut(QKeySequence("Ctrl+Shift+O"))
@@ -320,6 +407,19 @@ class MainWindow(QMainWindow):
         self.toggle_outline_action.triggered.connect(self._toggle_outline)
         view_menu.addAction(self.toggle_outline_action)
 
+        refresh_preview_action = QAction("Refresh Preview", self)
+        refresh_preview_action.setShortcut(QKeySequence("F5"))
+        refresh_preview_action.triggered.connect(self._refresh_preview)
+        view_menu.addAction(refresh_preview_action)
+
+        self.large_file_action = QAction("Large File Mode", self)
+        self.large_file_action.setCheckable(True)
+        self.large_file_action.setToolTip(
+            "Pause live preview, highlighting and outline for very large documents"
+        )
+        self.large_file_action.triggered.connect(self._toggle_large_file_mode)
+        view_menu.addAction(self.large_file_action)
+
         view_menu.addSeparator()
 
         # Theme submenu
@@ -385,6 +485,10 @@ class MainWindow(QMainWindow):
         # ===== Help menu =====
         help_menu = menubar.addMenu("Help")
 
+        diagnostics_action = QAction("Diagnostics", self)
+        diagnostics_action.triggered.connect(self._show_diagnostics)
+        help_menu.addAction(diagnostics_action)
+
         about_action = QAction("About", self)
         about_action.triggered.connect(self._show_about)
         help_menu.addAction(about_action)
@@ -401,10 +505,16 @@ class MainWindow(QMainWindow):
         self.char_count_label = QLabel("Characters: 0")
         self.word_count_label = QLabel("Words: 0")
         self.cursor_pos_label = QLabel("Ln 1, Col 1")
+        # Breadcrumb of the heading section the cursor is in
+        self.section_label = QLabel("")
+        self.section_label.setMaximumWidth(400)
+        self.encoding_label = QLabel("UTF-8")
 
         status_layout.addWidget(self.char_count_label)
         status_layout.addWidget(self.word_count_label)
+        status_layout.addWidget(self.section_label)
         status_layout.addWidget(self.cursor_pos_label)
+        status_layout.addWidget(self.encoding_label)
 
         self.statusbar.addPermanentWidget(status_widget)
 
@@ -413,12 +523,8 @@ class MainWindow(QMainWindow):
         self.setStyleSheet(Theme.get_stylesheet(colors))
         self.preview.set_theme(colors)
 
-        # Update editor current line highlight color
-        self.editor.set_current_line_color(QColor(colors.current_line))
-
-        # Update syntax highlighter theme
-        is_dark = Theme.is_dark()
-        self.editor.set_dark_mode(is_dark)
+        for document in self.documents:
+            self._style_editor(document.editor)
 
         # Update theme check marks
         if hasattr(self, 'light_theme_action'):
@@ -427,31 +533,69 @@ class MainWindow(QMainWindow):
             self.dark_theme_action.setChecked(saved == "dark")
             self.system_theme_action.setChecked(saved == "system")
 
+    def _style_editor(self, editor):
+        colors = Theme.get_current()
+        # Current line and find match highlight colors
+        editor.set_current_line_color(QColor(colors.current_line))
+        editor.set_match_highlight_color(QColor(colors.find_match))
+
+        # Syntax highlighter theme
+        editor.set_dark_mode(Theme.is_dark())
+
     def _connect_signals(self):
-        # Update preview on text change
-        self.editor.text_changed.connect(self.preview.update_preview)
+        self.tabs.currentChanged.connect(self._on_current_tab_changed)
+        self.tabs.tabCloseRequested.connect(
+            lambda index: self._close_document(self._document_at(index))
+        )
+
+        # Autosave results from the writer thread
+        self._background_save_finished.connect(self._on_background_save_finished)
+
+        # Changes made on disk by other programs
+        self.file_watcher.document_changed.connect(self._check_disk_change)
+        self.file_watcher.images_changed.connect(self._on_images_changed)
+
+    def _connect_document(self, document):
+        """Route the signals of a document's editor here while it is the current one."""
+        editor = document.editor
+
+        def current(slot):
+            return lambda *args: slot(*args) if document is self.current_document else None
+
+        # Preview, outline and word count follow the debounced change bus
+        editor.connect_document_changed(current(self._on_document_changed))
 
         # Update status bar
-        self.editor.connect_text_changed(self._update_char_count)
-        self.editor.connect_text_changed(self._update_word_count)
-        self.editor.connect_cursor_changed(self._update_cursor_pos)
+        editor.connect_text_changed(current(self._update_char_count))
+        editor.connect_cursor_changed(current(self._update_cursor_pos))
 
         # Dirty flag
-        self.editor.connect_text_changed(self._mark_dirty)
+        editor.connect_text_changed(current(self._mark_dirty))
 
         # Scroll sync
-        self.editor.connect_scroll_changed(self._sync_scroll)
-
-        # Outline update
-        self.editor.text_changed.connect(self.outline.update_outline)
+        editor.connect_scroll_changed(current(self._sync_scroll))
 
         # Image download status
-        self.editor.image_download_status.connect(
-            lambda msg: self.statusbar.showMessage(msg, 3000)
+        editor.image_download_status.connect(
+            current(lambda msg: self.statusbar.showMessage(msg, 3000))
+        )
+
+        # Progress for streamed large pastes
+        editor.large_paste_started.connect(current(self._on_large_paste_started))
+
+        # Undo history trimmed to stay under the memory budget
+        editor.undo_history_trimmed.connect(
+            current(lambda released: self.statusbar.showMessage(
+                f"Undo history cleared to free {released // (1024 * 1024)} MB", 5000
+            ))
         )
 
-        # Initial preview
-        QTimer.singleShot(100, lambda: self.preview.update_preview(""))
+        # Replace All report
+        editor.replaced_all.connect(
+            current(lambda count, seconds: self.statusbar.showMessage(
+                f"Replaced {count} occurrence(s) in {seconds * 1000:.0f} ms", 5000
+            ))
+        )
 
     def _setup_autosave(self):
         self._autosave_timer = QTimer(self)
@@ -459,14 +603,427 @@ class MainWindow(QMainWindow):
         self._autosave_timer.timeout.connect(self._autosave)
         self._autosave_timer.start()
 
+    def _setup_recovery(self, recovery_dir):
+        """Where the documents' recovery journals go."""
+        if recovery_dir is None:
+            recovery_dir = Path(QStandardPaths.writableLocation(
+                QStandardPaths.AppLocalDataLocation)) / "recovery"
+        self.recovery_dir = Path(recovery_dir)
+
+    def _rebase(self, dirty=False, document=None):
+        """Make the file as last loaded or saved the base of the journal and watcher.
+
+        document defaults to the current one.
+        """
+        document = document or self.current_document
+        fm = document.file_manager
+        document.journal.reset(fm.current_file, fm.saved_digest, fm.encoding, dirty)
+        if document is self.current_document:
+            self.file_watcher.watch_document(fm.current_file)
+
+    # ===== Documents (tabs) =====
+
+    def _new_document(self, activate=True):
+        """Open a new, empty document in a new tab, by default as the current one."""
+        document = Document(self.settings, self.writer, self._recent_files,
+                            self.recovery_dir, self)
+        document.layout_mode = self._layout_mode
+        self._style_editor(document.editor)
+        if self._editor_font is not None:
+            document.editor.set_font(self._editor_font)
+        self._connect_document(document)
+        self.documents.append(document)
+        self._rebase(document=document)
+        self.tabs.addTab(document.editor, document.title)
+        if activate:
+            self.tabs.setCurrentWidget(document.editor)
+        return document
+
+    def _document_for_open(self):
+        """The current document if it is untouched and new, otherwise a new tab."""
+        if self.current_document.is_pristine:
+            return self.current_document
+        return self._new_document()
+
+    def _document_at(self, index):
+        widget = self.tabs.widget(index)
+        for document in self.documents:
+            if document.editor is widget:
+                return document
+        return None
+
+    def _find_document(self, file_path):
+        """The open document of file_path, if any."""
+        target = Path(file_path).resolve()
+        for document in self.documents:
+            current = document.file_path
+            if current is not None and current.resolve() == target:
+                return document
+        return None
+
+    def _on_current_tab_changed(self, index):
+        document = self._document_at(index)
+        if document is not None and document is not self.current_document:
+            self._activate(document)
+
+    def _activate(self, document):
+        """Make document the current one: resume it if needed and show it everywhere."""
+        self.current_document = document
+        self._views += 1
+        document.last_viewed = self._views
+        if document.is_suspended:
+            if self._resume(document):
+                self._rebase(document.file_manager.is_dirty)
+            # else: still suspended, empty and read-only; its journal is untouched
+        elif document.is_deferred:
+            # Restored from the last session: read now that it is first shown
+            self._load_file(str(document.take_deferred()))
+            if document is not self.current_document:
+                return  # could not be read, and its tab was closed
+            if not document.file_manager.large_file_mode:
+                document.restore_view()  # large files do once streamed in
+        if document.layout_mode != self._layout_mode:
+            self._set_layout(document.layout_mode)
+        fm = document.file_manager
+        self.file_watcher.watch_document(fm.current_file)
+        self.large_file_action.setChecked(fm.large_file_mode)
+        self.preview.set_base_path(str(fm.base_path))
+        self._update_title()
+        self._update_char_count()
+        self._update_cursor_pos()
+        if not fm.large_file_mode:
+            self._refresh_views()
+        # Another program may have changed it while it was in the background
+        QTimer.singleShot(0, self._check_disk_change)
+        self._suspend_inactive()
+
+    def _resume(self, document) -> bool:
+        """Put a suspended document's text back; False if it cannot be had right now.
+
+        If the swap file is unreadable, the text is rebuilt from the
+        recovery journal (unsaved changes) or read from the file (none).
+        Until then the tab stays suspended and read-only: its empty editor
+        must not be edited, saved or journaled in place of the text.
+        """
+        editor = document.editor.editor
+        try:
+            document.resume()
+        except OSError as e:
+            text, problem = self._text_without_swap(document)
+            if text is None:
+                editor.setReadOnly(True)
+                QMessageBox.critical(
+                    self, "Error",
+                    f"Could not restore the document from its swap file:\n{e}\n\n"
+                    f"{problem}\nThe tab stays read-only; switch to it again to retry."
+                )
+                return False
+            document.resume(text)
+            self.statusbar.showMessage(
+                f"The swap file could not be read ({e}); the text was rebuilt from "
+                f"{'the recovery journal' if document.file_manager.is_dirty else 'the file'}",
+                10000
+            )
+        editor.setReadOnly(False)
+        return True
+
+    def _text_without_swap(self, document):
+        """(text, None) from the journal or the file, or (None, why not)."""
+        fm = document.file_manager
+        if fm.is_dirty:
+            if document.journal.path is None:
+                return None, "Its unsaved changes were not journaled."
+            recovered = recover(document.journal.path)
+            if recovered.text is None:
+                return None, f"Its recovery journal cannot be replayed: {recovered.error}"
+            return recovered.text, None
+        if fm.current_file is None:
+            return "", None  # an empty new document
+        try:
+            return TextSource(fm.current_file, fm.encoding).read(), None
+        except (OSError, ValueError) as e:
+            return None, f"Its file cannot be read either: {e}"
+
+    def _refresh_views(self):
+        """Bring preview, outline and word count up to date with the current document."""
+        self.preview.update_preview(self.editor.get_preview_text())
+        self.outline.update_outline(self.editor.get_text())
+        self._update_word_count()
+
+    def _suspend_inactive(self):
+        """Swap out the least recently viewed background documents past the memory budget."""
+        background = sorted(
+            (document for document in self.documents
+             if document is not self.current_document and not document.is_suspended
+             # Its placeholders must stay in the text until the images arrive
+             and not document.editor.has_pending_downloads),
+            key=lambda document: document.last_viewed,
+        )
+        total = sum(document.memory_estimate() for document in background)
+        for document in background:
+            if total <= self.suspend_budget:
+                break
+            total -= document.memory_estimate()
+            if self._swap_dir is None:
+                self._swap_dir = Path(tempfile.mkdtemp(prefix="markdown-editor-swap-"))
+            try:
+                document.suspend(self._swap_dir)
+            except OSError as e:
+                self.statusbar.showMessage(f"Could not swap out a background tab: {e}", 5000)
+                return
+
+    def _close_document(self, document):
+        """Close document's tab, asking first if it has unsaved changes."""
+        if document is None:
+            return False
+        if document.file_manager.is_dirty:
+            self.tabs.setCurrentWidget(document.editor)
+            if not self._check_unsaved_changes([document]):
+                return False
+        document.journal.discard()
+        document.discard_swap()
+        self.documents.remove(document)
+        if not self.documents:
+            self._new_document()  # there is always a current document
+        self.tabs.removeTab(self.tabs.indexOf(document.editor))
+        document.editor.deleteLater()
+        document.deleteLater()
+        return True
+
+    def _switch_tab(self, step):
+        count = self.tabs.count()
+        if count > 1:
+            self.tabs.setCurrentIndex((self.tabs.currentIndex() + step) % count)
+
+    def _offer_recovery(self):
+        """Offer to restore unsaved changes from journals of crashed sessions."""
+        for journal in find_orphaned_journals(self.recovery_dir):
+            recovered = recover(journal)
+            name = recovered.file.name if recovered.file else "an untitled document"
+            if recovered.text is None:
+                QMessageBox.warning(
+                    self, "Recovery",
+                    f"Unsaved changes to {name} could not be recovered:\n{recovered.error}"
+                )
+                discard_journal(journal)
+                continue
+            when = QDateTime.fromSecsSinceEpoch(int(recovered.modified)).toString()
+            reply = QMessageBox.question(
+                self, "Recover Unsaved Changes",
+                f"The editor did not shut down cleanly. Unsaved changes to {name} "
+                f"from {when} were found.\n\nRecover them?",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.Yes
+            )
+            if reply == QMessageBox.Yes:
+                self._restore_recovered(recovered)  # each into a tab of its own
+            discard_journal(journal)
+
+    def _restore_recovered(self, recovered):
+        self.tabs.setCurrentWidget(self._document_for_open().editor)
+        self._set_large_file_mode(False)
+        self.journal.pause()
+        saved = None
+        if recovered.file is not None:
+            try:
+                saved = self.file_manager.load_file(str(recovered.file))
+            except OSError:
+                pass  # gone or unreadable: recover as an untitled document
+        if saved is None:
+            self.editor.set_text("")
+            self.file_manager.new_file()
+        else:
+            self.editor.set_text(saved)
+            self.editor.set_base_path(str(self.base_path))
+            self.preview.set_base_path(str(self.base_path))
+            self._update_recent_menu()
+        self._rebase()
+        # Journaled like any other edit; dirty until the user saves
+        self.editor.set_text(recovered.text)
+        self._update_title()
+        self.statusbar.showMessage("Recovered unsaved changes", 5000)
+
     def _autosave(self):
-        if self.file_manager.is_dirty and self.current_file:
-            self._write_file(self.current_file)
-            self.file_manager.mark_saved(self.editor.get_text())
-            self._update_title()
-            self.statusbar.showMessage("Auto-saved", 2000)
+        if not self.autosave_to_file_action.isChecked():
+            return  # the recovery journal keeps unsaved edits safe
+        for document in self.documents:
+            fm = document.file_manager
+            if fm.is_dirty and fm.current_file:
+                try:
+                    text = document.get_text()
+                except OSError:
+                    continue  # swap file unreadable; the journal still has the edits
+                # Written off the GUI thread, so a slow disk or share never stalls typing
+                fm.write_file_async(fm.current_file, text)
+
+    def _on_background_save_finished(self, result):
+        if result.error is not None:
+            self.statusbar.showMessage(f"Auto-save failed: {result.error}", 5000)
+            return
+        document = next((d for d in self.documents
+                         if d.file_manager.current_file == result.path), None)
+        if document is None:
+            return  # closed, or another file was opened meanwhile
+        fm = document.file_manager
+        fm.mark_saved(result.content, result.digest)
+        # Typing that happened during the write keeps the document dirty
+        try:
+            fm.mark_dirty(document.get_text())
+        except OSError:
+            fm._dirty = True
+        self._rebase(fm.is_dirty, document)
+        self._update_tab(document)
+        self.statusbar.showMessage(self._save_message("Auto-saved", result), 2000)
+
+    @staticmethod
+    def _save_message(action, result):
+        if not result.written:
+            return f"{action}: no changes since the last save"
+        return f"{action} in {result.elapsed * 1000:.0f} ms"
+
+    def _on_document_changed(self, change_set):
+        if self.file_manager.large_file_mode:
+            return
+        text = change_set.snapshot.text
+        self.file_watcher.watch_images(self.editor.image_handler.local_images(text))
+        self.preview.update_preview(self.editor.get_preview_text())
+        # Kept current even while hidden: it also feeds the section breadcrumb
+        self.outline.update_outline(text)
+        self._update_word_count()
+
+    # ===== Startup =====
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.preview.is_initialized and not self._awaiting_first_paint:
+            self._awaiting_first_paint = True
+            self.editor.editor.viewport().installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if self._awaiting_first_paint and event.type() == QEvent.Paint:
+            self._awaiting_first_paint = False
+            watched.removeEventFilter(self)
+            startup_profile.mark("first paint")
+            # Once this paint is on screen: the editor is usable meanwhile
+            QTimer.singleShot(0, self._initialize_preview)
+        return super().eventFilter(watched, event)
+
+    def _initialize_preview(self):
+        """Second half of startup: the web engine, the converter and the first render."""
+        self.preview.initialize()
+        startup_profile.mark("preview ready")
+        startup_profile.report()
+
+    # ===== External changes =====
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        # Watch events can go missing (network drives, a suspended machine);
+        # checking when the window comes back to the front costs one stat
+        if event.type() == QEvent.ActivationChange and self.isActiveWindow():
+            QTimer.singleShot(0, self._check_disk_change)
+
+    def _check_disk_change(self):
+        """Reload or merge the current file if another program changed it."""
+        if self._checking_disk:
+            return  # still asking about the previous change
+        self._checking_disk = True
+        try:
+            self._handle_disk_change()
+        finally:
+            self._checking_disk = False
+
+    def _handle_disk_change(self):
+        path = self.current_file
+        try:
+            change = self.file_manager.disk_change()
+        except FileNotFoundError:
+            if not self._dirty:
+                self._dirty = True  # saving writes it back
+                self._update_title()
+                self.statusbar.showMessage(
+                    f"{path.name} was deleted or moved on disk; save to keep it", 10000)
+            return
+        except OSError as e:
+            self.statusbar.showMessage(f"Could not check {path.name} for changes: {e}", 5000)
+            return
+        if change is None:
+            return
+        theirs, source = change
+
+        if not self._dirty:
+            self._apply_disk_change(theirs, source, theirs)
+            self.statusbar.showMessage(
+                f"Reloaded {path.name}: it was changed on disk (Undo restores the previous text)",
+                5000)
+            return
+
+        base = self.file_manager.base_text()
+        choice = self._ask_disk_change(path.name, can_merge=base is not None)
+        if choice == "merge":
+            merged = merge3(base, self.editor.get_text(), theirs)
+            self._apply_disk_change(merged.text, source, theirs)
+            if merged.conflicts:
+                conflict = self.editor.editor.document().find(f"<<<<<<< {MINE_LABEL}")
+                if not conflict.isNull():
+                    self.editor.editor.setTextCursor(conflict)
+                self.statusbar.showMessage(
+                    f"Merged changes from disk with {merged.conflicts} conflict(s) "
+                    f"between <<<<<<< and >>>>>>> markers", 10000)
+            else:
+                self.statusbar.showMessage("Merged changes from disk", 5000)
+        elif choice == "reload":
+            self._apply_disk_change(theirs, source, theirs)
+            self.statusbar.showMessage(
+                f"Reloaded {path.name} (Undo restores your changes)", 5000)
+        else:
+            # Keep the editor's text; it is now unsaved relative to the new file
+            self.file_manager.accept_disk_version(source, theirs)
+            self._settle_dirty()
+
+    def _apply_disk_change(self, text, source, theirs):
+        """Show text as one undoable edit; the file as read (theirs) is the saved state."""
+        self.editor.replace_text(text)
+        self.file_manager.accept_disk_version(source, theirs)
+        self._settle_dirty()
+
+    def _settle_dirty(self):
+        self._dirty = False
+        self.file_manager.mark_dirty(self.editor.get_text())
+        self._rebase(self.file_manager.is_dirty)
+        self._update_title()
+
+    def _ask_disk_change(self, name, can_merge) -> str:
+        """Ask what to do about an external change to a file with unsaved edits.
+
+        Returns "merge", "reload" or "keep".
+        """
+        box = QMessageBox(self)
+        box.setIcon(QMessageBox.Question)
+        box.setWindowTitle("File Changed on Disk")
+        box.setText(f"{name} was changed by another program, and you have unsaved changes.")
+        box.setInformativeText(
+            "Merge the two, reload the file (Undo brings your text back) or keep your version?"
+        )
+        choices = {}
+        if can_merge:
+            choices[box.addButton("Merge", QMessageBox.AcceptRole)] = "merge"
+        choices[box.addButton("Reload", QMessageBox.DestructiveRole)] = "reload"
+        keep = box.addButton("Keep Mine", QMessageBox.RejectRole)
+        choices[keep] = "keep"
+        box.setDefaultButton(next(iter(choices)))
+        box.setEscapeButton(keep)
+        box.exec()
+        return choices.get(box.clickedButton(), "keep")
+
+    def _on_images_changed(self):
+        self.preview.reload_images()
+        if not self.file_manager.large_file_mode:
+            self._refresh_preview()
 
     def _mark_dirty(self):
+        if self.file_manager.is_dirty:
+            return
         current_text = self.editor.get_text()
         if self.file_manager.mark_dirty(current_text):
             self._update_title()
@@ -489,6 +1046,12 @@ class MainWindow(QMainWindow):
     def _update_cursor_pos(self):
         line, col = self.editor.get_cursor_position()
         self.cursor_pos_label.setText(f"Ln {line}, Col {col}")
+        self.outline.set_current_line(line)
+
+    def _update_section(self, path):
+        breadcrumb = " \u203a ".join(path)
+        self.section_label.setText(breadcrumb)
+        self.section_label.setToolTip(breadcrumb)
 
     # ===== File operations =====
 
@@ -496,15 +1059,9 @@ class MainWindow(QMainWindow):
         return self.file_manager.get_initial_dir()
 
     def _new_file(self):
-        if self._check_unsaved_changes():
-            self.editor.set_text("")
-            self.file_manager.new_file()
-            self._update_title()
+        self._new_document()
 
     def _open_file(self):
-        if not self._check_unsaved_changes():
-            return
-
         file_path, _ = QFileDialog.getOpenFileName(
             self,
             "Open Markdown File",
@@ -516,26 +1073,151 @@ class MainWindow(QMainWindow):
             self._load_file(file_path)
 
     def _load_file(self, file_path: str):
+        """Open file_path in a tab: its own if already open, else a new one."""
+        document = self._find_document(file_path)
+        if document is not None:
+            self.tabs.setCurrentWidget(document.editor)
+            return
+        document = self._document_for_open()
+        self.tabs.setCurrentWidget(document.editor)
         try:
+            if self.file_manager.is_large_file(file_path):
+                self._load_large_file(file_path)
+                return
             content = self.file_manager.load_file(file_path)
+            self._set_large_file_mode(False)
+            self.journal.pause()
             self.editor.set_text(content)
+            self._rebase()
             self.editor.set_base_path(str(self.base_path))
             self.preview.set_base_path(str(self.base_path))
             self._update_title()
             self._update_recent_menu()
+            self._report_decoding()
         except OSError as e:
             QMessageBox.critical(self, "Error", f"Failed to open file:\n{str(e)}")
+            if document.is_pristine and len(self.documents) > 1:
+                self._close_document(document)
 
-    def _open_dropped_file(self, file_path: str):
-        if not self._check_unsaved_changes():
+    def _load_large_file(self, file_path: str):
+        """Stream a large file into the editor with features paused."""
+        source = self.file_manager.open_text(file_path)
+        self._set_large_file_mode(True)
+        self.journal.pause()
+
+        progress = QProgressDialog(
+            f"Loading {Path(file_path).name}...", "Cancel", 0, 100, self
+        )
+        progress.setWindowTitle("Large File")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+
+        # Decoded straight from a memory map; progress is in bytes of the file
+        loader = self.editor.load_chunks(source.chunks(), source.size)
+        loader.progress.connect(
+            lambda _done, _size: progress.setValue(
+                int(source.consumed * 100 / max(source.size, 1)))
+        )
+        progress.canceled.connect(loader.cancel)
+        loader.finished.connect(
+            lambda completed: self._on_large_file_loaded(
+                file_path, source, completed, loader, progress)
+        )
+        loader.start()
+
+    def _on_large_file_loaded(self, file_path, source, completed, loader, progress):
+        progress.close()
+        if completed:
+            # The digest was computed while decoding: no full copy of the text
+            self.file_manager.finish_load(file_path, source)
+            self.current_document.restore_view()
+            self._rebase()
+            self.editor.set_base_path(str(self.base_path))
+            self.preview.set_base_path(str(self.base_path))
+            self._update_title()
+            self._update_recent_menu()
+            self._update_char_count()
+            self.word_count_label.setText("Words: -")
+            self.statusbar.showMessage(
+                "Large file mode: preview, highlighting and outline are paused "
+                "(F5 refreshes the preview)", 5000
+            )
+            self._report_decoding()
             return
+
+        self.editor.set_text("")
+        self.file_manager.new_file()
+        self._rebase()
+        self._set_large_file_mode(False)
+        if loader.error is not None:
+            QMessageBox.critical(self, "Error", f"Failed to open file:\n{str(loader.error)}")
+        else:
+            self.statusbar.showMessage("Loading cancelled", 3000)
+
+    def _on_large_paste_started(self, paster):
+        progress = QProgressDialog("Pasting...", "Cancel", 0, 100, self)
+        progress.setWindowTitle("Paste")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(500)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        paster.progress.connect(
+            lambda done, size: progress.setValue(int(done * 100 / size))
+        )
+        progress.canceled.connect(paster.cancel)
+        paster.finished.connect(lambda completed: self._on_large_paste_finished(completed, progress))
+
+    def _on_large_paste_finished(self, completed, progress):
+        progress.close()
+        if not completed:
+            self.statusbar.showMessage("Paste cancelled", 3000)
+
+    def _set_large_file_mode(self, enabled: bool):
+        self.file_manager.large_file_mode = enabled
+        self.editor.set_large_file_mode(enabled)
+        self.large_file_action.setChecked(enabled)
+        self._update_title()
+
+    def _toggle_large_file_mode(self, checked):
+        self._set_large_file_mode(checked)
+        if not checked:
+            # Catch up on everything that was paused
+            text = self.editor.get_text()
+            self.preview.update_preview(self.editor.get_preview_text())
+            self.outline.update_outline(text)
+            self._update_word_count()
+
+    def _extract_embedded_images(self):
+        count = self.editor.extract_embedded_images()
+        if count:
+            self.statusbar.showMessage(f"Extracted {count} embedded image(s) to images/", 3000)
+        else:
+            self.statusbar.showMessage("No embedded images found", 3000)
+
+    def _refresh_preview(self):
+        self.preview.update_preview(self.editor.get_preview_text())
+
+    def _open_dropped_file(self, file_path: str):
         self._load_file(file_path)
 
+    def open_files(self, file_paths):
+        """Open files from the command line or a later launch, each in a tab, and come forward."""
+        for file_path in file_paths:
+            self._load_file(file_path)
+        if self.isMinimized():
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
+
     def _save_file(self):
         if self.current_file:
-            self._write_file(self.current_file)
-            self.file_manager.mark_saved(self.editor.get_text())
-            self._update_title()
+            result = self._write_file(self.current_file)
+            if result is not None:
+                self.file_manager.mark_saved(result.content, result.digest)
+                self._rebase()
+                self._update_title()
         else:
             self._save_file_as()
 
@@ -550,24 +1232,69 @@ class MainWindow(QMainWindow):
         if file_path:
             if not file_path.endswith('.md'):
                 file_path += '.md'
-            self._write_file(Path(file_path))
+            result = self._write_file(Path(file_path))
+            if result is None:
+                return
             self.file_manager.current_file = Path(file_path)
             self.file_manager.base_path = self.file_manager.current_file.parent
             self.editor.set_base_path(str(self.base_path))
             self.preview.set_base_path(str(self.base_path))
-            self.file_manager.mark_saved(self.editor.get_text())
+            self.file_manager.mark_saved(result.content, result.digest)
+            self._rebase()
             self._update_title()
             self.settings.setValue("last_directory", str(self.current_file.parent))
 
     def _write_file(self, path):
+        """Save the editor text to path; returns the SaveResult, or None on failure.
+
+        Text the file's encoding cannot represent is saved as UTF-8 if the
+        user agrees, and not at all otherwise.
+        """
+        if self.current_document.is_suspended:
+            # Its swap file could not be read: the editor is empty, not the text
+            self.statusbar.showMessage("This document could not be restored and cannot be "
+                                       "saved", 5000)
+            return None
+        text = self.editor.get_text()
         try:
-            self.file_manager.write_file(path, self.editor.get_text())
-            self.statusbar.showMessage("File saved", 3000)
+            result = self.file_manager.write_file(path, text)
+        except UnicodeEncodeError as e:
+            if not self._confirm_utf8(e):
+                self.statusbar.showMessage("File not saved", 3000)
+                return None
+            self.file_manager.encoding = UTF8
+            self._update_title()
+            return self._write_file(path)
         except OSError as e:
             QMessageBox.critical(self, "Error", f"Failed to save file:\n{str(e)}")
+            return None
+        self.statusbar.showMessage(self._save_message("File saved", result), 3000)
+        return result
+
+    def _confirm_utf8(self, error: UnicodeEncodeError) -> bool:
+        unencodable = error.object[error.start:error.end]
+        reply = QMessageBox.question(
+            self, "Save as UTF-8?",
+            f"The text contains characters {self.file_manager.encoding.name} cannot "
+            f"represent, such as {unencodable!r}.\n\nSave the file as UTF-8 instead?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes
+        )
+        return reply == QMessageBox.Yes
 
     # ===== Export =====
 
+    def _show_local_history(self):
+        if self.current_file is None:
+            self.statusbar.showMessage("Save the document to start its local history", 3000)
+            return
+        # Snapshots are taken on the writer thread; let the latest save's land
+        self.writer.wait_idle(SAVE_SHUTDOWN_TIMEOUT)
+        dialog = HistoryDialog(self.history, self.current_file, self.editor.get_text(), self)
+        if dialog.exec() and dialog.restored_text is not None:
+            # Undoable, and saved like any other edit
+            self.editor.replace_text(dialog.restored_text)
+            self.statusbar.showMessage("Restored an earlier version", 3000)
+
     def _export_pdf(self):
         file_path, _ = QFileDialog.getSaveFileName(
             self,
@@ -584,6 +1311,7 @@ class MainWindow(QMainWindow):
             self.statusbar.showMessage("Exporting PDF...")
 
             try:
+                from src.export import PDFExporter  # loads QtWebEngine
                 exporter = PDFExporter(str(self.base_path), parent=self)
                 exporter.export(self.editor.get_text(), file_path)
 
@@ -643,13 +1371,41 @@ class MainWindow(QMainWindow):
 
     def _update_title(self):
         self.setWindowTitle(self.file_manager.get_title())
+        self.encoding_label.setText(self.file_manager.encoding.name)
+        self._update_tab(self.current_document)
+
+    def _update_tab(self, document):
+        index = self.tabs.indexOf(document.editor)
+        if index >= 0:
+            self.tabs.setTabText(index, document.title)
+            path = document.file_path
+            self.tabs.setTabToolTip(index, str(path) if path else "")
+
+    def _report_decoding(self):
+        if self.file_manager.decoding_errors:
+            encoding = self.file_manager.encoding
+            try:
+                "\ufffd".encode(encoding.codec)
+                on_save = "saving will keep the replacements"
+            except UnicodeEncodeError:
+                on_save = "saving will offer to switch to UTF-8"
+            self.statusbar.showMessage(
+                f"Some bytes are not valid {encoding.name} and were "
+                f"replaced with \ufffd; {on_save}", 10000
+            )
 
-    def _check_unsaved_changes(self) -> bool:
-        if self._dirty:
+    def _check_unsaved_changes(self, documents=None) -> bool:
+        """Ask before dropping unsaved changes of documents (default: the current one)."""
+        if documents is None:
+            documents = [self.current_document]
+        dirty = [document for document in documents if document.file_manager.is_dirty]
+        if dirty:
+            message = ("You have unsaved changes." if len(dirty) == 1
+                       else f"{len(dirty)} documents have unsaved changes.")
             reply = QMessageBox.question(
                 self,
                 "Unsaved Changes",
-                "You have unsaved changes. Do you want to continue?",
+                f"{message} Do you want to continue?",
                 QMessageBox.Yes | QMessageBox.No,
                 QMessageBox.No
             )
@@ -660,12 +1416,15 @@ class MainWindow(QMainWindow):
 
     def _set_layout(self, mode: str):
         self._layout_mode = mode
+        self.current_document.layout_mode = mode
+        {"editor": self.editor_only_action, "preview": self.preview_only_action,
+         "split": self.split_view_action}[mode].setChecked(True)
         if mode == "editor":
             self.splitter.setSizes([1, 0])
-            self.preview.update_preview(self.editor.get_text())
+            self.preview.update_preview(self.editor.get_preview_text())
         elif mode == "preview":
             self.splitter.setSizes([0, 1])
-            self.preview.update_preview(self.editor.get_text())
+            self.preview.update_preview(self.editor.get_preview_text())
         else:  # split
             self.splitter.setSizes([1, 1])
 
@@ -688,7 +1447,7 @@ class MainWindow(QMainWindow):
                 self.app_instance.apply_light_palette()
 
         # Refresh preview
-        self.preview.update_preview(self.editor.get_text())
+        self.preview.update_preview(self.editor.get_preview_text())
 
     def _zoom_in(self):
         self.editor.zoom_in()
@@ -706,7 +1465,9 @@ class MainWindow(QMainWindow):
         current_font = self.editor.get_font()
         font, ok = QFontDialog.getFont(current_font, self, "Select Editor Font")
         if ok:
-            self.editor.set_font(font)
+            self._editor_font = font
+            for document in self.documents:
+                document.editor.set_font(font)
             self.settings.setValue("editor_font_family", font.family())
             self.settings.setValue("editor_font_size", font.pointSize())
 
@@ -735,11 +1496,26 @@ class MainWindow(QMainWindow):
             "- Auto-save"
         )
 
+    # ===== Diagnostics =====
+
+    def _show_diagnostics(self):
+        lines = [f"{name}: {value}" for name, value in self.editor.get_diagnostics().items()]
+        suspended = sum(document.is_suspended for document in self.documents)
+        lines.append(f"Open documents: {len(self.documents)} ({suspended} swapped out)")
+        QMessageBox.information(self, "Diagnostics", "\n".join(lines))
+
     # ===== Window state =====
 
     def closeEvent(self, event):
-        if self._check_unsaved_changes():
+        if self._check_unsaved_changes(self.documents):
             self._save_state()
+            self.file_manager.shutdown()  # the writer is shared: once for all documents
+            for document in self.documents:
+                document.journal.discard()
+                document.discard_swap()
+                document.editor.discard_preview_images()
+            if self._swap_dir is not None:
+                shutil.rmtree(self._swap_dir, ignore_errors=True)
             event.accept()
         else:
             event.ignore()
@@ -748,6 +1524,53 @@ class MainWindow(QMainWindow):
         self.settings.setValue("geometry", self.saveGeometry())
         self.settings.setValue("window_state", self.saveState())
         self.settings.setValue("splitter_sizes", self.splitter.sizes())
+        self._save_session()
+
+    def _save_session(self):
+        """Remember the open files, in tab order, with where each was left."""
+        entries, active = [], None
+        for index in range(self.tabs.count()):
+            document = self._document_at(index)
+            if document.file_path is None:
+                continue  # untitled: nothing to reopen
+            if document is self.current_document:
+                active = len(entries)
+            cursor, scroll = document.view_state()
+            entries.append({"file": str(document.file_path), "cursor": cursor,
+                            "scroll": scroll, "layout": document.layout_mode})
+        self.settings.setValue("session", json.dumps({"documents": entries, "active": active}))
+
+    def _restore_session(self):
+        """Reopen the last session's files as deferred tabs; only the active one is read now."""
+        try:
+            session = json.loads(self.settings.value("session", "") or "{}")
+            entries = [(Path(entry["file"]), (int(entry.get("cursor", 0)),
+                                              int(entry.get("scroll", 0))),
+                        entry.get("layout", "split"))
+                       for entry in session.get("documents", [])]
+            active = session.get("active")
+        except (TypeError, ValueError, KeyError, AttributeError):
+            return  # unreadable session: start empty
+        documents = []
+        for path, view_state, layout in entries:
+            if not documents and self.current_document.is_pristine:
+                document = self.current_document
+            else:
+                document = self._new_document(activate=False)
+            document.defer(path, view_state)
+            if layout in ("editor", "preview", "split"):
+                document.layout_mode = layout
+            self._update_tab(document)
+            documents.append(document)
+        if not documents:
+            return
+        if not isinstance(active, int) or not 0 <= active < len(documents):
+            active = 0
+        shown = documents[active]
+        if shown is self.current_document:
+            self._activate(shown)  # no tab change to do it
+        else:
+            self.tabs.setCurrentWidget(shown.editor)
 
     def _restore_state(self):
         geometry = self.settings.value("geometry")
@@ -775,7 +1598,9 @@ class MainWindow(QMainWindow):
             font.setFamily(font_family)
             if font_size:
                 font.setPointSize(int(font_size))
-            self.editor.set_font(font)
+            self._editor_font = font
+            for document in self.documents:
+                document.editor.set_font(font)
 
     # ===== Recent Files Management =====
 
@@ -802,9 +1627,6 @@ class MainWindow(QMainWindow):
             self.recent_menu.addAction(clear_action)
 
     def _open_recent_file(self, file_path: str):
-        if not self._check_unsaved_changes():
-            return
-
         if not Path(file_path).exists():
             QMessageBox.warning(self, "File Not Found", f"File no longer exists:\n{file_path}")
             self.file_manager.recent_files.remove(file_path)
@@ -0,0 +1,269 @@
+"""OutlineModel — the document's headings as an incrementally updated tree model.
+
+parse_headings() scans the text once for ATX headings. set_headings() then
+reconciles the existing tree with the new list instead of rebuilding it:
+an unchanged list costs nothing, line shifts only update numbers, renamed
+headings emit dataChanged, and only the rows that actually appeared or
+disappeared are inserted or removed. Nodes that survive keep their
+QModelIndex identity, so the view keeps expansion and selection state.
+
+The heading line numbers are also kept as a sorted array, so the section
+containing any line is a bisect away (section_at).
+"""
+import re
+from array import array
+from bisect import bisect_right
+from typing import List, NamedTuple
+
+from PySide6.QtCore import QAbstractItemModel, QAbstractListModel, QModelIndex, Qt
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})[^\S\n]+(.+)$', re.MULTILINE)
+
+LINE_ROLE = Qt.UserRole  # 1-based line number of the heading
+
+
+class Heading(NamedTuple):
+    level: int
+    title: str
+    line: int  # 1-based
+
+
+def parse_headings(text: str) -> List[Heading]:
+    """All ATX headings in text, in document order."""
+    headings = []
+    line = 1
+    pos = 0
+    for match in HEADING_PATTERN.finditer(text):
+        line += text.count("\n", pos, match.start())
+        pos = match.start()
+        headings.append(Heading(len(match.group(1)), match.group(2).strip(), line))
+    return headings
+
+
+class _Node:
+    __slots__ = ("level", "title", "line", "parent", "children", "row", "first", "last")
+
+    def __init__(self, level: int, title: str, line: int, parent=None):
+        self.level = level
+        self.title = title
+        self.line = line
+        self.parent = parent
+        self.children = []
+        self.row = 0
+        # Document-order ordinals of the node and its last descendant
+        self.first = self.last = -1
+
+    @property
+    def key(self):
+        return self.level, self.title
+
+
+def _build_tree(headings: List[Heading]) -> _Node:
+    """Nest headings under the closest previous heading of a lower level."""
+    root = _Node(0, "", 0)
+    stack = [root]
+    for ordinal, heading in enumerate(headings):
+        while len(stack) > 1 and stack[-1].level >= heading.level:
+            stack.pop()
+        node = _Node(heading.level, heading.title, heading.line, stack[-1])
+        node.row = len(stack[-1].children)
+        node.first = ordinal
+        stack[-1].children.append(node)
+        stack.append(node)
+        for ancestor in stack:
+            ancestor.last = ordinal
+    return root
+
+
+class OutlineModel(QAbstractItemModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._root = _Node(0, "", 0)
+        self._headings: List[Heading] = []
+        self._nodes: List[_Node] = []  # every node in document order
+        # Unchanged runs: new ordinals below prefix, and from suffix_start on
+        # (old ordinal + shift)
+        self._unchanged = (0, 0, 0)  # prefix, suffix_start, shift
+        self._lines = array("l")  # heading lines in document order, for bisect
+
+    @property
+    def headings(self) -> List[Heading]:
+        return self._headings
+
+    def set_headings(self, headings: List[Heading]) -> bool:
+        """Update the tree to match headings; returns False if nothing changed."""
+        if headings == self._headings:
+            return False
+        old_keys = [(h.level, h.title) for h in self._headings]
+        new_keys = [(h.level, h.title) for h in headings]
+        self._headings = list(headings)
+        if old_keys != new_keys:
+            # Only subtrees that differ from their old counterpart need a look
+            limit = min(len(old_keys), len(new_keys))
+            prefix = 0
+            while prefix < limit and old_keys[prefix] == new_keys[prefix]:
+                prefix += 1
+            suffix = 0
+            while suffix < limit - prefix and old_keys[-1 - suffix] == new_keys[-1 - suffix]:
+                suffix += 1
+            self._unchanged = (prefix, len(new_keys) - suffix, len(new_keys) - len(old_keys))
+            self._sync_children(self._root, _build_tree(headings))
+            self._nodes = []
+            self._collect(self._root)
+        # Lines are not displayed, so they change without notification
+        for node, heading in zip(self._nodes, headings):
+            node.line = heading.line
+        self._lines = array("l", [heading.line for heading in headings])
+        return True
+
+    def section_at(self, line: int) -> QModelIndex:
+        """Index of the heading whose section contains line; invalid before the first."""
+        i = min(bisect_right(self._lines, line), len(self._nodes)) - 1
+        if i < 0:
+            return QModelIndex()
+        return self._index_for(self._nodes[i])
+
+    def section_path(self, index: QModelIndex) -> List[str]:
+        """Titles from the top-level heading down to index."""
+        path = []
+        node = self._node(index)
+        while node is not self._root:
+            path.append(node.title)
+            node = node.parent
+        path.reverse()
+        return path
+
+    def _collect(self, node: _Node):
+        for child in node.children:
+            child.first = len(self._nodes)
+            self._nodes.append(child)
+            self._collect(child)
+            child.last = len(self._nodes) - 1
+
+    def _sync_children(self, old: _Node, new: _Node):
+        """Make old's children match new's, reusing old nodes where keys agree."""
+        old_children, new_children = old.children, new.children
+        limit = min(len(old_children), len(new_children))
+        prefix = 0
+        while prefix < limit and old_children[prefix].key == new_children[prefix].key:
+            prefix += 1
+        suffix = 0
+        while (suffix < limit - prefix
+               and old_children[-1 - suffix].key == new_children[-1 - suffix].key):
+            suffix += 1
+
+        old_end = len(old_children) - suffix
+        new_end = len(new_children) - suffix
+        # Pairs of (surviving node, its fresh counterpart), captured before any edit
+        pairs = list(zip(old_children[:prefix], new_children[:prefix]))
+        pairs += list(zip(old_children[old_end:], new_children[new_end:]))
+        middle_old = old_children[prefix:old_end]
+        middle_new = new_children[prefix:new_end]
+
+        if len(middle_old) == len(middle_new) and all(
+                a.level == b.level for a, b in zip(middle_old, middle_new)):
+            # Same shape: renamed headings
+            for node, fresh in zip(middle_old, middle_new):
+                if node.title != fresh.title:
+                    node.title = fresh.title
+                    index = self.createIndex(node.row, 0, node)
+                    self.dataChanged.emit(index, index, [Qt.DisplayRole])
+            pairs += zip(middle_old, middle_new)
+        else:
+            parent_index = self._index_for(old)
+            if middle_old:
+                self.beginRemoveRows(parent_index, prefix, old_end - 1)
+                del old_children[prefix:old_end]
+                self._renumber(old, prefix)
+                self.endRemoveRows()
+            if middle_new:
+                # Fresh subtrees are adopted as they are
+                self.beginInsertRows(parent_index, prefix, new_end - 1)
+                for node in middle_new:
+                    node.parent = old
+                old_children[prefix:prefix] = middle_new
+                self._renumber(old, prefix)
+                self.endInsertRows()
+
+        head, tail_start, shift = self._unchanged
+        for node, fresh in pairs:
+            # A subtree made of the same run of unchanged headings, old and new,
+            # has the same shape; a pair that merely lies outside the changed
+            # run may still have been matched to a different one
+            same = ((fresh.last < head
+                     and (node.first, node.last) == (fresh.first, fresh.last))
+                    or (fresh.first >= tail_start
+                        and (node.first + shift, node.last + shift) == (fresh.first, fresh.last)))
+            if not same:
+                self._sync_children(node, fresh)
+
+    @staticmethod
+    def _renumber(node: _Node, start: int):
+        children = node.children
+        for row in range(start, len(children)):
+            children[row].row = row
+
+    def _index_for(self, node: _Node) -> QModelIndex:
+        if node is self._root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def _node(self, index: QModelIndex) -> _Node:
+        return index.internalPointer() if index.isValid() else self._root
+
+    # ===== QAbstractItemModel =====
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        if column != 0 or not 0 <= row < len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, 0, node.children[row])
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        return self._index_for(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self._node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return node.title
+        if role == LINE_ROLE:
+            return node.line
+        return None
+
+
+class HeadingListModel(QAbstractListModel):
+    """A flat, ordered list of headings, e.g. ranked filter results."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._headings: List[Heading] = []
+
+    def set_headings(self, headings: List[Heading]):
+        self.beginResetModel()
+        self._headings = list(headings)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headings)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        heading = self._headings[index.row()]
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return heading.title
+        if role == LINE_ROLE:
+            return heading.line
+        return None
@@ -1,13 +1,22 @@
-import re
-from PySide6.QtWidgets import QTreeWidget, QTreeWidgetItem, QVBoxLayout, QWidget, QLabel
-from PySide6.QtCore import Signal, Qt
+from PySide6.QtWidgets import QTreeView, QListView, QLineEdit, QVBoxLayout, QWidget, QLabel
+from PySide6.QtCore import Signal, QModelIndex, QEvent, Qt
+
+from src.constants import OUTLINE_FILTER_LIMIT
+from src.outline_model import OutlineModel, HeadingListModel, LINE_ROLE, parse_headings
+from src.utils import FuzzyIndex
 
 
 class OutlineWidget(QWidget):
     heading_clicked = Signal(int)  # line number
+    section_changed = Signal(list)  # titles from the top-level heading to the current one
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._current_line = 1
+        self._current_path = []
+        self._fuzzy_index = None  # built on first use, dropped when titles change
+        self._indexed_titles = []
+        self._title_cache = {}    # title -> normalized title, reused across rebuilds
         self._setup_ui()
 
     def _setup_ui(self):
@@ -19,47 +28,123 @@ class OutlineWidget(QWidget):
         title.setStyleSheet("font-weight: bold; padding: 6px 0;")
         layout.addWidget(title)
 
-        self.tree = QTreeWidget()
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filter headings...")
+        self.filter_input.setClearButtonEnabled(True)
+        self.filter_input.textChanged.connect(self._apply_filter)
+        self.filter_input.installEventFilter(self)
+        layout.addWidget(self.filter_input)
+
+        self.model = OutlineModel(self)
+        self.tree = QTreeView()
         self.tree.setHeaderHidden(True)
         self.tree.setIndentation(16)
-        self.tree.itemClicked.connect(self._on_item_clicked)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setModel(self.model)
+        self.tree.clicked.connect(self._on_item_clicked)
+        self.model.rowsInserted.connect(self._expand_inserted)
         layout.addWidget(self.tree)
 
-    def update_outline(self, text: str):
-        self.tree.clear()
+        # Ranked filter matches replace the tree while a filter is active
+        self.results_model = HeadingListModel(self)
+        self.results = QListView()
+        self.results.setUniformItemSizes(True)
+        self.results.setModel(self.results_model)
+        self.results.clicked.connect(self._on_item_clicked)
+        self.results.activated.connect(self._on_item_clicked)
+        self.results.hide()
+        layout.addWidget(self.results)
+
+    def update_outline(self, text: str) -> bool:
+        """Sync the tree with the headings in text; False if they did not change."""
+        if not self.model.set_headings(parse_headings(text)):
+            return False
+        titles = [h.title for h in self.model.headings]
+        if titles != self._indexed_titles:
+            # Shifted lines keep the index; changed titles rebuild it on demand
+            self._fuzzy_index = None
+            self._indexed_titles = titles
+        self.set_current_line(self._current_line)
+        if self.is_filtering:
+            self._apply_filter(self.filter_input.text())
+        return True
+
+    def set_current_line(self, line: int):
+        """Mark the section containing line as current; a bisect per call."""
+        self._current_line = line
+        index = self.model.section_at(line)
+        if index != self.tree.currentIndex():
+            if index.isValid():
+                self.tree.setCurrentIndex(index)
+            else:
+                self.tree.setCurrentIndex(QModelIndex())
+                self.tree.clearSelection()
+        path = self.model.section_path(index)
+        if path != self._current_path:
+            self._current_path = path
+            self.section_changed.emit(path)
+
+    @property
+    def current_section(self):
+        return self._current_path
+
+    @property
+    def is_filtering(self) -> bool:
+        return bool(self.filter_input.text().strip())
+
+    def _index(self) -> FuzzyIndex:
+        if self._fuzzy_index is None:
+            self._fuzzy_index = FuzzyIndex(self._indexed_titles, self._title_cache)
+            if len(self._title_cache) > 2 * len(self._indexed_titles) + 1000:
+                # Drop titles that were edited away long ago
+                self._title_cache = {}
+                self._fuzzy_index = FuzzyIndex(self._indexed_titles, self._title_cache)
+        return self._fuzzy_index
+
+    def _apply_filter(self, text: str):
         if not text.strip():
+            self.results_model.set_headings([])
+            self.results.hide()
+            self.tree.show()
             return
-
-        heading_pattern = re.compile(r'^(#{1,6})\s+(.+)$', re.MULTILINE)
-        # Stack to track parent items for nesting
-        stack = []  # (level, item)
-
-        for line_num, line in enumerate(text.split('\n'), 1):
-            match = heading_pattern.match(line)
-            if not match:
-                continue
-
-            level = len(match.group(1))
-            title = match.group(2).strip()
-
-            item = QTreeWidgetItem()
-            item.setText(0, title)
-            item.setData(0, Qt.UserRole, line_num)
-
-            # Find the right parent
-            while stack and stack[-1][0] >= level:
-                stack.pop()
-
-            if stack:
-                stack[-1][1].addChild(item)
-            else:
-                self.tree.addTopLevelItem(item)
-
-            stack.append((level, item))
-
-        self.tree.expandAll()
-
-    def _on_item_clicked(self, item, column):
-        line_num = item.data(0, Qt.UserRole)
+        headings = self.model.headings
+        ranked = self._index().search(text, OUTLINE_FILTER_LIMIT)
+        self.results_model.set_headings([headings[number] for number, _ in ranked])
+        self.tree.hide()
+        self.results.show()
+        if ranked:
+            self.results.setCurrentIndex(self.results_model.index(0))
+
+    def eventFilter(self, obj, event):
+        if obj is self.filter_input:
+            if event.type() == QEvent.FocusIn:
+                # Normalize the titles before the first keystroke needs them
+                self._index()
+            elif event.type() == QEvent.KeyPress:
+                key = event.key()
+                if key == Qt.Key_Escape and self.filter_input.text():
+                    self.filter_input.clear()
+                    return True
+                if self.is_filtering and key in (Qt.Key_Up, Qt.Key_Down):
+                    rows = self.results_model.rowCount()
+                    if rows:
+                        step = 1 if key == Qt.Key_Down else -1
+                        row = max(0, min(rows - 1, self.results.currentIndex().row() + step))
+                        self.results.setCurrentIndex(self.results_model.index(row))
+                    return True
+                if self.is_filtering and key in (Qt.Key_Return, Qt.Key_Enter):
+                    index = self.results.currentIndex()
+                    if index.isValid():
+                        self._on_item_clicked(index)
+                    return True
+        return super().eventFilter(obj, event)
+
+    def _expand_inserted(self, parent, first, last):
+        # New headings open expanded; existing ones keep the user's collapse state
+        for row in range(first, last + 1):
+            self.tree.expandRecursively(self.model.index(row, 0, parent))
+
+    def _on_item_clicked(self, index):
+        line_num = index.data(LINE_ROLE)
         if line_num is not None:
             self.heading_clicked.emit(line_num)
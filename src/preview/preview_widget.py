@@ -1,16 +1,19 @@
+import re
 import sys
 import shutil
 import tempfile
 from pathlib import Path
 from PySide6.QtWidgets import QWidget, QVBoxLayout
-from PySide6.QtWebEngineWidgets import QWebEngineView
 from PySide6.QtCore import QUrl, Qt
-from PySide6.QtWebEngineCore import QWebEngineSettings
 
 from src.utils.markdown_converter import MarkdownConverter
 from src.styles.theme import Theme, ThemeColors
 
 
+# src of a local image (no URL scheme); the query string is left alone
+_LOCAL_IMG_SRC = re.compile(r'(<img\b[^>]*?\bsrc=")(?![a-zA-Z][\w+.-]+:)([^"?#]+)(?=[#"])')
+
+
 def get_resource_path(relative_path: str) -> Path:
     """Get path to resource, works for dev and PyInstaller"""
     if hasattr(sys, '_MEIPASS'):
@@ -19,32 +22,62 @@ def get_resource_path(relative_path: str) -> Path:
 
 
 class PreviewWidget(QWidget):
+    """Rendered markdown in a QWebEngineView.
+
+    Starting the web engine takes longer than everything else the window
+    needs, so the widget starts out as an empty placeholder: the web view,
+    the markdown converter and mermaid.js are only set up by initialize(),
+    which the window calls once it has painted. Until then
+    update_preview() just keeps the latest text.
+    """
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.converter = MarkdownConverter()
+        self._converter = None
+        self.web_view = None
         self.base_path = Path.cwd()
         self.colors = Theme.get_current()
         self._scroll_position = 0
-        self._pending_html = None
+        self._pending_markdown = ""
+        self._zoom_factor = 1.0
+        self._image_version = 0  # bumped when image files change, to defeat caching
 
-        # Create temp directory for mermaid rendering
+        # Temp directory for mermaid rendering
         self.temp_dir = Path(tempfile.mkdtemp())
         self.temp_html = self.temp_dir / "preview.html"
+        self.mermaid_js_path = self.temp_dir / "mermaid.min.js"
+
+        self._layout = QVBoxLayout(self)
+        self._layout.setContentsMargins(0, 0, 0, 0)
+
+    @property
+    def is_initialized(self) -> bool:
+        return self.web_view is not None
 
-        # Copy mermaid.js to temp directory
+    @property
+    def converter(self) -> MarkdownConverter:
+        if self._converter is None:
+            self._converter = MarkdownConverter()
+        return self._converter
+
+    def initialize(self):
+        """Create the web view and show the latest text in it (once)."""
+        if self.is_initialized:
+            return
         self._setup_mermaid()
         self._setup_ui()
+        self.update_preview(self._pending_markdown)
 
     def _setup_mermaid(self):
         """Copy mermaid.js to temp directory for local loading"""
         mermaid_src = get_resource_path("resources/js/mermaid.min.js")
-        self.mermaid_js_path = self.temp_dir / "mermaid.min.js"
         if mermaid_src.exists():
             shutil.copy(mermaid_src, self.mermaid_js_path)
 
     def _setup_ui(self):
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
+        # Imported here: loading QtWebEngine alone is a noticeable part of startup
+        from PySide6.QtWebEngineWidgets import QWebEngineView
+        from PySide6.QtWebEngineCore import QWebEngineSettings
 
         self.web_view = QWebEngineView(self)
         self.web_view.setContextMenuPolicy(Qt.NoContextMenu)
@@ -58,13 +91,15 @@ class PreviewWidget(QWidget):
         if profile and hasattr(profile, "setSpellCheckEnabled"):
             profile.setSpellCheckEnabled(False)
 
-        layout.addWidget(self.web_view)
-
-        # Initial empty content
-        self.update_preview("")
+        if self._zoom_factor != 1.0:  # zoomed before the view existed
+            self.web_view.setZoomFactor(self._zoom_factor)
+        self._layout.addWidget(self.web_view)
 
     def update_preview(self, markdown_text: str):
-        html_content = self.converter.convert(markdown_text)
+        if not self.is_initialized:
+            self._pending_markdown = markdown_text  # rendered by initialize()
+            return
+        html_content = self._versioned_images(self.converter.convert(markdown_text))
         has_mermaid = 'class="mermaid"' in html_content
 
         # Inject scroll preservation script into HTML
@@ -94,8 +129,20 @@ class PreviewWidget(QWidget):
             base_url = QUrl.fromLocalFile(str(self.base_path) + "/")
             self.web_view.setHtml(full_html, base_url)
 
+    def reload_images(self):
+        """Make the next update_preview() fetch local images again (they changed on disk)."""
+        self._image_version += 1
+
+    def _versioned_images(self, html: str) -> str:
+        if not self._image_version:
+            return html
+        return _LOCAL_IMG_SRC.sub(lambda m: f"{m.group(1)}{m.group(2)}?v={self._image_version}",
+                                  html)
+
     def scroll_to_ratio(self, ratio: float):
         """Scroll preview to a given ratio (0.0 to 1.0)."""
+        if not self.is_initialized:
+            return
         js = f"""
         (function() {{
             var maxScroll = document.documentElement.scrollHeight - document.documentElement.clientHeight;
@@ -172,12 +219,16 @@ class PreviewWidget(QWidget):
         return self._wrap_html(html_content, include_mermaid=has_mermaid)
 
     def zoom_in(self):
-        self.web_view.setZoomFactor(self.web_view.zoomFactor() + 0.1)
+        self._set_zoom(self._zoom_factor + 0.1)
 
     def zoom_out(self):
-        factor = self.web_view.zoomFactor()
-        if factor > 0.3:
-            self.web_view.setZoomFactor(factor - 0.1)
+        if self._zoom_factor > 0.3:
+            self._set_zoom(self._zoom_factor - 0.1)
 
     def zoom_reset(self):
-        self.web_view.setZoomFactor(1.0)
+        self._set_zoom(1.0)
+
+    def _set_zoom(self, factor: float):
+        self._zoom_factor = factor
+        if self.is_initialized:
+            self.web_view.setZoomFactor(factor)
@@ -0,0 +1,350 @@
+"""DocumentJournal — an append-only crash-recovery journal for the editor document.
+
+Instead of rewriting the user's file every few seconds, every edit
+reported by QTextDocument.contentsChange is appended to a side file in
+the recovery directory as a compact delta. After a crash the journal is
+replayed onto its base to rebuild the unsaved text; the real file is only
+written when the user saves.
+
+A journal is a UTF-8 file of JSON lines:
+
+    {"v": 1, "file": "/path/doc.md" | null, "digest": "..." | null,
+     "encoding": ["utf-8", "<bom hex>"], "length": n}
+    {"s": "full document text", "n": n, "f": {"3": "folded payload", ...}}   snapshot
+    [position, removed, "inserted text", n]                                     delta
+    {"f": {"4": "folded payload"}}                                              new folds
+
+The header's base is either the saved file (identified by its content
+digest) or, when it carries no file, an empty document; a snapshot
+replaces everything before it. Positions and lengths are in document
+(UTF-16) units, so replay goes through a QTextDocument too. Fold
+placeholders are journaled as they are and expanded with the recorded
+payloads at the end.
+
+Edits are buffered and appended once per JOURNAL_FLUSH_INTERVAL. After
+enough edits the journal is checkpointed — rewritten as one snapshot —
+so replay stays short. A journal is created on the first edit after a
+save and deleted when the document becomes clean again, and each one is
+guarded by a QLockFile; a journal whose lock is stale belongs to a
+process that died, and find_orphaned_journals() returns it.
+"""
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from PySide6.QtCore import QObject, QTimer, QLockFile
+from PySide6.QtGui import QTextCursor, QTextDocument
+
+from src.constants import (
+    JOURNAL_FLUSH_INTERVAL, JOURNAL_CHECKPOINT_EDITS, JOURNAL_CHECKPOINT_UNIT
+)
+from src.editor.folding import FoldRegistry
+from src.file_loader import TextSource
+from src.file_writer import TextEncoding, UTF8, atomic_write
+
+JOURNAL_VERSION = 1
+JOURNAL_SUFFIX = ".journal"
+_PARAGRAPH_SEPARATOR = "\u2029"  # how QTextCursor.selectedText() reports a line break
+
+
+class RecoveredDocument(NamedTuple):
+    journal: Path
+    file: Optional[Path]   # the document's file, None if it was never saved
+    text: Optional[str]    # rebuilt text; None if the journal could not be replayed
+    modified: float        # when the journal was last written (epoch seconds)
+    error: str = ""
+
+
+def _lock_path(journal: Path) -> str:
+    return str(journal) + ".lock"
+
+
+def _document_length(document: QTextDocument) -> int:
+    return document.characterCount() - 1  # the final paragraph separator is implicit
+
+
+class DocumentJournal(QObject):
+    """Journals the edits of one QTextDocument into directory."""
+
+    def __init__(self, document: QTextDocument, folds: FoldRegistry, directory,
+                 parent=None):
+        super().__init__(parent)
+        self._document = document
+        self._folds = folds
+        self._directory = Path(directory)
+        self._path: Optional[Path] = None  # journal file, created on the first edit
+        self._lock: Optional[QLockFile] = None
+        self._stream = None
+        self._header: Optional[dict] = None  # base for the next journal file
+        self._pending: List[str] = []        # encoded records not yet written
+        self._length = _document_length(document)
+        self._fold_mark = folds.next_id       # folds from here on are not journaled yet
+        self._edits = 0                       # deltas since the last snapshot
+        self._paused = True
+        self._snapshot_base = False  # the saved file cannot serve as the base
+        self._resync = False         # a delta went missing; write a snapshot next
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(JOURNAL_FLUSH_INTERVAL)
+        self._flush_timer.timeout.connect(self.flush)
+        document.contentsChange.connect(self._on_contents_change)
+
+    @property
+    def path(self) -> Optional[Path]:
+        return self._path
+
+    def pause(self):
+        """Ignore edits until the next reset(), e.g. while a file is loaded."""
+        self._paused = True
+
+    def reset(self, file=None, digest: Optional[bytes] = None,
+              encoding: TextEncoding = UTF8, dirty: bool = False):
+        """Start over from file as saved (None: a new, empty document).
+
+        digest is the content_digest of the saved text and encoding the
+        file's, so recovery can tell whether the file is still the base.
+        Call after loading, saving or starting a new document; the journal
+        file is deleted. dirty means the document already differs from the
+        saved text (edits made during a background save), so it is
+        snapshotted at once.
+        """
+        self._flush_timer.stop()
+        self._pending = []
+        self._paused = False
+        self._length = _document_length(self._document)
+        self._fold_mark = self._folds.next_id
+        self._edits = 0
+        self._resync = False
+        self._header = {
+            "v": JOURNAL_VERSION,
+            "file": str(file) if file else None,
+            "digest": digest.hex() if file else None,
+            "encoding": [encoding.codec, encoding.bom.hex()],
+            "length": self._length,
+        }
+        # Folded text cannot be rebuilt from the file, so it needs a snapshot
+        self._snapshot_base = len(self._folds) > 0 or (not file and self._length > 0)
+        self._delete_file()
+        if dirty:
+            self.checkpoint()
+
+    def discard(self):
+        """Delete the journal and release its lock, e.g. when the window closes."""
+        self._flush_timer.stop()
+        self._pending = []
+        self._paused = True
+        self._delete_file()
+        if self._lock is not None:
+            self._lock.unlock()
+            self._lock = None
+            self._path = None
+
+    def flush(self):
+        """Append buffered edits to the journal file (checkpointing if due)."""
+        self._flush_timer.stop()
+        if self._paused or (not self._pending and not self._resync):
+            return
+        if (self._resync or (self._snapshot_base and self._stream is None)
+                or self._edits >= self._checkpoint_threshold()):
+            self.checkpoint()
+            return
+        if self._folds.next_id != self._fold_mark:
+            self._pending.insert(0, self._encode({"f": self._new_folds()}))
+        try:
+            if self._stream is None:
+                self._open(self._header)
+            self._stream.write("".join(self._pending))
+            self._stream.flush()
+        except (OSError, ValueError):
+            # Start over with a snapshot on the next edit
+            self._close_stream()
+            self._resync = True
+            return
+        self._pending = []
+
+    def checkpoint(self):
+        """Rewrite the journal as one snapshot of the current document."""
+        self._flush_timer.stop()
+        self._close_stream()
+        snapshot = {
+            "s": self._document.toPlainText(),
+            "n": _document_length(self._document),
+            "f": {str(key): value for key, value in self._folds.payloads_since(0).items()},
+        }
+        try:
+            self._acquire()
+            atomic_write(self._path, self._encode(self._header) + self._encode(snapshot))
+            self._stream = open(self._path, "a", encoding="utf-8", newline="\n")
+        except (OSError, ValueError):
+            self._resync = True  # the next edit tries again
+            return
+        self._pending = []
+        self._edits = 0
+        self._resync = False
+        self._fold_mark = self._folds.next_id
+
+    def _on_contents_change(self, position: int, removed: int, added: int):
+        if self._paused or (removed == 0 and added == 0):
+            return
+        old_length = self._length
+        length = _document_length(self._document)
+        self._length = length
+        # Qt may report the implicit final separator or a range it already
+        # merged with later edits; a delta that does not add up is resynced
+        removed = max(0, min(removed, old_length - position))
+        added = max(0, min(added, length - position))
+        if old_length - removed + added != length:
+            self._resync = True
+        elif not self._resync:
+            cursor = QTextCursor(self._document)
+            cursor.setPosition(position)
+            cursor.setPosition(position + added, QTextCursor.KeepAnchor)
+            text = cursor.selectedText().replace(_PARAGRAPH_SEPARATOR, "\n")
+            self._pending.append(self._encode([position, removed, text, length]))
+            self._edits += 1
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _checkpoint_threshold(self) -> int:
+        # A snapshot costs O(document): make large documents take more edits
+        return JOURNAL_CHECKPOINT_EDITS * max(1, self._length // JOURNAL_CHECKPOINT_UNIT)
+
+    def _new_folds(self) -> Dict[str, str]:
+        folds = self._folds.payloads_since(self._fold_mark)
+        self._fold_mark = self._folds.next_id
+        return {str(key): value for key, value in folds.items()}
+
+    @staticmethod
+    def _encode(record) -> str:
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def _acquire(self):
+        """Pick a journal file name and lock it, once per journal object."""
+        if self._path is not None:
+            return
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self._directory / f"{uuid.uuid4().hex}{JOURNAL_SUFFIX}"
+        lock = QLockFile(_lock_path(path))
+        lock.setStaleLockTime(0)  # only a dead owner makes the lock stale
+        if not lock.tryLock(0):
+            raise OSError(f"Cannot lock recovery journal {path}")
+        self._path, self._lock = path, lock
+
+    def _open(self, header: dict):
+        self._acquire()
+        self._stream = open(self._path, "w", encoding="utf-8", newline="\n")
+        self._stream.write(self._encode(header))
+
+    def _close_stream(self):
+        if self._stream is not None:
+            try:
+                self._stream.close()
+            except OSError:
+                pass
+            self._stream = None
+
+    def _delete_file(self):
+        self._close_stream()
+        if self._path is not None:
+            try:
+                os.unlink(self._path)
+            except OSError:
+                pass
+            # Keep the name and the lock: the next journal reuses them
+
+
+def find_orphaned_journals(directory) -> List[Path]:
+    """Journals left behind by processes that died, most recent first."""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    orphans = []
+    for path in directory.glob("*" + JOURNAL_SUFFIX):
+        lock = QLockFile(_lock_path(path))
+        lock.setStaleLockTime(0)
+        if lock.tryLock(0):  # succeeds only if the owner is gone
+            lock.unlock()
+            orphans.append(path)
+    for lock_path in directory.glob("*" + JOURNAL_SUFFIX + ".lock"):
+        if not lock_path.with_suffix("").exists():
+            # Left by a crash while the document was clean
+            lock = QLockFile(str(lock_path))
+            lock.setStaleLockTime(0)
+            if lock.tryLock(0):
+                lock.unlock()
+    return sorted(orphans, key=lambda p: p.stat().st_mtime, reverse=True)
+
+
+def discard_journal(path):
+    for name in (str(path), _lock_path(Path(path))):
+        try:
+            os.unlink(name)
+        except OSError:
+            pass
+
+
+def recover(path) -> RecoveredDocument:
+    """Replay the journal at path into the document text it describes."""
+    path = Path(path)
+    try:
+        modified = path.stat().st_mtime
+        with open(path, "r", encoding="utf-8", newline="\n") as f:
+            lines = f.read().split("\n")
+    except (OSError, ValueError) as e:
+        return RecoveredDocument(path, None, None, 0.0, str(e))
+
+    try:
+        header = json.loads(lines[0])
+    except ValueError:
+        return RecoveredDocument(path, None, None, modified, "The journal is damaged")
+    file = Path(header["file"]) if header.get("file") else None
+    if header.get("v") != JOURNAL_VERSION:
+        return RecoveredDocument(path, file, None, modified, "Unknown journal version")
+
+    def failed(error):
+        return RecoveredDocument(path, file, None, modified, error)
+
+    document = QTextDocument()
+    folds = FoldRegistry()
+    has_base = file is None
+    for line in lines[1:]:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            break  # a record torn by the crash ends the journal
+        if isinstance(record, dict):
+            if "s" in record:
+                document.setPlainText(record["s"])
+                has_base = True
+            folds.restore({int(key): value for key, value in record.get("f", {}).items()})
+            continue
+        if not has_base:
+            # Deltas apply to the saved file as it was when the journal started
+            codec, bom = header.get("encoding", ["utf-8", ""])
+            try:
+                source = TextSource(file, TextEncoding(codec, bytes.fromhex(bom)))
+                base = source.read()
+            except (OSError, LookupError, ValueError) as e:
+                return failed(f"Cannot read {file.name}: {e}")
+            if source.digest.hex() != header.get("digest"):
+                return failed(f"{file.name} was changed after the journal was started")
+            document.setPlainText(base)
+            if _document_length(document) != header.get("length"):
+                return failed("The journal does not match its document")
+            has_base = True
+        position, removed, text, length = record
+        if position + removed > _document_length(document):
+            return failed("The journal does not match its document")
+        cursor = QTextCursor(document)
+        cursor.setPosition(position)
+        cursor.setPosition(position + removed, QTextCursor.KeepAnchor)
+        cursor.insertText(text)
+        if _document_length(document) != length:
+            return failed("The journal does not match its document")
+
+    if not has_base:
+        return failed("The journal holds no changes")
+    return RecoveredDocument(path, file, folds.expand(document.toPlainText()), modified)
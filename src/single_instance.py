@@ -0,0 +1,101 @@
+"""Single-instance mode — a second launch hands its files to the running editor.
+
+The first instance listens on a QLocalServer named per user. A later
+launch connects to it before it creates a QApplication or imports the
+editor (QtWebEngine, markdown, Pygments), sends the files it was given
+as one JSON line, waits for "ok" and exits. Only QtCore and QtNetwork
+are loaded for that, so it is done in a fraction of a second.
+
+If nothing answers, the launch starts a normal editor and becomes the
+instance others talk to; the socket a crashed instance left behind is
+removed first.
+"""
+import getpass
+import hashlib
+import json
+from typing import List, Optional
+
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtNetwork import QLocalServer, QLocalSocket
+
+from src.constants import SINGLE_INSTANCE_TIMEOUT
+
+_MAX_MESSAGE = 1024 * 1024  # bytes; a hand-off is a list of paths
+
+
+def server_name() -> str:
+    """Name of the local socket, one per user (sockets of all users may share /tmp)."""
+    try:
+        user = getpass.getuser()
+    except Exception:  # no user name in the environment
+        user = ""
+    return "MarkdownEditor-" + hashlib.blake2b(user.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def forward_to_running_instance(files: List[str], name: Optional[str] = None,
+                                timeout: int = SINGLE_INSTANCE_TIMEOUT) -> bool:
+    """Ask a running editor to open files (absolute paths; none: just show itself).
+
+    True if it acknowledged them; False if there is none or it did not
+    answer within timeout milliseconds per step.
+    """
+    socket = QLocalSocket()
+    socket.connectToServer(name or server_name())
+    if not socket.waitForConnected(timeout):
+        return False
+    socket.write(json.dumps({"files": files}).encode("utf-8") + b"\n")
+    if not socket.waitForBytesWritten(timeout):
+        return False
+    while not socket.canReadLine():
+        if not socket.waitForReadyRead(timeout):
+            return False
+    reply = bytes(socket.readLine()).strip()
+    socket.disconnectFromServer()
+    return reply == b"ok"
+
+
+class InstanceServer(QObject):
+    """Receives the files later launches forward; see forward_to_running_instance()."""
+
+    files_received = Signal(list)  # absolute paths, possibly none
+
+    def __init__(self, name: Optional[str] = None, parent=None):
+        super().__init__(parent)
+        self.name = name or server_name()
+        self._server = QLocalServer(self)
+        self._server.setSocketOptions(QLocalServer.UserAccessOption)
+        self._server.newConnection.connect(self._on_new_connection)
+
+    def listen(self) -> bool:
+        """Start serving; False if the name cannot be taken (the editor still runs)."""
+        if self._server.listen(self.name):
+            return True
+        # Left behind by an instance that crashed: nobody answered on it
+        QLocalServer.removeServer(self.name)
+        return self._server.listen(self.name)
+
+    def close(self):
+        self._server.close()
+
+    def _on_new_connection(self):
+        while self._server.hasPendingConnections():
+            socket = self._server.nextPendingConnection()
+            socket.readyRead.connect(lambda s=socket: self._on_ready_read(s))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def _on_ready_read(self, socket: QLocalSocket):
+        if not socket.canReadLine():
+            if socket.bytesAvailable() > _MAX_MESSAGE:
+                socket.abort()
+            return
+        try:
+            message = json.loads(bytes(socket.readLine()).decode("utf-8"))
+            files = [str(path) for path in message["files"]]
+        except (ValueError, KeyError, TypeError):
+            socket.write(b"error\n")
+            socket.disconnectFromServer()
+            return
+        socket.write(b"ok\n")
+        socket.flush()
+        socket.disconnectFromServer()
+        self.files_received.emit(files)
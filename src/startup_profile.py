@@ -0,0 +1,87 @@
+"""Startup profile — where the time to a usable window goes (--profile-startup).
+
+When enabled, every module imported for the first time is timed
+(including the modules it imports in turn, like python -X importtime's
+cumulative column), and startup phases are marked as they are reached:
+arguments parsed, QApplication created, main window built, first paint,
+preview ready. report() writes both to stderr once the preview is up, or
+to REPORT_FILE_NAME in the temp directory where there is no stderr (the
+windowed build).
+
+Disabled (the default), mark() and report() do nothing and no import
+hook is installed.
+"""
+import builtins
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+_IMPORTS_SHOWN = 25  # slowest imports listed in the report
+REPORT_FILE_NAME = "markdown-editor-startup-profile.txt"
+
+
+class StartupProfile:
+    def __init__(self):
+        self.enabled = False
+        self._started = time.perf_counter()
+        self._marks: List[Tuple[str, float]] = []
+        self._imports: Dict[str, float] = {}  # module -> seconds, including its imports
+        self._original_import = None
+        self._reported = False
+
+    def enable(self, started: Optional[float] = None):
+        """Start profiling; started is a time.perf_counter() value to count from."""
+        if self.enabled:
+            return
+        self.enabled = True
+        if started is not None:
+            self._started = started
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._imports.setdefault(name, time.perf_counter() - started)
+
+    def mark(self, phase: str):
+        """Record that startup reached phase."""
+        if self.enabled:
+            self._marks.append((phase, time.perf_counter() - self._started))
+
+    def report(self, stream=None):
+        """Write the phases and the slowest imports (once), and stop timing imports."""
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+        builtins.__import__ = self._original_import
+        if stream is None:
+            stream = sys.stderr
+        if stream is None:
+            # A windowed build has no stderr; tempfile is only loaded for it
+            import tempfile
+            path = os.path.join(tempfile.gettempdir(), REPORT_FILE_NAME)
+            with open(path, "w", encoding="utf-8") as file:
+                self._write(file)
+            return
+        self._write(stream)
+        stream.flush()
+
+    def _write(self, stream):
+        print("Startup profile (milliseconds since launch):", file=stream)
+        previous = 0.0
+        for phase, at in self._marks:
+            print(f"  {at * 1000:8.1f}  (+{(at - previous) * 1000:7.1f})  {phase}", file=stream)
+            previous = at
+        print("Slowest imports (milliseconds, including what they import):", file=stream)
+        slowest = sorted(self._imports.items(), key=lambda item: item[1], reverse=True)
+        for name, seconds in slowest[:_IMPORTS_SHOWN]:
+            print(f"  {seconds * 1000:8.1f}  {name}", file=stream)
+
+
+startup_profile = StartupProfile()
@@ -14,6 +14,7 @@ class ThemeColors:
     selection: str
     accent: str
     current_line: str = "#e8f0fe"
+    find_match: str = "#fff3a3"
 
 
 class Theme:
@@ -28,6 +29,7 @@ class Theme:
         selection="#0366d6",
         accent="#0066cc",
         current_line="#e8f0fe",
+        find_match="#fff3a3",
     )
 
     DARK = ThemeColors(
@@ -41,6 +43,7 @@ class Theme:
         selection="#264f78",
         accent="#569cd6",
         current_line="#2a2d2e",
+        find_match="#613214",
     )
 
     _current_mode = None  # None means follow system
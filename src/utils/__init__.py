@@ -1,3 +1,5 @@
 from .markdown_converter import MarkdownConverter
 from .image_handler import ImageHandler
+from .image_downloader import ImageDownloader
 from .theme_detector import ThemeDetector
+from .fuzzy_match import FuzzyIndex
@@ -0,0 +1,114 @@
+"""Fuzzy title search — ranked subsequence matching over a normalized index.
+
+Titles and queries are NFC-normalized, lowercased, and Hangul syllables are
+split into compatibility jamo (compound jamo split further), so "ㅎㄱ",
+"한그" and "한글" all find "한글 문서" — including half-composed input
+while the IME is still building a syllable.
+
+FuzzyIndex joins every normalized title into one newline-separated string,
+so a query is a single regex scan in C rather than a Python loop per title;
+only the titles that match are scored in Python.
+"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_SYLLABLE_FIRST = 0xAC00
+_SYLLABLE_LAST = 0xD7A3
+_CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONGSEONG = ["", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ",
+              "ㄿ", "ㅀ", "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ"]
+# Compound jamo are typed as two keys, so match them as two
+_COMPOUND_JAMO = {
+    "ㄳ": "ㄱㅅ", "ㄵ": "ㄴㅈ", "ㄶ": "ㄴㅎ", "ㄺ": "ㄹㄱ", "ㄻ": "ㄹㅁ", "ㄼ": "ㄹㅂ",
+    "ㄽ": "ㄹㅅ", "ㄾ": "ㄹㅌ", "ㄿ": "ㄹㅍ", "ㅀ": "ㄹㅎ", "ㅄ": "ㅂㅅ",
+    "ㅘ": "ㅗㅏ", "ㅙ": "ㅗㅐ", "ㅚ": "ㅗㅣ", "ㅝ": "ㅜㅓ", "ㅞ": "ㅜㅔ", "ㅟ": "ㅜㅣ", "ㅢ": "ㅡㅣ",
+}
+_WORD_SEPARATORS = " -_/.:()[]"
+
+
+@lru_cache(maxsize=1)
+def _jamo_table() -> dict:
+    """str.translate table from syllables and compound jamo to basic jamo."""
+    table = {ord(jamo): parts for jamo, parts in _COMPOUND_JAMO.items()}
+    for code in range(_SYLLABLE_FIRST, _SYLLABLE_LAST + 1):
+        offset = code - _SYLLABLE_FIRST
+        jamo = (_CHOSEONG[offset // 588] + _JUNGSEONG[(offset % 588) // 28]
+                + _JONGSEONG[offset % 28])
+        table[code] = "".join(_COMPOUND_JAMO.get(part, part) for part in jamo)
+    return table
+
+
+def normalize(text: str) -> str:
+    """Lowercase text with Hangul syllables decomposed into basic jamo."""
+    return unicodedata.normalize("NFC", text).lower().translate(_jamo_table())
+
+
+class FuzzyIndex:
+    """Ranks titles by how well they contain a query as a subsequence."""
+
+    def __init__(self, titles: Sequence[str], cache: Optional[Dict[str, str]] = None):
+        """cache maps titles to their normalized form and is filled as a side
+        effect; pass the same dict again so a rebuild after an edit only
+        normalizes the titles that are new."""
+        self._count = len(titles)
+        if cache is None:
+            cache = {}
+        missing = [title for title in dict.fromkeys(titles) if title not in cache]
+        if missing:
+            # Titles never contain newlines, so one normalize() covers them all
+            cache.update(zip(missing, normalize("\n".join(missing)).split("\n")))
+        self._text = "\n".join([cache[title] for title in titles])
+        starts = [0]
+        starts.extend(match.end() for match in re.finditer("\n", self._text))
+        starts.append(len(self._text) + 1)  # sentinel: one past the last title
+        self._starts = starts  # a list: bisect is much faster on lists than on arrays
+
+    def __len__(self):
+        return self._count
+
+    def search(self, query: str, limit: int = 200) -> List[Tuple[int, float]]:
+        """Up to limit (title number, score) pairs, best first.
+
+        Whitespace in the query is ignored. Contiguous matches rank above
+        scattered ones, then matches at the start of the title or of a word,
+        then earlier and tighter matches, then shorter titles.
+        """
+        needle = "".join(normalize(query).split())
+        if not needle or not self._count:
+            return []
+        # "a[^\nb]*b[^\nc]*c": each gap stops at the first next character, so
+        # failing titles are rejected without nested backtracking
+        pattern = re.compile(re.escape(needle[0]) + "".join(
+            "[^\n" + re.escape(char) + "]*" + re.escape(char) for char in needle[1:]
+        ))
+        text, starts = self._text, self._starts
+        search, find, title_of = pattern.search, text.find, bisect_right
+        size = len(needle)
+        scored = []
+        match = search(text)
+        while match:
+            start = match.start()
+            title = title_of(starts, start) - 1
+            line_start = starts[title]
+            line_end = starts[title + 1] - 1
+
+            found = find(needle, line_start, line_end)
+            if found >= 0:
+                start, score = found, 100.0
+            else:
+                score = -2.0 * (match.end() - start - size)  # gaps
+            if start == line_start:
+                score += 50
+            elif text[start - 1] in _WORD_SEPARATORS:
+                score += 25
+            score -= (start - line_start) * 0.5 + (line_end - line_start) * 0.1
+            scored.append((score, -title))
+            # Only the first match in a title counts; go on with the next title
+            match = search(text, line_end + 1)
+
+        return [(-title, score) for score, title in heapq.nlargest(limit, scored)]
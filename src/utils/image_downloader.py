@@ -0,0 +1,86 @@
+"""ImageDownloader — fetches pasted image URLs without blocking the editor.
+
+Requests go through one QNetworkAccessManager for the whole application,
+which keeps connections alive and reuses them (up to six at a time per
+host), so several downloads run side by side while typing goes on. Each
+download gets an id; finished(id, data, error) reports it on the GUI
+thread, with data None and error set if it failed, timed out after
+IMAGE_DOWNLOAD_TIMEOUT or grew past IMAGE_DOWNLOAD_MAX_SIZE.
+
+Replies are owned by the downloader that started them, so closing an
+editor aborts its downloads.
+"""
+from typing import Dict, Optional
+
+from PySide6.QtCore import QCoreApplication, QObject, QUrl, Signal
+from PySide6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+
+from src.constants import IMAGE_DOWNLOAD_TIMEOUT, IMAGE_DOWNLOAD_MAX_SIZE
+
+_USER_AGENT = (b"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+               b"(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+
+_manager: Optional[QNetworkAccessManager] = None
+
+
+def network_manager() -> QNetworkAccessManager:
+    """The application's QNetworkAccessManager (its connection pool), made on first use."""
+    global _manager
+    if _manager is None:
+        _manager = QNetworkAccessManager(QCoreApplication.instance())
+    return _manager
+
+
+class ImageDownloader(QObject):
+    finished = Signal(int, object, str)  # download id, bytes or None, error message
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._replies: Dict[QNetworkReply, int] = {}
+        self._too_large = set()
+        self._next_id = 1
+
+    @property
+    def pending(self) -> int:
+        """Downloads not finished yet."""
+        return len(self._replies)
+
+    def download(self, url: str) -> int:
+        """Start downloading url; returns the id finished() will report it with."""
+        request = QNetworkRequest(QUrl(url))
+        # Headers of a browser: some image hosts answer 403 otherwise
+        request.setRawHeader(b"User-Agent", _USER_AGENT)
+        request.setRawHeader(b"Accept", b"image/webp,image/apng,image/*,*/*;q=0.8")
+        request.setRawHeader(b"Accept-Language", b"en-US,en;q=0.9")
+        request.setRawHeader(b"Referer", url.encode("utf-8"))
+        request.setTransferTimeout(IMAGE_DOWNLOAD_TIMEOUT)
+
+        download_id = self._next_id
+        self._next_id += 1
+        reply = network_manager().get(request)
+        reply.setParent(self)  # deleted, and so aborted, with the downloader
+        self._replies[reply] = download_id
+        reply.downloadProgress.connect(self._on_progress)
+        reply.finished.connect(self._on_finished)
+        return download_id
+
+    def _on_progress(self, received: int, _total: int):
+        reply = self.sender()
+        if received > IMAGE_DOWNLOAD_MAX_SIZE and reply in self._replies:
+            self._too_large.add(reply)
+            reply.abort()
+
+    def _on_finished(self):
+        reply = self.sender()
+        download_id = self._replies.pop(reply, None)
+        if download_id is None:
+            return
+        if reply in self._too_large:
+            self._too_large.discard(reply)
+            data, error = None, f"larger than {IMAGE_DOWNLOAD_MAX_SIZE // (1024 * 1024)} MB"
+        elif reply.error() != QNetworkReply.NoError:
+            data, error = None, reply.errorString()
+        else:
+            data, error = bytes(reply.readAll()), ""
+        reply.deleteLater()
+        self.finished.emit(download_id, data, error)
@@ -1,14 +1,17 @@
 import os
 import re
 import uuid
+import base64
+import binascii
+import urllib.parse
 import urllib.request
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Set
 from PySide6.QtCore import QMimeData
 from PySide6.QtGui import QImage
 
-from src.constants import IMAGE_EXTENSIONS
+from src.constants import IMAGE_EXTENSIONS, DATA_URI_PATTERN
 
 
 class ImageHandler:
@@ -26,6 +29,15 @@ class ImageHandler:
         re.IGNORECASE
     )
 
+    # Image references in markdown (![alt](path "title")) and HTML (<img src="path">)
+    IMAGE_REFERENCE_PATTERN = re.compile(
+        r'!\[[^\]\n]*\]\(\s*(?:<([^>\n]+)>|([^)\s]+))'
+        r'|<img\b[^>]*?\bsrc\s*=\s*["\']([^"\']+)["\']',
+        re.IGNORECASE
+    )
+    # Two letters at least, so a Windows drive ("C:") is not taken for a scheme
+    URL_SCHEME_PATTERN = re.compile(r'^[a-z][\w+.-]+:', re.IGNORECASE)
+
     def __init__(self, base_path: str = None):
         self.base_path = Path(base_path) if base_path else Path.cwd()
         self.images_dir = self.base_path / "images"
@@ -62,44 +74,41 @@ class ImageHandler:
         b'BM': '.bmp',
     }
 
-    def save_image_from_url(self, url: str) -> Optional[str]:
+    def save_image_from_data_uri(self, uri: str) -> Optional[str]:
+        """Decode a base64 image data URI into images/. Returns the relative path."""
+        uri = uri.strip()
+        if not DATA_URI_PATTERN.fullmatch(uri):
+            return None
         try:
-            self.ensure_images_dir()
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            unique_id = uuid.uuid4().hex[:8]
-
-            # Download with headers to avoid 403
-            request = urllib.request.Request(
-                url,
-                headers={
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.9',
-                    'Referer': url,
-                }
-            )
-
-            with urllib.request.urlopen(request, timeout=15) as response:
-                data = response.read()
-
-                # Check for image by magic bytes
-                ext = self._detect_image_type(data)
-                if ext is None:
-                    # Not a valid image
-                    return None
-
-                filename = f"image_{timestamp}_{unique_id}{ext}"
-                filepath = self.images_dir / filename
-
-                with open(filepath, 'wb') as f:
-                    f.write(data)
-
-            return f"images/{filename}"
+            data = base64.b64decode(uri[uri.index(",") + 1:], validate=True)
+        except (binascii.Error, ValueError) as e:
+            self.last_error = f"Invalid embedded image: {e}"
+            return None
+        try:
+            return self.save_image_bytes(data)
+        except OSError as e:
+            self.last_error = f"Failed to save image: {e}"
+            return None
 
-        except Exception as e:
-            self.last_error = f"Failed to download image: {e}"
+    def save_image_bytes(self, data: bytes) -> Optional[str]:
+        """Write raw image bytes into images/. Returns None if not an image."""
+        # Check for image by magic bytes
+        ext = self._detect_image_type(data)
+        if ext is None:
+            # Not a valid image
             return None
 
+        self.ensure_images_dir()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        unique_id = uuid.uuid4().hex[:8]
+        filename = f"image_{timestamp}_{unique_id}{ext}"
+        filepath = self.images_dir / filename
+
+        with open(filepath, 'wb') as f:
+            f.write(data)
+
+        return f"images/{filename}"
+
     def _detect_image_type(self, data: bytes) -> Optional[str]:
         """Detect image type from magic bytes"""
         if len(data) < 12:
@@ -138,6 +147,21 @@ class ImageHandler:
 
         return False
 
+    def local_images(self, text: str) -> Set[Path]:
+        """Files of the local images text refers to (web URLs and data URIs excluded)."""
+        paths = set()
+        for match in self.IMAGE_REFERENCE_PATTERN.finditer(text):
+            ref = match.group(1) or match.group(2) or match.group(3)
+            if ref.lower().startswith("file:"):
+                ref = urllib.request.url2pathname(urllib.parse.urlparse(ref).path)
+            elif self.URL_SCHEME_PATTERN.match(ref):
+                continue
+            else:
+                ref = urllib.parse.unquote(ref.split("#", 1)[0].split("?", 1)[0])
+            if ref:
+                paths.add(self.base_path / ref)  # an absolute ref replaces base_path
+        return paths
+
     def get_markdown_image_syntax(self, image_path: str, alt_text: str = "image") -> str:
         return f"![{alt_text}]({image_path})"
 
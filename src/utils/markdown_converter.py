@@ -1,9 +1,10 @@
 import re
-import markdown
-from pygments.formatters import HtmlFormatter
 
 
 class MarkdownConverter:
+    # markdown and Pygments are imported on first use, not with src.utils:
+    # the editor is up before anything is rendered
+
     # Pattern to match mermaid code blocks
     MERMAID_PATTERN = re.compile(
         r'```mermaid\s*\n(.*?)```',
@@ -11,6 +12,8 @@ class MarkdownConverter:
     )
 
     def __init__(self):
+        import markdown
+
         self.md = markdown.Markdown(
             extensions=[
                 'fenced_code',
@@ -60,6 +63,8 @@ class MarkdownConverter:
     @classmethod
     def get_code_highlight_css(cls, style='monokai') -> str:
         if style not in cls._highlight_css_cache:
+            from pygments.formatters import HtmlFormatter
+
             formatter = HtmlFormatter(style=style)
             cls._highlight_css_cache[style] = formatter.get_style_defs('.highlight')
         return cls._highlight_css_cache[style]
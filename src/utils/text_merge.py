@@ -0,0 +1,90 @@
+"""Three-way text merge — line-based, in the manner of diff3.
+
+merge3() takes the text both sides started from (base), the editor's
+version (mine) and the version found on disk (theirs). Lines that only one
+side changed take that side's change; where both sides changed the same
+lines differently, both versions are kept between git-style conflict
+markers for the user to resolve.
+"""
+from difflib import SequenceMatcher
+from typing import List, NamedTuple, Tuple
+
+MINE_LABEL = "Editor"
+THEIRS_LABEL = "On disk"
+
+
+class MergeResult(NamedTuple):
+    text: str
+    conflicts: int  # regions where both sides changed the same lines
+
+
+def split_lines(text: str) -> List[str]:
+    """Lines of text, each keeping its "\\n" (the last one may lack it)."""
+    lines = text.split("\n")
+    last = lines.pop()
+    lines = [line + "\n" for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+
+def _matches(base: List[str], other: List[str]) -> List[Tuple[int, int, int]]:
+    return SequenceMatcher(None, base, other, autojunk=False).get_matching_blocks()
+
+
+def _sync_regions(base, mine, theirs):
+    """Runs of base lines that both sides kept, as (base, mine, theirs, length) starts.
+
+    Ends with an empty region at the end of all three.
+    """
+    regions = []
+    a_blocks, b_blocks = _matches(base, mine), _matches(base, theirs)
+    ia = ib = 0
+    while ia < len(a_blocks) and ib < len(b_blocks):
+        a_base, a_start, a_len = a_blocks[ia]
+        b_base, b_start, b_len = b_blocks[ib]
+        start = max(a_base, b_base)
+        end = min(a_base + a_len, b_base + b_len)
+        if start < end:
+            regions.append((start, a_start + start - a_base, b_start + start - b_base,
+                            end - start))
+        if a_base + a_len < b_base + b_len:
+            ia += 1
+        else:
+            ib += 1
+    regions.append((len(base), len(mine), len(theirs), 0))
+    return regions
+
+
+def merge3(base: str, mine: str, theirs: str,
+           mine_label: str = MINE_LABEL, theirs_label: str = THEIRS_LABEL) -> MergeResult:
+    """Merge the changes mine and theirs each made to base."""
+    base_lines, mine_lines, theirs_lines = split_lines(base), split_lines(mine), split_lines(theirs)
+    out: List[str] = []
+    conflicts = 0
+    z = a = b = 0  # ends of the last stable region in base, mine and theirs
+    for z_start, a_start, b_start, length in _sync_regions(base_lines, mine_lines, theirs_lines):
+        old = base_lines[z:z_start]
+        ours = mine_lines[a:a_start]
+        other = theirs_lines[b:b_start]
+        if ours == old or ours == other:
+            out += other
+        elif other == old:
+            out += ours
+        else:
+            conflicts += 1
+            out.append(f"<<<<<<< {mine_label}\n")
+            out += _terminated(ours)
+            out.append("=======\n")
+            out += _terminated(other)
+            out.append(f">>>>>>> {theirs_label}\n")
+        out += base_lines[z_start:z_start + length]
+        z, a, b = z_start + length, a_start + length, b_start + length
+    return MergeResult("".join(out), conflicts)
+
+
+def _terminated(lines: List[str]) -> List[str]:
+    """lines with a final "\\n", so a conflict marker never joins a line."""
+    if lines and not lines[-1].endswith("\n"):
+        return lines[:-1] + [lines[-1] + "\n"]
+    return lines
@@ -23,12 +23,17 @@ def qapp():
 
 
 @pytest.fixture(scope="session")
-def main_window(qapp):
+def main_window(qapp, tmp_path_factory):
     """Create a single MainWindow for the entire test session.
     QWebEngineView crashes with multiple instances in test environments.
     Tests must not rely on fresh state - reset what they need."""
+    from PySide6.QtCore import QSettings
     from src.main_window import MainWindow
-    window = MainWindow()
+    # Its own settings file: the user's session and preferences stay untouched
+    settings = QSettings(str(tmp_path_factory.mktemp("settings") / "settings.ini"),
+                         QSettings.IniFormat)
+    window = MainWindow(recovery_dir=tmp_path_factory.mktemp("recovery"),
+                        history_dir=tmp_path_factory.mktemp("history"), settings=settings)
     yield window
     window.close()
 
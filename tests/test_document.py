@@ -0,0 +1,79 @@
+"""Tests for Document — suspending background tabs to a swap file."""
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.document import Document
+from src.recovery_journal import recover
+
+
+@pytest.fixture
+def document(qapp, tmp_path):
+    settings = MagicMock()
+    settings.value = MagicMock(return_value=[])
+    document = Document(settings, None, [], tmp_path / "recovery")
+    document.journal.reset()
+    yield document
+    document.journal.discard()
+    document.discard_swap()
+
+
+TEXT = "# 제목\n\n" + "본문 텍스트 line\n" * 500
+
+
+class TestDocument:
+    def test_new_document_is_pristine(self, document):
+        assert document.is_pristine
+        assert document.title == "Untitled"
+        document.editor.set_text("x")
+        assert not document.is_pristine
+
+    def test_suspend_releases_text(self, document, tmp_path):
+        document.editor.set_text(TEXT)
+        assert document.memory_estimate() > len(TEXT) * 2
+        document.suspend(tmp_path / "swap")
+        assert document.is_suspended
+        assert document.editor.get_text() == ""
+        assert document.memory_estimate() == 0
+        assert document.get_text() == TEXT
+        # Compressed on disk
+        assert len(list((tmp_path / "swap").iterdir())) == 1
+        assert not document.is_pristine
+
+    def test_resume_restores_text_and_view(self, document, tmp_path):
+        document.editor.set_text(TEXT)
+        document.editor.restore_view_state(1234, 0)
+        document.suspend(tmp_path / "swap")
+        document.resume()
+        assert not document.is_suspended
+        assert document.editor.get_text() == TEXT
+        assert document.editor.view_state()[0] == 1234
+        assert list((tmp_path / "swap").iterdir()) == []
+
+    def test_journal_survives_suspension(self, document, tmp_path):
+        document.editor.editor.insertPlainText("unsaved work")
+        document.suspend(tmp_path / "swap")
+        # Emptying the editor is not journaled as an edit
+        assert recover(document.journal.path).text == "unsaved work"
+
+    def test_deferred_document_reads_nothing_until_taken(self, document, tmp_path):
+        document.defer(tmp_path / "notes.md", (12, 3))
+        assert document.is_deferred
+        assert not document.is_pristine
+        assert document.title == "notes.md"
+        assert document.view_state() == (12, 3)
+        assert document.take_deferred() == tmp_path / "notes.md"
+        assert not document.is_deferred
+
+    def test_missing_swap_file_raises(self, document, tmp_path):
+        document.editor.set_text(TEXT)
+        document.suspend(tmp_path / "swap")
+        for path in (tmp_path / "swap").iterdir():
+            path.unlink()
+        with pytest.raises(OSError):
+            document.resume()
+        assert document.is_suspended
@@ -0,0 +1,92 @@
+"""Tests for DocumentChangeBus."""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from PySide6.QtWidgets import QPlainTextEdit
+from PySide6.QtGui import QTextCursor
+from src.editor.document_bus import DocumentChangeBus, StaleSnapshotError
+
+
+class TestDocumentChangeBus:
+    @pytest.fixture
+    def setup(self, qapp):
+        editor = QPlainTextEdit()
+        editor.setPlainText("hello")
+        bus = DocumentChangeBus(editor.document())
+        return editor, bus
+
+    def _insert_at_end(self, editor, text):
+        cursor = editor.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+
+    def test_revision_increments(self, setup):
+        editor, bus = setup
+        before = bus.revision
+        self._insert_at_end(editor, "!")
+        self._insert_at_end(editor, "?")
+        assert bus.revision == before + 2
+
+    def test_change_ranges_recorded(self, setup):
+        editor, bus = setup
+        self._insert_at_end(editor, " world")
+        change_set = bus.flush()
+        assert len(change_set.changes) == 1
+        change = change_set.changes[0]
+        assert change.position == 5
+        assert change.removed == 0
+        assert change.added == 6
+        assert change.revision == change_set.revision
+
+    def test_flush_clears_pending(self, setup):
+        editor, bus = setup
+        self._insert_at_end(editor, "x")
+        assert bus.has_pending_changes
+        bus.flush()
+        assert not bus.has_pending_changes
+        assert bus.flush().changes == ()
+
+    def test_content_changed_emitted_immediately(self, setup):
+        editor, bus = setup
+        received = []
+        bus.content_changed.connect(received.append)
+        self._insert_at_end(editor, "x")
+        assert len(received) == 1
+        assert received[0].added == 1
+
+    def test_snapshot_is_lazy(self, qapp):
+        editor = QPlainTextEdit()
+        calls = []
+
+        def provider():
+            calls.append(1)
+            return editor.toPlainText()
+
+        bus = DocumentChangeBus(editor.document(), text_provider=provider)
+        editor.setPlainText("abc")
+        snapshot = bus.snapshot()
+        assert calls == []
+        assert snapshot.text == "abc"
+        assert snapshot.text == "abc"
+        assert calls == [1]
+
+    def test_snapshot_shared_within_revision(self, setup):
+        _, bus = setup
+        assert bus.snapshot() is bus.snapshot()
+
+    def test_materialized_snapshot_is_immutable(self, setup):
+        editor, bus = setup
+        snapshot = bus.snapshot()
+        assert snapshot.text == "hello"
+        self._insert_at_end(editor, " world")
+        assert snapshot.text == "hello"
+        assert bus.snapshot().text == "hello world"
+
+    def test_stale_unmaterialized_snapshot_raises(self, setup):
+        editor, bus = setup
+        snapshot = bus.snapshot()
+        self._insert_at_end(editor, "!")
+        with pytest.raises(StaleSnapshotError):
+            _ = snapshot.text
@@ -5,6 +5,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pytest
 from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QPlainTextEdit
 
 
 class TestEditorBasicOperations:
@@ -256,3 +257,400 @@ class TestGoToLine:
         editor_widget.go_to_line(1)
         line, _ = editor_widget.get_cursor_position()
         assert line == 1
+
+
+class TestDocumentChanged:
+    """Test the debounced change-set signal."""
+
+    def test_document_changed_carries_ranges(self, editor_widget):
+        editor_widget.set_text("hello")
+        editor_widget._emit_text_changed()
+        received = []
+        editor_widget.document_changed.connect(received.append)
+        cursor = editor_widget.editor.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText("!")
+        editor_widget._emit_text_changed()
+        assert len(received) == 1
+        assert received[0].changes[0].position == 5
+        assert received[0].snapshot.text == "hello!"
+
+    def test_get_text_shares_snapshot(self, editor_widget):
+        editor_widget.set_text("shared")
+        assert editor_widget.get_text() is editor_widget.get_text()
+
+
+class TestLargeFileMode:
+    """Test chunked loading and feature degradation for large files."""
+
+    def _run(self, qapp, loader):
+        done = []
+        loader.finished.connect(done.append)
+        loader.start()
+        for _ in range(1000):
+            if done:
+                break
+            qapp.processEvents()
+        return done
+
+    def test_load_chunks(self, qapp, editor_widget):
+        loader = editor_widget.load_chunks(["line1\n", "line2\n", "line3"], 17)
+        assert self._run(qapp, loader) == [True]
+        assert editor_widget.get_text() == "line1\nline2\nline3"
+        assert not editor_widget.editor.isReadOnly()
+        assert not editor_widget.editor.document().isUndoAvailable()
+
+    def test_cancel_load(self, qapp, editor_widget):
+        def chunks():
+            while True:
+                yield "x" * 10
+
+        loader = editor_widget.load_chunks(chunks(), 1000)
+        loader.progress.connect(lambda done, total: loader.cancel())
+        assert self._run(qapp, loader) == [False]
+        assert editor_widget.get_text() == "x" * 10
+        assert not editor_widget.editor.isReadOnly()
+
+    def test_large_file_mode_detaches_highlighter(self, editor_widget):
+        editor_widget.set_large_file_mode(True)
+        assert editor_widget.highlighter.document() is None
+        editor_widget.set_large_file_mode(False)
+        assert editor_widget.highlighter.document() is editor_widget.editor.document()
+
+
+class TestLongLineSafeguard:
+    """Test folding of pathological line lengths."""
+
+    def test_set_text_folds_long_line(self, editor_widget):
+        from src.constants import LONG_LINE_THRESHOLD, LONG_LINE_VISIBLE
+        long_line = "a" * (LONG_LINE_THRESHOLD + 100)
+        text = f"# title\n{long_line}\nend"
+        editor_widget.set_text(text)
+        block = editor_widget.editor.document().findBlockByNumber(1)
+        assert block.length() < LONG_LINE_VISIBLE + 100
+        assert editor_widget.get_text() == text
+
+    def test_expand_fold_at_cursor(self, editor_widget):
+        from src.constants import LONG_LINE_THRESHOLD, LONG_LINE_VISIBLE
+        long_line = "b" * (LONG_LINE_THRESHOLD + 1)
+        editor_widget.set_text(long_line)
+        cursor = editor_widget.editor.textCursor()
+        cursor.setPosition(LONG_LINE_VISIBLE + 2)
+        editor_widget.editor.setTextCursor(cursor)
+        assert editor_widget.expand_fold_at_cursor() is True
+        assert editor_widget.editor.toPlainText() == long_line
+        assert editor_widget.editor.lineWrapMode() == QPlainTextEdit.NoWrap
+
+    def test_large_insert_folded_after_event_loop(self, qapp, editor_widget):
+        from src.constants import LONG_LINE_THRESHOLD
+        editor_widget.set_text("start\n")
+        cursor = editor_widget.editor.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        long_line = "c" * (LONG_LINE_THRESHOLD + 1)
+        cursor.beginEditBlock()  # as a paste does
+        cursor.insertText(long_line)
+        cursor.endEditBlock()
+        qapp.processEvents()
+        assert len(editor_widget.editor.toPlainText()) < LONG_LINE_THRESHOLD
+        assert editor_widget.get_text() == "start\n" + long_line
+        editor_widget.undo()
+        assert editor_widget.editor.toPlainText() == "start\n"
+
+    def test_highlighter_skips_long_blocks(self, editor_widget):
+        from src.constants import LONG_LINE_THRESHOLD
+        editor_widget.fold_long_lines = False
+        editor_widget.set_text("**" + "d" * LONG_LINE_THRESHOLD + "**")
+        editor_widget.highlighter.rehighlight()
+        block = editor_widget.editor.document().firstBlock()
+        assert block.layout().formats() == []
+
+
+class TestEmbeddedImages:
+    """Test folding and extraction of base64 data-URI images."""
+
+    PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 2000
+
+    def _uri(self):
+        import base64
+        return "data:image/png;base64," + base64.b64encode(self.PNG).decode()
+
+    def test_data_uri_folded_and_excluded_from_stats(self, editor_widget):
+        text = f"one two\n![pic]({self._uri()})"
+        editor_widget.set_text(text)
+        assert "base64" not in editor_widget.editor.toPlainText()
+        assert editor_widget.get_text() == text
+        assert editor_widget.get_word_count() == 3  # one, two, ![pic]()
+
+    def test_preview_text_uses_file_url(self, editor_widget):
+        editor_widget.set_text(f"![pic]({self._uri()})")
+        preview = editor_widget.get_preview_text()
+        assert "base64" not in preview
+        assert "file://" in preview
+
+    def test_preview_images_removed_with_editor(self, qapp):
+        from PySide6.QtCore import QCoreApplication, QEvent
+        from src.editor.editor_widget import EditorWidget
+        widget = EditorWidget()
+        widget.set_text(f"![pic]({self._uri()})")
+        widget.get_preview_text()
+        directory = widget._preview_image_dir
+        assert len(list(directory.iterdir())) == 1
+        widget.deleteLater()
+        QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+        assert not directory.exists()
+
+    def test_extract_embedded_images(self, editor_widget, tmp_path):
+        editor_widget.set_base_path(str(tmp_path))
+        editor_widget.set_text(f"![pic]({self._uri()})\n![small](data:image/png;base64,AAAA)")
+        assert editor_widget.extract_embedded_images() == 1  # AAAA is not an image
+        text = editor_widget.get_text()
+        assert text.startswith("![pic](images/image_")
+        assert len(list((tmp_path / "images").iterdir())) == 1
+        editor_widget.undo()
+        assert editor_widget.get_text().startswith("![pic](data:image/png")
+
+    def test_replace_all_leaves_folds_alone(self, editor_widget):
+        text = f"a 1 ![pic]({self._uri()}) b 22"
+        editor_widget.set_text(text)
+        find = editor_widget.find_replace
+        find.show_replace()
+        find.regex_check.setChecked(True)
+        find.find_input.setText(r"\d+")
+        find.replace_input.setText("N")
+        find.replace_all()
+        assert find.match_label.text() == "2 replaced"
+        assert editor_widget.get_text() == f"a N ![pic]({self._uri()}) b N"
+        find.regex_check.setChecked(False)
+        find.find_input.setText("folded")
+        assert find.match_label.text() == "0 found"
+
+    def test_caret_skips_over_fold(self, editor_widget):
+        editor_widget.set_text(f"x({self._uri()})")
+        editor = editor_widget.editor
+        token_end = len(editor.toPlainText()) - 1
+        cursor = editor.textCursor()
+        cursor.setPosition(2)
+        editor.setTextCursor(cursor)
+        editor.moveCursor(QTextCursor.Right)
+        assert editor.textCursor().position() == token_end
+        editor.moveCursor(QTextCursor.Left)
+        assert editor.textCursor().position() == 2
+        # Clicking into the middle lands on the nearer edge; typing there is safe
+        editor.moveCursor(QTextCursor.Start)
+        cursor.setPosition(5)
+        editor.setTextCursor(cursor)
+        assert editor.textCursor().position() == 2
+        editor.insertPlainText("z")
+        assert editor_widget.get_text() == f"x(z{self._uri()})"
+
+    def test_backspace_deletes_whole_fold(self, qapp, editor_widget):
+        from PySide6.QtCore import Qt
+        from PySide6.QtTest import QTest
+        editor_widget.set_text(f"x({self._uri()})")
+        editor = editor_widget.editor
+        editor.moveCursor(QTextCursor.End)
+        editor.moveCursor(QTextCursor.Left)
+        QTest.keyClick(editor, Qt.Key_Backspace)
+        assert editor_widget.get_text() == "x()"
+        editor_widget.undo()
+        assert editor_widget.get_text() == f"x({self._uri()})"
+
+
+class TestBulkLineOperations:
+    """Test single-pass, single-undo-step line prefixing."""
+
+    def _select_all(self, editor_widget):
+        cursor = editor_widget.editor.textCursor()
+        cursor.movePosition(QTextCursor.Start)
+        cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        editor_widget.editor.setTextCursor(cursor)
+
+    def test_prefix_is_one_undo_step(self, editor_widget):
+        text = "\n".join(f"line {i}" for i in range(500))
+        editor_widget.set_text(text)
+        self._select_all(editor_widget)
+        editor_widget._prefix_lines("> ")
+        assert editor_widget.get_text().count("> line") == 500
+        editor_widget.undo()
+        assert editor_widget.get_text() == text
+
+    def test_prefix_removed_when_all_lines_have_it(self, editor_widget):
+        editor_widget.set_text("> a\n> b")
+        self._select_all(editor_widget)
+        editor_widget._prefix_lines("> ")
+        assert editor_widget.get_text() == "a\nb"
+
+    def test_selection_ending_at_line_start_excludes_that_line(self, editor_widget):
+        editor_widget.set_text("a\nb\nc")
+        cursor = editor_widget.editor.textCursor()
+        cursor.setPosition(0)
+        cursor.setPosition(4, QTextCursor.KeepAnchor)  # up to start of "c"
+        editor_widget.editor.setTextCursor(cursor)
+        editor_widget._prefix_lines("- ")
+        assert editor_widget.get_text() == "- a\n- b\nc"
+
+    def test_caret_follows_prefix(self, editor_widget):
+        editor_widget.set_text("hello")
+        cursor = editor_widget.editor.textCursor()
+        cursor.setPosition(2)
+        editor_widget.editor.setTextCursor(cursor)
+        editor_widget._prefix_lines("- ")
+        assert editor_widget.editor.textCursor().position() == 4
+
+    def test_unwrap_surrounding_reads_neighbours_only(self, editor_widget):
+        editor_widget.set_text("x **bold** y")
+        cursor = editor_widget.editor.textCursor()
+        cursor.setPosition(4)
+        cursor.setPosition(8, QTextCursor.KeepAnchor)
+        editor_widget.editor.setTextCursor(cursor)
+        editor_widget._toggle_wrap("**", "**")
+        assert editor_widget.get_text() == "x bold y"
+
+
+class TestLargePaste:
+    """Test streamed, single-undo-step pasting of large text."""
+
+    def _run(self, qapp, paster):
+        for _ in range(1000):
+            if not paster.is_running:
+                break
+            qapp.processEvents()
+
+    def test_paste_is_normalized_and_one_undo_step(self, qapp, editor_widget, monkeypatch):
+        monkeypatch.setattr("src.editor.editor_widget.PASTE_CHUNK_SIZE", 16)
+        editor_widget.set_text("head\n")
+        cursor = editor_widget.editor.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        editor_widget.editor.setTextCursor(cursor)
+
+        paster = editor_widget.paste_large_text("a\tb\r\n" * 50)
+        assert editor_widget.editor.isReadOnly()
+        assert editor_widget.highlighter.is_suspended
+        self._run(qapp, paster)
+
+        assert editor_widget.get_text() == "head\n" + "a   b\n" * 50
+        assert not editor_widget.editor.isReadOnly()
+        assert not editor_widget.highlighter.is_suspended
+        assert editor_widget.editor.textCursor().atEnd()
+        editor_widget.undo()
+        assert editor_widget.get_text() == "head\n"
+
+    def test_paste_replaces_selection(self, qapp, editor_widget):
+        editor_widget.set_text("keep OLD keep")
+        cursor = editor_widget.editor.textCursor()
+        cursor.setPosition(5)
+        cursor.setPosition(8, QTextCursor.KeepAnchor)
+        editor_widget.editor.setTextCursor(cursor)
+        self._run(qapp, editor_widget.paste_large_text("new"))
+        assert editor_widget.get_text() == "keep new keep"
+
+    def test_cancel_reverts_partial_paste(self, qapp, editor_widget, monkeypatch):
+        monkeypatch.setattr("src.editor.editor_widget.PASTE_CHUNK_SIZE", 4)
+        editor_widget.set_text("base")
+        paster = editor_widget.paste_large_text("x" * 40)
+        paster.progress.connect(lambda done, total: paster.cancel())
+        self._run(qapp, paster)
+        assert editor_widget.get_text() == "base"
+        assert not editor_widget.editor.isReadOnly()
+
+    def test_cancel_reverts_paste_past_undo_budget(self, qapp, editor_widget, monkeypatch):
+        monkeypatch.setattr("src.editor.editor_widget.PASTE_CHUNK_SIZE", 4)
+        editor_widget.undo_monitor.budget = 20
+        editor_widget.set_text("base")
+        paster = editor_widget.paste_large_text("x" * 40)
+        paster.progress.connect(lambda done, total: done >= 24 and paster.cancel())
+        self._run(qapp, paster)
+        assert editor_widget.get_text() == "base"
+
+    def test_large_clipboard_text_is_streamed(self, qapp, editor_widget, monkeypatch):
+        monkeypatch.setattr("src.editor.editor_widget.LARGE_PASTE_THRESHOLD", 10)
+        started = []
+        editor_widget.large_paste_started.connect(started.append)
+        qapp.clipboard().setText("line\r\n" * 5)
+        assert editor_widget._handle_paste()
+        self._run(qapp, started[0])
+        assert editor_widget.get_text() == "line\n" * 5
+
+
+class TestMatchHighlights:
+    """Highlight-all for find, limited to the lines around the viewport."""
+
+    def _match_selections(self, editor_widget):
+        color = editor_widget._match_color
+        return [s for s in editor_widget.editor.extraSelections()
+                if s.format.background().color() == color]
+
+    def _find(self, editor_widget, text):
+        editor_widget.resize(600, 400)
+        editor_widget.find_replace.show_find()
+        editor_widget.find_replace.find_input.setText(text)
+
+    def test_only_lines_near_viewport_are_highlighted(self, editor_widget):
+        editor_widget.set_text("\n".join(f"foo {i}" for i in range(2000)))
+        self._find(editor_widget, "foo")
+        matches = self._match_selections(editor_widget)
+        assert 0 < len(matches) < 2000
+        assert matches[0].cursor.selectedText() == "foo"
+
+        bar = editor_widget.editor.verticalScrollBar()
+        bar.setValue(bar.maximum())
+        matches = self._match_selections(editor_widget)
+        assert 0 < len(matches) < 2000
+        assert matches[-1].cursor.block().blockNumber() == 1999
+
+    def test_current_line_is_kept(self, editor_widget):
+        editor_widget.set_text("foo bar\nfoo")
+        self._find(editor_widget, "foo")
+        selections = editor_widget.editor.extraSelections()
+        assert len(self._match_selections(editor_widget)) == 2
+        assert len(selections) == 3  # plus the current line
+        editor_widget.editor.moveCursor(QTextCursor.End)
+        assert len(editor_widget.editor.extraSelections()) == 3
+
+    def test_edit_and_close_clear_highlights(self, qapp, editor_widget):
+        editor_widget.set_text("foo foo")
+        self._find(editor_widget, "foo")
+        assert len(self._match_selections(editor_widget)) == 2
+        editor_widget.editor.moveCursor(QTextCursor.End)
+        editor_widget.editor.insertPlainText(" foo")
+        assert self._match_selections(editor_widget) == []  # stale positions dropped
+        editor_widget.find_replace._refresh_matches()
+        assert len(self._match_selections(editor_widget)) == 3
+        editor_widget.find_replace.close_find()
+        assert self._match_selections(editor_widget) == []
+
+    def test_highlight_toggle(self, editor_widget):
+        editor_widget.set_text("foo foo")
+        self._find(editor_widget, "foo")
+        editor_widget.find_replace.highlight_check.setChecked(False)
+        assert self._match_selections(editor_widget) == []
+        editor_widget.find_replace.highlight_check.setChecked(True)
+        assert len(self._match_selections(editor_widget)) == 2
+
+
+class TestReplaceText:
+    """Replacing the document (e.g. reloading a changed file) as one undoable edit."""
+
+    def test_keeps_cursor_and_undo(self, editor_widget):
+        editor_widget.set_text("# Title\n\nfirst\nsecond\n")
+        cursor = editor_widget.editor.textCursor()
+        cursor.setPosition(editor_widget.get_text().index("second") + 3)
+        editor_widget.editor.setTextCursor(cursor)
+        assert editor_widget.replace_text("# New title\n\nfirst\nsecond\nthird\n") is True
+        assert editor_widget.get_text() == "# New title\n\nfirst\nsecond\nthird\n"
+        cursor = editor_widget.editor.textCursor()
+        assert cursor.block().text() == "second" and cursor.positionInBlock() == 3
+        editor_widget.editor.undo()
+        assert editor_widget.get_text() == "# Title\n\nfirst\nsecond\n"
+
+    def test_unchanged_folds_survive(self, editor_widget):
+        uri = "data:image/png;base64," + "A" * 4096
+        editor_widget.set_text(f"![img]({uri})\ntext\n")
+        token = editor_widget.editor.toPlainText().split("\n")[0]
+        assert editor_widget.replace_text(f"![img]({uri})\nnew text\n") is True
+        assert editor_widget.editor.toPlainText().split("\n")[0] == token
+        assert editor_widget.get_text() == f"![img]({uri})\nnew text\n"
+
+    def test_no_change(self, editor_widget):
+        editor_widget.set_text("same")
+        assert editor_widget.replace_text("same") is False
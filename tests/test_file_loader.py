@@ -0,0 +1,105 @@
+"""Tests for encoding detection and chunked decoding."""
+import codecs
+import locale
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from src.file_loader import TextSource, detect_encoding
+from src.file_writer import TextEncoding, UTF8, atomic_write, content_digest
+
+
+class TestDetectEncoding:
+    @pytest.mark.parametrize("bom, codec", [
+        (codecs.BOM_UTF8, "utf-8"),
+        (codecs.BOM_UTF16_LE, "utf-16-le"),
+        (codecs.BOM_UTF16_BE, "utf-16-be"),
+        (codecs.BOM_UTF32_LE, "utf-32-le"),
+        (codecs.BOM_UTF32_BE, "utf-32-be"),
+    ])
+    def test_bom(self, bom, codec):
+        sample = bom + "# 제목".encode(codec)
+        assert detect_encoding(sample) == TextEncoding(codec, bom)
+
+    def test_utf16_without_bom(self):
+        assert detect_encoding("# Title\nbody".encode("utf-16-le")).codec == "utf-16-le"
+        assert detect_encoding("# Title\nbody".encode("utf-16-be")).codec == "utf-16-be"
+
+    def test_utf8(self):
+        assert detect_encoding("한글 문서".encode("utf-8"), complete=True) == UTF8
+
+    def test_utf8_cut_mid_character(self):
+        sample = "한글".encode("utf-8")[:-1]
+        assert detect_encoding(sample) == UTF8
+
+    def test_cp949(self):
+        assert detect_encoding("한글 문서".encode("cp949"), complete=True).codec == "cp949"
+
+    def test_cp1252_is_not_mistaken_for_cp949(self, monkeypatch):
+        monkeypatch.setattr(locale, "getpreferredencoding", lambda do_setlocale=True: "UTF-8")
+        sample = "Äpfel, Birnen und Äste im Garten".encode("cp1252")  # valid CP949 too
+        assert detect_encoding(sample, complete=True).codec == "cp1252"
+
+    def test_empty(self):
+        assert detect_encoding(b"", complete=True) == UTF8
+
+
+class TestTextSource:
+    def test_chunks_normalize_crlf_split_between_chunks(self, tmp_path):
+        path = tmp_path / "doc.md"
+        path.write_bytes(b"abc\r\ndef\rghi\n")
+        source = TextSource(path)
+        # chunk size 4 cuts right after the "\r" of "\r\n"
+        assert "".join(source.chunks(4)) == "abc\ndef\nghi\n"
+
+    def test_digest_and_length(self, tmp_path):
+        path = tmp_path / "doc.md"
+        path.write_bytes("# 제목\r\n본문".encode("utf-8"))
+        source = TextSource(path)
+        text = "".join(source.chunks(3))
+        assert text == "# 제목\n본문"
+        assert source.length == len(text)
+        assert source.digest == content_digest(text)
+        assert source.consumed == source.size
+
+    def test_bom_is_not_text(self, tmp_path):
+        path = tmp_path / "doc.md"
+        path.write_bytes(codecs.BOM_UTF16_LE + "한글".encode("utf-16-le"))
+        source = TextSource(path)
+        assert source.encoding == TextEncoding("utf-16-le", codecs.BOM_UTF16_LE)
+        assert source.read() == "한글"
+
+    def test_invalid_bytes_after_sample_are_replaced(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("src.file_loader.ENCODING_SAMPLE_SIZE", 4)
+        path = tmp_path / "doc.md"
+        path.write_bytes(b"abcdef\xff")
+        source = TextSource(path)
+        assert source.encoding == UTF8
+        assert source.read() == "abcdef�"
+        assert source.replaced is True
+
+    def test_empty_file(self, tmp_path):
+        path = tmp_path / "empty.md"
+        path.write_bytes(b"")
+        source = TextSource(path)
+        assert source.read() == ""
+        assert source.digest == content_digest("")
+
+    def test_missing_file_raises(self, tmp_path):
+        with pytest.raises(OSError):
+            TextSource(tmp_path / "missing.md")
+
+    @pytest.mark.parametrize("encoding", [
+        UTF8,
+        TextEncoding("utf-8", codecs.BOM_UTF8),
+        TextEncoding("utf-16-le", codecs.BOM_UTF16_LE),
+        TextEncoding("cp949"),
+    ])
+    def test_round_trip_keeps_encoding(self, tmp_path, encoding):
+        path = tmp_path / "doc.md"
+        atomic_write(path, "# 한글 제목\n\n본문 텍스트\n", encoding)
+        source = TextSource(path)
+        assert source.encoding == encoding
+        assert source.read() == "# 한글 제목\n\n본문 텍스트\n"
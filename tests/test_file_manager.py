@@ -1,9 +1,12 @@
 """Tests for FileManager — pure Python, no Qt UI dependencies."""
+import os
 import sys
 import tempfile
 from pathlib import Path
 from unittest.mock import MagicMock
 
+import pytest
+
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.file_manager import FileManager
@@ -18,7 +21,7 @@ class TestFileManager:
     def test_initial_state(self):
         assert self.fm.current_file is None
         assert self.fm._dirty is False
-        assert self.fm._saved_text == ""
+        assert self.fm.matches_saved("")
         assert self.fm.recent_files == []
 
     def test_mark_dirty(self):
@@ -26,7 +29,7 @@ class TestFileManager:
         assert self.fm._dirty is True
 
     def test_mark_dirty_no_change(self):
-        assert self.fm.mark_dirty("") is False  # matches _saved_text=""
+        assert self.fm.mark_dirty("") is False  # matches the saved ""
         assert self.fm._dirty is False
 
     def test_mark_dirty_already_dirty(self):
@@ -37,16 +40,17 @@ class TestFileManager:
         self.fm._dirty = True
         self.fm.mark_saved("saved text")
         assert self.fm._dirty is False
-        assert self.fm._saved_text == "saved text"
+        assert self.fm.matches_saved("saved text")
+        assert not self.fm.matches_saved("saved text!")
 
     def test_new_file(self):
         self.fm.current_file = Path("/some/file.md")
         self.fm._dirty = True
-        self.fm._saved_text = "content"
+        self.fm.mark_saved("content")
         self.fm.new_file()
         assert self.fm.current_file is None
         assert self.fm._dirty is False
-        assert self.fm._saved_text == ""
+        assert self.fm.matches_saved("")
 
     def test_get_title_no_file(self):
         assert self.fm.get_title() == "Markdown Editor"
@@ -73,10 +77,19 @@ class TestFileManager:
             assert content == "# Hello"
             assert self.fm.current_file == Path(test_path)
             assert self.fm._dirty is False
-            assert self.fm._saved_text == "# Hello"
+            assert self.fm.matches_saved("# Hello")
         finally:
             Path(test_path).unlink()
 
+    def test_write_file_is_skipped_when_unchanged(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "doc.md"
+            path.write_text("# Hello", encoding="utf-8")
+            self.fm.load_file(str(path))
+            assert self.fm.write_file(path, "# Hello").written is False
+            assert self.fm.write_file(path, "# Changed").written is True
+            assert path.read_text(encoding="utf-8") == "# Changed"
+
     def test_add_recent_file(self):
         self.fm.add_recent_file("/a.md")
         assert "/a.md" in self.fm.recent_files
@@ -104,3 +117,104 @@ class TestFileManager:
         assert self.fm.is_dirty is False
         self.fm._dirty = True
         assert self.fm.is_dirty is True
+
+    def test_large_file_threshold_default(self):
+        from src.constants import LARGE_FILE_THRESHOLD
+        assert self.fm.large_file_threshold == LARGE_FILE_THRESHOLD
+
+    def test_is_large_file_uses_setting(self):
+        self.settings.value = MagicMock(return_value="10")
+        with tempfile.NamedTemporaryFile(suffix=".md", delete=False, mode='w') as f:
+            f.write("x" * 20)
+            test_path = f.name
+        try:
+            assert self.fm.is_large_file(test_path) is True
+            self.settings.value = MagicMock(return_value="100")
+            assert self.fm.is_large_file(test_path) is False
+        finally:
+            Path(test_path).unlink()
+
+    def test_open_text_then_finish_load(self):
+        with tempfile.NamedTemporaryFile(suffix=".md", delete=False, mode='w',
+                                         encoding='utf-8') as f:
+            f.write("abcdefghij")
+            test_path = f.name
+        try:
+            source = self.fm.open_text(test_path)
+            chunks = list(source.chunks(4))
+            assert chunks == ["abcd", "efgh", "ij"]
+            assert self.fm.current_file is None  # not committed until finish_load
+            self.fm.finish_load(test_path, source)
+            assert self.fm.current_file == Path(test_path)
+            assert self.fm.matches_saved("abcdefghij")
+        finally:
+            Path(test_path).unlink()
+
+    def test_get_title_large_file_mode(self):
+        self.fm.current_file = Path("/path/to/big.md")
+        self.fm.large_file_mode = True
+        assert self.fm.get_title() == "[Large File Mode] big.md - Markdown Editor"
+
+
+class TestDiskChange:
+    def setup_method(self):
+        self.settings = MagicMock()
+        self.settings.value = MagicMock(return_value=[])
+        self.fm = FileManager(self.settings)
+
+    @staticmethod
+    def _bump_mtime(path):
+        info = os.stat(path)
+        os.utime(path, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+
+    def test_unchanged_file(self, tmp_path):
+        path = tmp_path / "doc.md"
+        path.write_text("text", encoding="utf-8")
+        self.fm.load_file(str(path))
+        assert self.fm.disk_change() is None
+
+    def test_touch_is_not_a_change(self, tmp_path):
+        path = tmp_path / "doc.md"
+        path.write_text("text", encoding="utf-8")
+        self.fm.load_file(str(path))
+        self._bump_mtime(path)
+        assert self.fm.disk_change() is None
+
+    def test_changed_content(self, tmp_path):
+        path = tmp_path / "doc.md"
+        path.write_text("text", encoding="utf-8")
+        self.fm.load_file(str(path))
+        path.write_text("new text", encoding="utf-8")
+        self._bump_mtime(path)
+        text, source = self.fm.disk_change()
+        assert text == "new text"
+        self.fm.accept_disk_version(source, text)
+        assert self.fm.matches_saved("new text")
+        assert self.fm.base_text() == "new text"
+        assert self.fm.disk_change() is None
+
+    def test_own_save_is_not_a_change(self, tmp_path):
+        path = tmp_path / "doc.md"
+        path.write_text("text", encoding="utf-8")
+        self.fm.load_file(str(path))
+        self.fm.write_file(path, "saved here")
+        assert self.fm.disk_change() is None
+
+    def test_deleted_file(self, tmp_path):
+        path = tmp_path / "doc.md"
+        path.write_text("text", encoding="utf-8")
+        self.fm.load_file(str(path))
+        path.unlink()
+        with pytest.raises(FileNotFoundError):
+            self.fm.disk_change()
+
+    def test_merge_base_follows_saves(self, tmp_path):
+        assert self.fm.base_text() is None
+        path = tmp_path / "doc.md"
+        path.write_text("loaded", encoding="utf-8")
+        self.fm.load_file(str(path))
+        assert self.fm.base_text() == "loaded"
+        self.fm.mark_saved("saved")
+        assert self.fm.base_text() == "saved"
+        self.fm.new_file()
+        assert self.fm.base_text() is None
@@ -0,0 +1,67 @@
+"""Tests for FileWatcher — change notifications for the document and its images."""
+import os
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from PySide6.QtCore import QCoreApplication
+
+import src.file_watcher as file_watcher
+from src.file_watcher import FileWatcher
+
+
+def _wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        QCoreApplication.processEvents()
+        time.sleep(0.01)
+    return condition()
+
+
+def _replace(path: Path, data: bytes):
+    """Write the way atomic savers do: a new file renamed over the old one."""
+    temp = path.with_name(path.name + ".tmp")
+    temp.write_bytes(data)
+    os.replace(temp, path)
+
+
+class TestFileWatcher:
+    def setup_method(self):
+        self.events = []
+
+    def _watcher(self, monkeypatch):
+        monkeypatch.setattr(file_watcher, "WATCH_SETTLE_DELAY", 10)
+        watcher = FileWatcher()
+        watcher.document_changed.connect(lambda: self.events.append("document"))
+        watcher.images_changed.connect(lambda: self.events.append("images"))
+        return watcher
+
+    def test_document_write(self, qapp, tmp_path, monkeypatch):
+        path = tmp_path / "doc.md"
+        path.write_text("one", encoding="utf-8")
+        watcher = self._watcher(monkeypatch)
+        watcher.watch_document(path)
+        path.write_text("two", encoding="utf-8")
+        assert _wait_for(lambda: self.events == ["document"])
+
+    def test_replaced_document_is_watched_again(self, qapp, tmp_path, monkeypatch):
+        path = tmp_path / "doc.md"
+        path.write_text("one", encoding="utf-8")
+        watcher = self._watcher(monkeypatch)
+        watcher.watch_document(path)
+        _replace(path, b"two")
+        assert _wait_for(lambda: self.events == ["document"])
+        _replace(path, b"three")
+        assert _wait_for(lambda: self.events == ["document", "document"])
+
+    def test_image_changes(self, qapp, tmp_path, monkeypatch):
+        image = tmp_path / "a.png"
+        image.write_bytes(b"one")
+        watcher = self._watcher(monkeypatch)
+        watcher.watch_images({image})
+        _replace(image, b"changed")
+        assert _wait_for(lambda: self.events == ["images"])
+        watcher.watch_images(set())
+        _replace(image, b"changed again")
+        assert not _wait_for(lambda: len(self.events) > 1, timeout=0.3)
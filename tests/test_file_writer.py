@@ -0,0 +1,150 @@
+"""Tests for file_writer — pure Python, no Qt dependencies."""
+import os
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from src.file_writer import FileWriter, atomic_write, content_digest
+
+
+class TestAtomicWrite:
+    def test_writes_and_replaces(self, tmp_path):
+        path = tmp_path / "doc.md"
+        atomic_write(path, "first")
+        atomic_write(path, "second")
+        assert path.read_text(encoding="utf-8") == "second"
+        assert os.listdir(tmp_path) == ["doc.md"]  # no temp files left behind
+
+    def test_failed_write_keeps_original(self, tmp_path):
+        path = tmp_path / "doc.md"
+        path.write_text("original", encoding="utf-8")
+        with patch("src.file_writer.os.replace", side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                atomic_write(path, "new")
+        assert path.read_text(encoding="utf-8") == "original"
+        assert os.listdir(tmp_path) == ["doc.md"]
+
+    @pytest.mark.skipif(os.name != "posix", reason="POSIX permissions")
+    def test_keeps_permissions(self, tmp_path):
+        path = tmp_path / "doc.md"
+        path.write_text("x", encoding="utf-8")
+        path.chmod(0o640)
+        atomic_write(path, "y")
+        assert path.stat().st_mode & 0o777 == 0o640
+
+    @pytest.mark.skipif(os.name != "posix", reason="POSIX symlinks")
+    def test_writes_through_symlink(self, tmp_path):
+        real = tmp_path / "real.md"
+        real.write_text("x", encoding="utf-8")
+        link = tmp_path / "link.md"
+        link.symlink_to(real)
+        atomic_write(link, "y")
+        assert link.is_symlink()
+        assert real.read_text(encoding="utf-8") == "y"
+
+
+class TestFileWriter:
+    def test_skips_unchanged_content(self, tmp_path):
+        path = tmp_path / "doc.md"
+        writer = FileWriter()
+        assert writer.write(path, "text").written is True
+        with patch("src.file_writer.atomic_write") as write:
+            result = writer.write(path, "text")
+        assert result.written is False
+        write.assert_not_called()
+
+    def test_rewrites_after_external_change(self, tmp_path):
+        path = tmp_path / "doc.md"
+        writer = FileWriter()
+        writer.write(path, "text")
+        path.write_text("changed elsewhere", encoding="utf-8")
+        assert writer.write(path, "text").written is True
+        assert path.read_text(encoding="utf-8") == "text"
+
+    def test_remember_loaded_content(self, tmp_path):
+        path = tmp_path / "doc.md"
+        path.write_text("loaded", encoding="utf-8")
+        writer = FileWriter()
+        writer.remember(path, content_digest("loaded"))
+        assert writer.write(path, "loaded").written is False
+
+    def test_background_save_reports_result(self, tmp_path):
+        path = tmp_path / "doc.md"
+        results = []
+        writer = FileWriter(results.append)
+        writer.write_async(path, "async")
+        assert writer.wait_idle(5)
+        writer.close()
+        assert path.read_text(encoding="utf-8") == "async"
+        assert [(r.path, r.written, r.error) for r in results] == [(path, True, None)]
+        assert results[0].elapsed >= 0
+
+    def test_queued_saves_coalesce(self, tmp_path):
+        path = tmp_path / "doc.md"
+        results = []
+        release = threading.Event()
+        writer = FileWriter(lambda result: (release.wait(5), results.append(result)))
+        writer.write_async(tmp_path / "other.md", "blocks the thread")
+        for i in range(5):
+            writer.write_async(path, f"version {i}")
+        release.set()
+        assert writer.wait_idle(5)
+        writer.close()
+        assert [r.content for r in results if r.path == path] == ["version 4"]
+        assert path.read_text(encoding="utf-8") == "version 4"
+
+    def test_background_error_is_reported(self, tmp_path):
+        results = []
+        writer = FileWriter(results.append)
+        writer.write_async(tmp_path / "missing" / "doc.md", "text")
+        assert writer.wait_idle(5)
+        writer.close()
+        assert isinstance(results[0].error, OSError)
+        assert results[0].written is False
+
+    def test_sync_write_drops_queued_save(self, tmp_path):
+        path = tmp_path / "doc.md"
+        results = []
+        release = threading.Event()
+        writer = FileWriter(lambda result: (release.wait(5), results.append(result)))
+        writer.write_async(tmp_path / "other.md", "blocks the thread")
+        writer.write_async(path, "stale")
+        writer.write(path, "explicit")
+        release.set()
+        assert writer.wait_idle(5)
+        writer.close()
+        assert path.read_text(encoding="utf-8") == "explicit"
+        assert all(r.path != path for r in results)
+
+    def test_saves_are_snapshotted(self, tmp_path):
+        from src.local_history import LocalHistory
+        history = LocalHistory(tmp_path / "history")
+        writer = FileWriter(history=history)
+        path = tmp_path / "doc.md"
+        writer.write(path, "first")
+        writer.write(path, "first")  # skipped: no new version
+        writer.write_async(path, "second")
+        assert writer.wait_idle(5)
+        writer.close()
+        versions = history.versions(path)
+        assert [v.reason for v in versions] == ["autosave", "save"]
+        assert history.text(versions[0]) == "second"
+
+    def test_explicit_save_snapshots_on_writer_thread(self, tmp_path):
+        import threading
+        threads = []
+
+        class RecordingHistory:
+            def snapshot(self, path, text, reason, digest):
+                threads.append(threading.current_thread())
+
+        writer = FileWriter(history=RecordingHistory())
+        writer.write(tmp_path / "doc.md", "text")
+        assert writer.wait_idle(5)
+        writer.close()
+        assert len(threads) == 1 and threads[0] is not threading.main_thread()
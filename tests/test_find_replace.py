@@ -4,6 +4,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pytest
+from PySide6.QtGui import QTextCursor
 from PySide6.QtWidgets import QPlainTextEdit
 from src.editor.find_replace import FindReplaceWidget
 
@@ -61,6 +62,27 @@ class TestFindReplace:
         assert "hello" not in editor.toPlainText()
         assert editor.toPlainText().count("HI") == 3
 
+    def test_replace_all_is_one_undo_step(self, setup):
+        editor, widget = setup
+        widget.find_input.setText("hello")
+        widget.replace_input.setText("HI")
+        widget.replace_all()
+        editor.document().undo()
+        assert editor.toPlainText() == "hello world hello foo hello"
+
+    def test_replace_all_edits_only_changed_span(self, setup, qapp):
+        editor, widget = setup
+        editor.setPlainText("keep\nhello\nkeep")
+        changes = []
+        editor.document().contentsChange.connect(
+            lambda pos, removed, added: changes.append((pos, removed, added))
+        )
+        widget.find_input.setText("hello")
+        widget.replace_input.setText("HI")
+        widget.replace_all()
+        assert editor.toPlainText() == "keep\nHI\nkeep"
+        assert changes == [(5, 5, 2)]
+
     def test_close_find(self, setup):
         _, widget = setup
         widget.show_find()
@@ -72,3 +94,127 @@ class TestFindReplace:
         widget.find_input.setText("")
         widget.find_next()  # should not crash
         widget.replace_all()  # should not crash
+
+    def test_count_updates_after_edit(self, setup):
+        editor, widget = setup
+        widget._count_matches("hello")
+        editor.setPlainText("hello")
+        widget._count_matches("hello")
+        assert widget.match_label.text() == "1 found"
+
+    def test_count_narrows_appended_query(self, setup):
+        editor, widget = setup
+        widget._count_matches("hel")
+        widget._count_matches("hello")
+        assert widget.match_label.text() == "3 found"
+        widget._count_matches("hello w")
+        assert widget.match_label.text() == "1 found"
+
+    def test_regex_find(self, setup):
+        editor, widget = setup
+        editor.setPlainText("id 12, id 345")
+        widget.regex_check.setChecked(True)
+        widget.find_input.setText(r"\d+")
+        assert editor.textCursor().selectedText() == "12"
+        assert widget.match_label.text() == "2 found"
+        widget.find_next()
+        assert editor.textCursor().selectedText() == "345"
+        widget.find_next()
+        assert editor.textCursor().selectedText() == "12"  # wraps
+        widget.find_previous()
+        assert editor.textCursor().selectedText() == "345"
+
+    def test_invalid_regex(self, setup):
+        editor, widget = setup
+        widget.regex_check.setChecked(True)
+        widget.find_input.setText("(hello")
+        assert widget.match_label.text() == "Invalid regex"
+        assert widget.match_label.toolTip()
+        widget.find_next()  # should not crash
+        widget.replace_all()
+        assert editor.toPlainText() == "hello world hello foo hello"
+
+    def test_whole_word(self, setup):
+        editor, widget = setup
+        editor.setPlainText("cat concat cat")
+        widget.word_check.setChecked(True)
+        widget.find_input.setText("cat")
+        assert widget.match_label.text() == "2 found"
+        widget.replace_input.setText("dog")
+        widget.replace_all()
+        assert editor.toPlainText() == "dog concat dog"
+
+    def test_find_in_selection(self, setup):
+        editor, widget = setup
+        cursor = editor.textCursor()
+        cursor.setPosition(6)
+        cursor.setPosition(21, QTextCursor.KeepAnchor)  # "world hello foo"
+        editor.setTextCursor(cursor)
+        widget.selection_check.setChecked(True)
+        widget.find_input.setText("hello")
+        assert widget.match_label.text() == "1 found"
+        assert editor.textCursor().selectionStart() == 12
+        widget.replace_input.setText("HI")
+        widget.replace_all()
+        assert editor.toPlainText() == "hello world HI foo hello"
+
+    def test_find_in_selection_needs_selection(self, setup):
+        editor, widget = setup
+        widget.selection_check.setChecked(True)
+        assert not widget.selection_check.isChecked()
+
+    def test_regex_replace_matches_current(self, setup):
+        editor, widget = setup
+        editor.setPlainText("a1 b2")
+        widget.regex_check.setChecked(True)
+        widget.find_input.setText(r"[a-z]\d")
+        widget.replace_input.setText("X")
+        widget.replace()
+        assert editor.toPlainText() == "X b2"
+        assert editor.textCursor().selectedText() == "b2"
+
+    def test_regex_replace_expands_like_replace_all(self, setup):
+        editor, widget = setup
+        editor.setPlainText("John Smith\nJane Doe")
+        widget.regex_check.setChecked(True)
+        widget.find_input.setText(r"(?<first>\w+) (\w+)")
+        widget.replace_input.setText(r"$2,\t${first}$$")
+        widget.replace()
+        assert editor.toPlainText() == "Smith,\tJohn$\nJane Doe"
+        widget.replace_all()
+        assert editor.toPlainText() == "Smith,\tJohn$\nDoe,\tJane$"
+
+    def test_regex_replace_all_with_groups(self, setup):
+        editor, widget = setup
+        editor.setPlainText("John Smith\nJane Doe")
+        widget.regex_check.setChecked(True)
+        widget.find_input.setText(r"(\w+) (\w+)")
+        widget.replace_input.setText("$2, $1")
+        reports = []
+        widget.replaced_all.connect(lambda count, seconds: reports.append(count))
+        widget.replace_all()
+        assert editor.toPlainText() == "Smith, John\nDoe, Jane"
+        assert reports == [2]
+        assert widget.match_label.text() == "2 replaced"
+        editor.document().undo()
+        assert editor.toPlainText() == "John Smith\nJane Doe"
+
+    def test_literal_replace_all_keeps_dollars(self, setup):
+        editor, widget = setup
+        widget.find_input.setText("hello")
+        widget.replace_input.setText("$1")
+        widget.replace_all()
+        assert editor.toPlainText() == "$1 world $1 foo $1"
+
+    def test_replace_all_edits_each_span(self, setup):
+        editor, widget = setup
+        cursor = editor.textCursor()
+        cursor.setPosition(8)  # inside "world"
+        editor.setTextCursor(cursor)
+        widget.find_input.setText("hello")
+        cursor.setPosition(8)
+        editor.setTextCursor(cursor)
+        widget.replace_input.setText("HI")
+        widget.replace_all()
+        assert editor.toPlainText() == "HI world HI foo HI"
+        assert editor.textCursor().position() == 5  # still inside "world"
@@ -0,0 +1,82 @@
+"""Tests for FoldRegistry — pure Python, no Qt dependencies."""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.editor.folding import FoldRegistry, FOLD_OPEN
+
+
+class TestFoldRegistry:
+    def setup_method(self):
+        self.folds = FoldRegistry()
+
+    def test_fold_and_expand(self):
+        token = self.folds.fold("payload", "label")
+        assert FOLD_OPEN in token
+        assert self.folds.expand(f"a {token} b") == "a payload b"
+
+    def test_payload_lookup(self):
+        token = self.folds.fold("payload", "label")
+        assert self.folds.payload(token) == "payload"
+        assert self.folds.payload("not a token") is None
+
+    def test_expand_without_folds_returns_same_object(self):
+        text = "plain text"
+        assert self.folds.expand(text) is text
+
+    def test_unknown_token_left_alone(self):
+        self.folds.fold("x", "label")
+        text = f"{FOLD_OPEN}folded #999: label⟫"
+        assert self.folds.expand(text) == text
+
+    def test_fold_long_lines(self):
+        text = "short\n" + "x" * 50 + "\nend"
+        folded = self.folds.fold_long_lines(text, threshold=20, keep=5)
+        lines = folded.split("\n")
+        assert lines[0] == "short"
+        assert lines[1].startswith("xxxxx" + FOLD_OPEN)
+        assert "45 more characters" in lines[1]
+        assert lines[2] == "end"
+        assert self.folds.expand(folded) == text
+
+    def test_short_text_untouched(self):
+        assert self.folds.fold_long_lines("abc\ndef", threshold=20, keep=5) == "abc\ndef"
+        assert len(self.folds) == 0
+
+    def test_nested_expand(self):
+        inner = self.folds.fold("inner", "label")
+        outer = self.folds.fold(f"[{inner}]", "label")
+        assert self.folds.expand(outer) == "[inner]"
+
+    def test_clear(self):
+        token = self.folds.fold("payload", "label")
+        self.folds.clear()
+        assert self.folds.expand(token) == token
+
+    def test_fold_data_uris(self):
+        uri = "data:image/png;base64," + "A" * 2000
+        text = f"![img]({uri}) after"
+        folded = self.folds.fold_data_uris(text, min_length=1024)
+        assert folded.startswith("![img](" + FOLD_OPEN)
+        assert "image/png" in folded
+        assert "AAAA" not in folded
+        assert self.folds.expand(folded) == text
+
+    def test_small_data_uri_not_folded(self):
+        text = "![img](data:image/png;base64,AAAA)"
+        assert self.folds.fold_data_uris(text, min_length=1024) == text
+
+    def test_expand_with_resolver(self):
+        token = self.folds.fold("data:image/png;base64,AAAA", "label")
+        resolved = self.folds.expand(f"({token})", resolve=lambda p: "file.png")
+        assert resolved == "(file.png)"
+
+    def test_strip(self):
+        token = self.folds.fold("payload words here", "label")
+        assert "payload" not in FoldRegistry.strip(f"a {token} b")
+
+    def test_split_point_avoids_tokens(self):
+        token = self.folds.fold("x", "label")
+        line = "ab" + token + "cd"
+        assert FoldRegistry.split_point(line, 4) == 2 + len(token)
+        assert FoldRegistry.split_point(line, 1) == 1
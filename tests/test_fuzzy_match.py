@@ -0,0 +1,74 @@
+"""Tests for fuzzy_match — pure Python, no Qt dependencies."""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.fuzzy_match import FuzzyIndex, normalize
+
+
+def _titles(index, query):
+    return [number for number, _ in index.search(query)]
+
+
+class TestNormalize:
+    def test_lowercases(self):
+        assert normalize("Install Guide") == "install guide"
+
+    def test_splits_syllables_into_jamo(self):
+        assert normalize("한글") == "ㅎㅏㄴㄱㅡㄹ"
+
+    def test_splits_compound_jamo(self):
+        assert normalize("값") == "ㄱㅏㅂㅅ"
+        assert normalize("과") == "ㄱㅗㅏ"
+
+    def test_composes_decomposed_input(self):
+        assert normalize("한") == normalize("한")
+
+
+class TestFuzzyIndex:
+    TITLES = ["Installation", "Install Guide", "Performance tips",
+              "한글 문서", "성능 측정", "API reference"]
+
+    def test_subsequence_match(self):
+        index = FuzzyIndex(self.TITLES)
+        assert _titles(index, "pft") == [2]
+        assert _titles(index, "zzz") == []
+
+    def test_empty_query(self):
+        assert FuzzyIndex(self.TITLES).search("  ") == []
+        assert FuzzyIndex([]).search("a") == []
+
+    def test_case_insensitive(self):
+        assert _titles(FuzzyIndex(self.TITLES), "API") == [5]
+
+    def test_choseong_query(self):
+        index = FuzzyIndex(self.TITLES)
+        assert _titles(index, "ㅅㄴ") == [4]
+        assert _titles(index, "ㅎㄱ") == [3]
+
+    def test_half_composed_syllable(self):
+        # "한그" is typed on the way to "한글"
+        assert _titles(FuzzyIndex(self.TITLES), "한그") == [3]
+
+    def test_whitespace_ignored(self):
+        assert _titles(FuzzyIndex(self.TITLES), "install guide") == [1]
+
+    def test_contiguous_and_prefix_rank_first(self):
+        index = FuzzyIndex(["a big install", "install", "i n s t a l l"])
+        assert _titles(index, "install") == [1, 0, 2]
+
+    def test_word_start_beats_middle(self):
+        index = FuzzyIndex(["reinstall", "re install"])
+        assert _titles(index, "install") == [1, 0]
+
+    def test_limit(self):
+        index = FuzzyIndex(["item %d" % i for i in range(50)])
+        assert len(index.search("item", limit=10)) == 10
+
+    def test_cache_reused(self):
+        cache = {}
+        FuzzyIndex(["Alpha", "Beta"], cache)
+        cache["Alpha"] = "sentinel"
+        index = FuzzyIndex(["Alpha", "Gamma"], cache)
+        assert "Gamma" in cache
+        assert _titles(index, "sentinel") == [0]  # the cached form was not recomputed
@@ -0,0 +1,151 @@
+"""Tests for downloading pasted image URLs in the background, against a local HTTP server."""
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from PySide6.QtGui import QTextCursor
+
+from src.utils.image_downloader import ImageDownloader
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 2000
+SLOW_DELAY = 0.5  # seconds /slow/ requests wait before answering
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, as image hosts do
+
+    def do_GET(self):
+        if self.path.startswith("/slow/"):
+            time.sleep(SLOW_DELAY)
+        if self.path.endswith("/missing.png"):
+            self.send_error(404)
+            return
+        body = b"<html>not an image</html>" if self.path.endswith("/page.png") else PNG
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _wait_until(qapp, condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.005)
+    assert condition()
+
+
+class TestImageDownloader:
+    def test_downloads_bytes(self, qapp, server):
+        downloader = ImageDownloader()
+        results = []
+        downloader.finished.connect(lambda *args: results.append(args))
+        download_id = downloader.download(f"{server}/a.png")
+        assert downloader.pending == 1
+        _wait_until(qapp, lambda: results)
+        assert results == [(download_id, PNG, "")]
+        assert downloader.pending == 0
+
+    def test_http_error_reported(self, qapp, server):
+        downloader = ImageDownloader()
+        results = []
+        downloader.finished.connect(lambda *args: results.append(args))
+        downloader.download(f"{server}/missing.png")
+        _wait_until(qapp, lambda: results)
+        _id, data, error = results[0]
+        assert data is None and error
+
+    def test_downloads_run_concurrently(self, qapp, server):
+        downloader = ImageDownloader()
+        results = []
+        downloader.finished.connect(lambda *args: results.append(args))
+        started = time.monotonic()
+        ids = [downloader.download(f"{server}/slow/{n}.png") for n in range(4)]
+        _wait_until(qapp, lambda: len(results) == 4)
+        assert time.monotonic() - started < SLOW_DELAY * 3  # one after the other: 2s
+        assert sorted(result[0] for result in results) == ids
+
+
+class TestPastedImageUrl:
+    def _paste(self, qapp, editor_widget, url):
+        qapp.clipboard().setText(url)
+        assert editor_widget._handle_paste()
+
+    def test_placeholder_replaced_after_later_edits(self, qapp, editor_widget, server, tmp_path):
+        editor_widget.set_base_path(str(tmp_path))
+        editor_widget.set_text("intro\n")
+        editor_widget.editor.moveCursor(QTextCursor.End)
+        self._paste(qapp, editor_widget, f"{server}/slow/pic.png")
+        assert "![Downloading image" in editor_widget.get_text()
+        assert editor_widget.has_pending_downloads
+
+        # Typing goes on while it downloads, before and after the placeholder
+        cursor = editor_widget.editor.textCursor()
+        cursor.movePosition(QTextCursor.Start)
+        cursor.insertText("# Title\n")
+        editor_widget.editor.moveCursor(QTextCursor.End)
+        editor_widget.editor.insertPlainText("\nmore text")
+
+        _wait_until(qapp, lambda: not editor_widget.has_pending_downloads)
+        text = editor_widget.get_text()
+        assert "Downloading image" not in text
+        assert text.startswith("# Title\nintro\n![image](images/image_")
+        assert text.endswith(")\nmore text")
+        assert len(list((tmp_path / "images").iterdir())) == 1
+
+    def test_several_pastes_each_replace_their_placeholder(self, qapp, editor_widget, server,
+                                                           tmp_path):
+        editor_widget.set_base_path(str(tmp_path))
+        editor_widget.set_text("")
+        for n in range(3):
+            self._paste(qapp, editor_widget, f"{server}/slow/{n}.png")
+            editor_widget.editor.insertPlainText("\n")
+        _wait_until(qapp, lambda: not editor_widget.has_pending_downloads)
+        lines = editor_widget.get_text().splitlines()
+        assert len(lines) == 3
+        assert all(line.startswith("![image](images/image_") for line in lines)
+        assert len(set(lines)) == 3
+
+    def test_failed_download_inserts_url(self, qapp, editor_widget, server, tmp_path):
+        editor_widget.set_base_path(str(tmp_path))
+        editor_widget.set_text("")
+        messages = []
+        editor_widget.image_download_status.connect(messages.append)
+        for name in ("missing.png", "page.png"):
+            self._paste(qapp, editor_widget, f"{server}/{name}")
+            editor_widget.editor.insertPlainText("\n")
+        _wait_until(qapp, lambda: not editor_widget.has_pending_downloads)
+        assert editor_widget.get_text() == (f"![image]({server}/missing.png)\n"
+                                            f"![image]({server}/page.png)\n")
+        assert sum("failed" in message for message in messages) == 2
+        assert not (tmp_path / "images").exists()
+
+    def test_deleted_placeholder_drops_the_image(self, qapp, editor_widget, server, tmp_path):
+        editor_widget.set_base_path(str(tmp_path))
+        editor_widget.set_text("")
+        self._paste(qapp, editor_widget, f"{server}/slow/gone.png")
+        editor_widget.editor.selectAll()
+        editor_widget.editor.insertPlainText("replaced")
+        _wait_until(qapp, lambda: not editor_widget.has_pending_downloads)
+        assert editor_widget.get_text() == "replaced"
+        assert not (tmp_path / "images").exists()
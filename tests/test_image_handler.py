@@ -119,3 +119,34 @@ class TestImageHandler:
         data = b'RIFF' + b'\x00' * 4 + b'WAVE' + b'\x00' * 100
         assert self.handler._detect_image_type(data) is None
 
+
+    # === Embedded (data URI) images ===
+
+    def test_save_image_from_data_uri(self):
+        import base64
+        png = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
+        uri = "data:image/png;base64," + base64.b64encode(png).decode()
+        result = self.handler.save_image_from_data_uri(uri)
+        assert result.startswith("images/") and result.endswith(".png")
+        assert (Path(self.tmp_dir) / result).read_bytes() == png
+
+    def test_save_image_from_data_uri_invalid(self):
+        assert self.handler.save_image_from_data_uri("data:image/png;base64,!!!") is None
+        assert self.handler.save_image_from_data_uri("not a uri") is None
+
+    def test_save_image_bytes_rejects_non_image(self):
+        assert self.handler.save_image_bytes(b'\x00' * 100) is None
+
+    # === Referenced images ===
+
+    def test_local_images(self):
+        text = (
+            '![a](images/a%20b.png "title") ![b](<with space.png>)\n'
+            '<img alt="c" src="/abs/c.gif">\n'
+            '![web](https://example.com/x.png) ![inline](data:image/png;base64,AAAA)'
+        )
+        assert self.handler.local_images(text) == {
+            Path(self.tmp_dir) / "images/a b.png",
+            Path(self.tmp_dir) / "with space.png",
+            Path("/abs/c.gif"),
+        }
@@ -0,0 +1,206 @@
+"""Keystroke-to-paint latency harness for EditorWidget.
+
+Replays a scripted typing session (list auto-continuation through
+_handle_enter, quotes, bold/italic toggles) against the session-wide
+MainWindow at several document sizes and reports p50/p95/p99 per stage:
+
+    input    key event reaching EditorWidget.eventFilter -> key handling done
+    paint    key event reaching EditorWidget.eventFilter -> editor repainted
+    preview  last key of a step -> preview updated (includes the debounce)
+
+Opt-in, since it takes minutes at 100k lines:
+
+    MDEDITOR_LATENCY=1 QT_QPA_PLATFORM=offscreen python -m pytest tests/test_latency.py
+
+MDEDITOR_LATENCY_SIZES overrides the line counts, e.g. "1000,10000".
+"""
+import os
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from PySide6.QtCore import QObject, QEvent, Qt
+from PySide6.QtGui import QTextCursor
+from PySide6.QtTest import QTest
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("MDEDITOR_LATENCY"),
+    reason="latency harness is opt-in: set MDEDITOR_LATENCY=1",
+)
+
+SIZES = [int(n) for n in os.environ.get("MDEDITOR_LATENCY_SIZES", "1000,10000,100000").split(",")]
+PAINT_TIMEOUT = 2.0     # seconds
+PREVIEW_TIMEOUT = 120.0  # seconds
+
+# Each step is a burst of typing; the preview is awaited after every step.
+SESSION = [
+    [("type", "- first item")],
+    [("key", Qt.Key_Return)],                  # auto-continues with "- "
+    [("type", "second item"), ("key", Qt.Key_Return)],
+    [("key", Qt.Key_Return)],                  # empty item ends the list
+    [("type", "1. numbered"), ("key", Qt.Key_Return), ("type", "next")],
+    [("key", Qt.Key_Return), ("key", Qt.Key_Return), ("type", "> quoted")],
+    [("key", Qt.Key_Return), ("type", "plain words here")],
+    [("select", Qt.Key_Left), ("shortcut", Qt.Key_B)],   # bold on
+    [("shortcut", Qt.Key_B)],                              # bold off
+    [("shortcut", Qt.Key_I)],                              # italic on
+]
+
+
+def _make_document(lines: int) -> str:
+    """Mixed Markdown with an empty line in the middle for the caret."""
+    out = []
+    for i in range(lines):
+        if i % 100 == 0:
+            out.append(f"## Section {i // 100}")
+        elif i % 7 == 0:
+            out.append(f"- list item {i} with *emphasis* and `code`")
+        elif i % 11 == 0:
+            out.append(f"> quoted line {i} with a [link](https://example.com/{i})")
+        else:
+            out.append(f"Paragraph line {i} with **bold** text and plain words.")
+    out[lines // 2] = ""
+    return "\n".join(out)
+
+
+def _percentile(samples, p: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class _Probe(QObject):
+    """Installed after EditorWidget's own filter, so it sees events first."""
+
+    def __init__(self, editor, viewport):
+        super().__init__()
+        self._editor = editor
+        self._viewport = viewport
+        self.key_time = None
+        self.painted = False
+
+    def eventFilter(self, obj, event):
+        if obj is self._editor and event.type() == QEvent.KeyPress and self.key_time is None:
+            self.key_time = time.perf_counter()
+        elif obj is self._viewport and event.type() == QEvent.Paint:
+            self.painted = True
+        return False
+
+
+class _Recorder:
+    def __init__(self, qapp, window):
+        self.qapp = qapp
+        self.window = window
+        self.target = window.editor.editor
+        self.samples = {"input": [], "paint": [], "preview": []}
+        self.preview_done = None
+
+        self.probe = _Probe(self.target, self.target.viewport())
+        self.target.installEventFilter(self.probe)
+        self.target.viewport().installEventFilter(self.probe)
+
+    def close(self):
+        self.target.removeEventFilter(self.probe)
+        self.target.viewport().removeEventFilter(self.probe)
+
+    def wrap_preview(self, update_preview):
+        def wrapper(text):
+            update_preview(text)
+            self.preview_done = time.perf_counter()
+        return wrapper
+
+    def wait_for_preview(self, since: float):
+        deadline = time.perf_counter() + PREVIEW_TIMEOUT
+        while (self.preview_done is None or self.preview_done < since) \
+                and time.perf_counter() < deadline:
+            self.qapp.processEvents()
+            time.sleep(0.001)
+
+    def press(self, key, modifiers=Qt.NoModifier):
+        """Send one key and time input handling and the following repaint."""
+        self.probe.key_time = None
+        self.probe.painted = False
+        dispatched = time.perf_counter()
+        QTest.keyClick(self.target, key, modifiers)
+        handled = time.perf_counter()
+        # Shortcuts never reach the editor as a KeyPress
+        start = self.probe.key_time or dispatched
+
+        deadline = handled + PAINT_TIMEOUT
+        while not self.probe.painted and time.perf_counter() < deadline:
+            self.qapp.processEvents()
+        painted = time.perf_counter()
+
+        self.samples["input"].append((handled - start) * 1000)
+        if self.probe.painted:
+            self.samples["paint"].append((painted - start) * 1000)
+        return start
+
+    def run_step(self, actions):
+        revision = self.window.editor.bus.revision
+        last_key = None
+        for action in actions:
+            kind = action[0]
+            if kind == "type":
+                for char in action[1]:
+                    last_key = self.press(char)
+            elif kind == "key":
+                last_key = self.press(action[1])
+            elif kind == "select":
+                last_key = self.press(action[1], Qt.ControlModifier | Qt.ShiftModifier)
+            elif kind == "shortcut":
+                last_key = self.press(action[1], Qt.ControlModifier)
+        if self.window.editor.bus.revision == revision:
+            return  # nothing changed, so no preview update is coming
+        self.wait_for_preview(last_key)
+        if self.preview_done is not None and self.preview_done >= last_key:
+            self.samples["preview"].append((self.preview_done - last_key) * 1000)
+
+
+def _report(lines: int, samples) -> str:
+    rows = [f"{lines:>7,} lines  stage      n     p50 ms    p95 ms    p99 ms"]
+    for stage, values in samples.items():
+        if not values:
+            rows.append(f"{'':>14} {stage:<8} {0:>3}")
+            continue
+        rows.append(
+            f"{'':>14} {stage:<8} {len(values):>3} "
+            f"{_percentile(values, 50):>9.2f} {_percentile(values, 95):>9.2f} "
+            f"{_percentile(values, 99):>9.2f}"
+        )
+    return "\n".join(rows)
+
+
+@pytest.mark.parametrize("lines", SIZES)
+def test_keystroke_latency(main_window, qapp, lines, monkeypatch, capsys):
+    window = main_window
+    window.show()
+    window.editor.set_text(_make_document(lines))
+    recorder = _Recorder(qapp, window)
+    monkeypatch.setattr(window.preview, "update_preview",
+                        recorder.wrap_preview(window.preview.update_preview))
+    try:
+        # Let the preview for the freshly loaded document settle first
+        recorder.wait_for_preview(0)
+        block = window.editor.editor.document().findBlockByNumber(lines // 2)
+        cursor = QTextCursor(block)
+        window.editor.editor.setTextCursor(cursor)
+        window.editor.editor.setFocus()
+
+        for step in SESSION:
+            recorder.run_step(step)
+        typed = window.editor.get_text()
+    finally:
+        recorder.close()
+        # The window is shared by the whole session; leave it clean
+        window.editor.set_text("")
+        window.file_manager.new_file()
+        window._update_title()
+
+    with capsys.disabled():
+        print("\n" + _report(lines, recorder.samples))
+
+    assert "- second item" in typed  # _handle_enter continued the list
+    assert recorder.samples["input"] and recorder.samples["paint"]
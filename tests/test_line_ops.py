@@ -0,0 +1,57 @@
+"""Tests for line_ops — pure Python, no Qt dependencies."""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.editor import line_ops
+
+
+class TestLineOps:
+    def test_add_prefix(self):
+        assert line_ops.add_prefix(["a", "b"], "> ") == ["> a", "> b"]
+
+    def test_remove_prefix(self):
+        assert line_ops.remove_prefix(["> a", "b"], "> ") == ["a", "b"]
+
+    def test_has_prefix_ignores_blank_lines(self):
+        assert line_ops.has_prefix(["- a", "", "- b"], "- ")
+        assert not line_ops.has_prefix(["- a", "b"], "- ")
+        assert not line_ops.has_prefix(["", "  "], "- ")
+
+    def test_toggle_adds_when_missing(self):
+        lines, added = line_ops.toggle_prefix(["- a", "b"], "- ")
+        assert lines == ["- - a", "- b"]
+        assert added is True
+
+    def test_toggle_removes_when_present(self):
+        lines, added = line_ops.toggle_prefix(["- [ ] a", "- [ ] b"], "- [ ] ")
+        assert lines == ["a", "b"]
+        assert added is False
+
+    def test_bullet_over_checklist_adds_bullet(self):
+        lines, added = line_ops.toggle_prefix(["- [ ] buy milk", "- [x] done"], "- ")
+        assert lines == ["- - [ ] buy milk", "- - [x] done"]
+        assert added is True
+
+    def test_checklist_removes_checked_items_too(self):
+        lines, added = line_ops.toggle_prefix(["- [ ] a", "- [x] b"], "- [ ] ")
+        assert lines == ["a", "b"]
+        assert added is False
+
+    def test_quote_on_nested_quote_adds_level(self):
+        lines, added = line_ops.toggle_prefix(["> > nested"], "> ")
+        assert lines == ["> > > nested"]
+        assert added is True
+        assert line_ops.toggle_prefix(["> quoted"], "> ") == (["quoted"], False)
+
+
+class TestNormalizePastedText:
+    def test_line_endings(self):
+        assert line_ops.normalize_pasted_text("a\r\nb\rc\n") == "a\nb\nc\n"
+
+    def test_tabs_expand_to_columns(self):
+        assert line_ops.normalize_pasted_text("ab\tc\n\td", tab_width=4) == "ab  c\n    d"
+
+    def test_plain_text_unchanged(self):
+        text = "nothing to do"
+        assert line_ops.normalize_pasted_text(text) is text
@@ -0,0 +1,160 @@
+"""Tests for the deduplicated local history store — pure Python, no Qt."""
+import os
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+import src.local_history as local_history
+from src.local_history import LocalHistory, chunk_ends, diff_lines
+
+
+def _document(lines=3000, seed=1):
+    rng = random.Random(seed)
+    words = ["alpha", "beta", "gamma", "한글", "문서", "# Heading", "- item", "`code`"]
+    return "\n".join(" ".join(rng.choice(words) for _ in range(10)) for _ in range(lines)) + "\n"
+
+
+def _chunk_files(history):
+    return [p for p in (history.directory / "chunks").rglob("*") if p.is_file()]
+
+
+@pytest.fixture
+def history(tmp_path):
+    return LocalHistory(tmp_path / "history")
+
+
+class TestChunking:
+    def test_boundaries_are_content_defined(self):
+        data = _document().encode("utf-8")
+        ends = list(chunk_ends(data))
+        assert ends[-1] == len(data)
+        # Cutting from any boundary gives the same chunks after it
+        assert list(chunk_ends(data, ends[3])) == ends[4:]
+
+    def test_insert_shifts_later_boundaries(self):
+        data = _document().encode("utf-8")
+        edited = data[:5000] + b"inserted text" + data[5000:]
+        before = set(chunk_ends(data))
+        after = {end - 13 for end in chunk_ends(edited) if end > 5000}
+        # Boundaries past the edit resynchronize
+        assert len(after - before) <= 2
+
+
+class TestSnapshots:
+    def test_round_trip_and_listing(self, history, tmp_path):
+        path = tmp_path / "doc.md"
+        first = history.snapshot(path, "# 제목\n\nfirst\n")
+        second = history.snapshot(path, "# 제목\n\nsecond\n", "autosave")
+        versions = history.versions(path)
+        assert [v.id for v in versions] == [second.id, first.id]
+        assert versions[0].reason == "autosave"
+        assert history.text(versions[1]) == "# 제목\n\nfirst\n"
+
+    def test_unchanged_text_is_not_snapshotted(self, history, tmp_path):
+        path = tmp_path / "doc.md"
+        assert history.snapshot(path, "same") is not None
+        assert history.snapshot(path, "same") is None
+        assert len(history.versions(path)) == 1
+
+    def test_small_edit_stores_few_new_chunks(self, history, tmp_path):
+        path = tmp_path / "doc.md"
+        text = _document()
+        history.snapshot(path, text)
+        stored = len(_chunk_files(history))
+        assert stored > 5
+        edited = text[:20000] + "EDIT" + text[20000:]
+        snapshot = history.snapshot(path, edited)
+        assert len(_chunk_files(history)) - stored <= 2
+        assert history.text(snapshot) == edited
+
+    def test_incremental_chunks_match_a_fresh_cut(self, history, tmp_path):
+        path = tmp_path / "doc.md"
+        text = _document()
+        history.snapshot(path, text)
+        edited = text[:30000] + text[31000:] + "tail\n"
+        incremental = history.snapshot(path, edited)
+        fresh = LocalHistory(tmp_path / "fresh").snapshot(path, edited)
+        assert incremental.chunks == fresh.chunks
+
+    def test_identical_files_share_chunks(self, history, tmp_path):
+        text = _document()
+        history.snapshot(tmp_path / "a.md", text)
+        stored = len(_chunk_files(history))
+        history.snapshot(tmp_path / "b.md", text)
+        assert len(_chunk_files(history)) == stored
+
+    def test_previous_version_is_read_back_in_a_new_session(self, history, tmp_path):
+        path = tmp_path / "doc.md"
+        text = _document()
+        history.snapshot(path, text)
+        stored = len(_chunk_files(history))
+        later = LocalHistory(history.directory)
+        later.snapshot(path, text + "one more line\n")
+        assert len(_chunk_files(later)) - stored <= 1
+
+    def test_oversized_document_is_not_recorded(self, history, tmp_path, monkeypatch):
+        monkeypatch.setattr(local_history, "HISTORY_MAX_DOCUMENT", 100)
+        path = tmp_path / "doc.md"
+        assert history.snapshot(path, "x" * 101) is None
+        assert history.versions(path) == []
+        assert history.snapshot(path, "x" * 100) is not None
+
+    def test_damaged_chunk_raises(self, history, tmp_path):
+        snapshot = history.snapshot(tmp_path / "doc.md", "some text")
+        _chunk_files(history)[0].write_bytes(b"garbage")
+        with pytest.raises(ValueError):
+            history.text(snapshot)
+
+    def test_diff(self, history, tmp_path):
+        path = tmp_path / "doc.md"
+        old = history.snapshot(path, "a\nb\nc\n")
+        new = history.snapshot(path, "a\nB\nc\n")
+        lines = history.diff(old, new)
+        assert "-b\n" in lines and "+B\n" in lines
+        assert history.diff(old, old) == []
+        assert diff_lines("x", "y")[-1] == "+y\n"
+
+
+class TestRetention:
+    def test_prune_by_age_keeps_newest(self, history, tmp_path):
+        path = tmp_path / "doc.md"
+        for i in range(3):
+            history.snapshot(path, f"version {i}\n")
+        newest = history.versions(path)[0]
+        assert history.prune(newest.time + history.max_age + 10) == 2
+        assert [v.id for v in history.versions(path)] == [newest.id]
+        assert len(_chunk_files(history)) == 1
+
+    def test_prune_by_size_drops_oldest(self, history, tmp_path):
+        path = tmp_path / "doc.md"
+        for seed in range(4):
+            history.snapshot(path, _document(lines=300, seed=seed))
+        versions = history.versions(path)
+        history.max_size = history.total_size() // 2
+        assert history.prune() >= 1
+        remaining = history.versions(path)
+        assert remaining[0].id == versions[0].id
+        assert versions[-1].id not in [v.id for v in remaining]
+        assert history.total_size() <= history.max_size or len(remaining) == 1
+        for version in remaining:
+            history.text(version)  # every chunk still referenced is kept
+
+    def test_snapshots_prune_periodically(self, history, tmp_path, monkeypatch):
+        monkeypatch.setattr(local_history, "HISTORY_PRUNE_EVERY", 2)
+        history.max_age = -1  # everything but the newest is expired
+        path = tmp_path / "doc.md"
+        for i in range(6):
+            history.snapshot(path, f"version {i}\n")
+        assert len(history.versions(path)) < 6
+
+    def test_unreadable_index_line_is_skipped(self, history, tmp_path):
+        path = tmp_path / "doc.md"
+        history.snapshot(path, "kept")
+        index = next((history.directory / "documents").iterdir())
+        with open(index, "a", encoding="utf-8") as f:
+            f.write('{"id": "cut sho')
+        assert len(history.versions(path)) == 1
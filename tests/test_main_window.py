@@ -42,13 +42,19 @@ sys.modules["PySide6.QtWebEngineWidgets"] = fake_web
 
 from PySide6.QtWidgets import QApplication
 app = QApplication.instance() or QApplication([])
+import os
+import tempfile
+from PySide6.QtCore import QSettings
 from src.main_window import MainWindow
-w = MainWindow()
+# Its own settings file: the user's session and preferences stay untouched
+settings = QSettings(os.path.join(tempfile.mkdtemp(), "settings.ini"), QSettings.IniFormat)
+w = MainWindow(recovery_dir=tempfile.mkdtemp(), history_dir=tempfile.mkdtemp(),
+               settings=settings)
 # Reset state
 w.editor.set_text("")
 w.current_file = None
 w._dirty = False
-w._saved_text = ""
+w.file_manager.mark_saved("")
 w._update_title()
 """
 
@@ -94,7 +100,7 @@ print("OK")
 
     def test_dirty_false_when_text_matches_saved(self):
         r = _run_test_script("""
-w._saved_text = "same"
+w.file_manager.mark_saved("same")
 w._dirty = False
 w.editor.editor.setPlainText("same")
 assert w._dirty is False, f"Should not be dirty when text matches saved"
@@ -157,6 +163,49 @@ assert w.current_file == Path(test_path)
 assert w._dirty is False
 Path(test_path).unlink()
 print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+    def test_save_keeps_detected_encoding(self):
+        r = _run_test_script("""
+import tempfile
+from pathlib import Path
+with tempfile.NamedTemporaryFile(suffix=".md", delete=False) as f:
+    f.write("# 한글 제목\\r\\n본문".encode("cp949"))
+    test_path = f.name
+w._load_file(test_path)
+assert w.editor.get_text() == "# 한글 제목\\n본문"
+assert w.encoding_label.text() == "CP949", w.encoding_label.text()
+w.editor.set_text("# 한글 제목\\n고친 본문")
+w._save_file()
+assert Path(test_path).read_bytes().decode("cp949").replace("\\r\\n", "\\n") == "# 한글 제목\\n고친 본문"
+Path(test_path).unlink()
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+    def test_save_offers_utf8_for_unencodable_text(self):
+        r = _run_test_script("""
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from PySide6.QtWidgets import QMessageBox
+original = "caf\xe9 \u20ac".encode("cp1252")
+with tempfile.NamedTemporaryFile(suffix=".md", delete=False) as f:
+    f.write(original)
+    test_path = f.name
+w._load_file(test_path)
+assert w.encoding_label.text() == "CP1252", w.encoding_label.text()
+w.editor.set_text("caf\xe9 \U0001f600")
+with patch.object(QMessageBox, "question", return_value=QMessageBox.No):
+    assert w._write_file(Path(test_path)) is None
+assert Path(test_path).read_bytes() == original
+with patch.object(QMessageBox, "question", return_value=QMessageBox.Yes):
+    w._save_file()
+assert Path(test_path).read_text(encoding="utf-8") == "caf\xe9 \U0001f600"
+assert w.encoding_label.text() == "UTF-8"
+Path(test_path).unlink()
+print("OK")
 """)
         assert "OK" in r.stdout, r.stderr
 
@@ -249,6 +298,331 @@ class TestAutosave:
         r = _run_test_script("""
 assert w._autosave_timer.isActive()
 print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+    def test_autosave_writes_in_background(self):
+        r = _run_test_script("""
+import tempfile
+from pathlib import Path
+from PySide6.QtWidgets import QApplication
+with tempfile.NamedTemporaryFile(suffix=".md", delete=False, mode='w') as f:
+    test_path = f.name
+w.current_file = Path(test_path)
+w.editor.editor.setPlainText("autosaved")
+assert w._dirty is True
+w._autosave()
+assert not w.file_manager.writer._pending, "autosave to file is off by default"
+w.autosave_to_file_action.setChecked(True)
+w._autosave()
+w.autosave_to_file_action.setChecked(False)
+assert w.file_manager.writer.wait_idle(5)
+QApplication.processEvents()  # deliver the queued result
+assert Path(test_path).read_text(encoding="utf-8") == "autosaved"
+assert w._dirty is False
+assert "Auto-saved in" in w.statusbar.currentMessage(), w.statusbar.currentMessage()
+Path(test_path).unlink()
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+
+class TestRecovery:
+    def test_recovers_orphaned_journal(self):
+        r = _run_test_script("""
+import json
+from unittest.mock import patch
+from PySide6.QtWidgets import QMessageBox
+journal = w.recovery_dir / "crashed.journal"
+journal.write_text(
+    json.dumps({"v": 1, "file": None, "digest": None, "length": 0}) + "\\n"
+    + json.dumps({"s": "unsaved work", "n": 12, "f": {}}) + "\\n",
+    encoding="utf-8",
+)
+with patch.object(QMessageBox, "question", return_value=QMessageBox.Yes):
+    w._offer_recovery()
+assert w.editor.get_text() == "unsaved work", w.editor.get_text()
+assert w._dirty is True
+assert not journal.exists()
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+    def test_edits_are_journaled_not_saved(self):
+        r = _run_test_script("""
+from src.recovery_journal import recover
+w.editor.editor.insertPlainText("typed")
+w.journal.flush()
+assert recover(w.journal.path).text == "typed"
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+
+class TestLocalHistory:
+    def test_restore_earlier_version(self):
+        r = _run_test_script("""
+import tempfile
+from pathlib import Path
+from src.history_dialog import HistoryDialog
+path = Path(tempfile.mkdtemp()) / "doc.md"
+w.editor.set_text("first version\\n")
+w._write_file(path)
+w.current_file = path
+w.editor.set_text("second version\\n")
+w._save_file()
+assert w.writer.wait_idle(5)  # snapshots are taken on the writer thread
+versions = w.history.versions(path)
+assert len(versions) == 2, versions
+dialog = HistoryDialog(w.history, path, w.editor.get_text(), w)
+assert dialog.versions.count() == 2
+dialog.versions.setCurrentRow(1)
+assert "-first version" in dialog.diff_view.toPlainText()
+dialog._restore()
+assert dialog.restored_text == "first version\\n"
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+
+class TestExternalChanges:
+    _SETUP = """
+import os
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+test_path = Path(tempfile.mkdtemp()) / "doc.md"
+test_path.write_text("# Title\\n\\nalpha\\n\\nbeta\\n", encoding="utf-8")
+w._load_file(str(test_path))
+
+def change_on_disk(text):
+    test_path.write_text(text, encoding="utf-8")
+    info = os.stat(test_path)
+    os.utime(test_path, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+"""
+
+    def test_clean_document_reloads_undoably(self):
+        r = _run_test_script(self._SETUP + """
+change_on_disk("# Title\\n\\nalpha\\n\\nbeta, from disk\\n")
+w._check_disk_change()
+assert w.editor.get_text() == "# Title\\n\\nalpha\\n\\nbeta, from disk\\n"
+assert w._dirty is False
+assert "Reloaded" in w.statusbar.currentMessage()
+w.editor.editor.undo()
+assert w.editor.get_text() == "# Title\\n\\nalpha\\n\\nbeta\\n"
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+    def test_local_edits_merge_with_disk_changes(self):
+        r = _run_test_script(self._SETUP + """
+w.editor.replace_text("# Title\\n\\nalpha, edited\\n\\nbeta\\n")
+assert w._dirty is True
+change_on_disk("# Title\\n\\nalpha\\n\\nbeta, from disk\\n")
+with patch.object(w, "_ask_disk_change", return_value="merge") as ask:
+    w._check_disk_change()
+assert ask.call_args[1]["can_merge"] is True
+assert w.editor.get_text() == "# Title\\n\\nalpha, edited\\n\\nbeta, from disk\\n", w.editor.get_text()
+assert w._dirty is True
+w._save_file()
+assert test_path.read_text(encoding="utf-8") == w.editor.get_text()
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+    def test_keep_mine_asks_only_once(self):
+        r = _run_test_script(self._SETUP + """
+w.editor.replace_text("mine\\n")
+change_on_disk("theirs\\n")
+with patch.object(w, "_ask_disk_change", return_value="keep") as ask:
+    w._check_disk_change()
+    w._check_disk_change()
+assert ask.call_count == 1
+assert w.editor.get_text() == "mine\\n"
+assert w._dirty is True
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+
+class TestTabs:
+    _SETUP = """
+import tempfile
+from pathlib import Path
+folder = Path(tempfile.mkdtemp())
+first, second = folder / "first.md", folder / "second.md"
+first.write_text("# First\\n", encoding="utf-8")
+second.write_text("# Second\\n", encoding="utf-8")
+"""
+
+    def test_open_reuses_pristine_tab_then_adds_tabs(self):
+        r = _run_test_script(self._SETUP + """
+w._load_file(str(first))
+assert w.tabs.count() == 1
+w._load_file(str(second))
+assert w.tabs.count() == 2
+assert w.editor.get_text() == "# Second\\n"
+assert w.tabs.tabText(w.tabs.currentIndex()) == "second.md"
+# Opening an open file switches to its tab
+w._load_file(str(first))
+assert w.tabs.count() == 2
+assert w.editor.get_text() == "# First\\n"
+assert w.current_file == first
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+    def test_background_tabs_are_suspended_past_budget(self):
+        r = _run_test_script(self._SETUP + """
+w.suspend_budget = 0
+w._load_file(str(first))
+first_doc = w.current_document
+w.editor.editor.insertPlainText("unsaved ")
+w._load_file(str(second))
+assert first_doc.is_suspended
+assert first_doc.editor.get_text() == ""
+assert first_doc.file_manager.is_dirty
+w.tabs.setCurrentWidget(first_doc.editor)
+assert not first_doc.is_suspended
+assert w.editor.get_text() == "unsaved # First\\n"
+assert w._dirty is True
+assert w.tabs.tabText(w.tabs.currentIndex()) == "* first.md"
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+    def test_lost_swap_file_is_rebuilt_from_journal(self):
+        r = _run_test_script(self._SETUP + """
+import os
+w.suspend_budget = 0
+w._load_file(str(first))
+first_doc = w.current_document
+w.editor.editor.insertPlainText("unsaved ")
+w._load_file(str(second))
+assert first_doc.is_suspended
+os.unlink(first_doc._swap_path)
+w.tabs.setCurrentWidget(first_doc.editor)
+assert not first_doc.is_suspended
+assert w.editor.get_text() == "unsaved # First\\n"
+assert not w.editor.editor.isReadOnly()
+assert w._dirty is True
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+    def test_unrecoverable_tab_stays_read_only(self):
+        r = _run_test_script(self._SETUP + """
+import os
+from unittest.mock import patch
+from PySide6.QtWidgets import QMessageBox
+w.suspend_budget = 0
+w._load_file(str(first))
+first_doc = w.current_document
+w.editor.editor.insertPlainText("unsaved ")
+w._load_file(str(second))
+journal = first_doc.journal.path
+journal_text = journal.read_text(encoding="utf-8")
+first_doc._swap_path.write_bytes(b"damaged")
+os.unlink(journal)  # lost too, for now
+with patch.object(QMessageBox, "critical") as critical:
+    w.tabs.setCurrentWidget(first_doc.editor)
+assert critical.called
+assert first_doc.is_suspended
+assert w.editor.editor.isReadOnly()
+# The empty editor is neither saved over the file nor journaled
+assert w._write_file(first) is None
+assert first.read_text(encoding="utf-8") == "# First\\n"
+assert not journal.exists()
+journal.write_text(journal_text, encoding="utf-8")
+w.tabs.setCurrentWidget(w._find_document(second).editor)
+w.tabs.setCurrentWidget(first_doc.editor)
+assert w.editor.get_text() == "unsaved # First\\n"
+assert not w.editor.editor.isReadOnly()
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+    def test_closing_last_tab_leaves_an_empty_one(self):
+        r = _run_test_script(self._SETUP + """
+w._load_file(str(first))
+document = w.current_document
+assert w._close_document(document)
+assert w.tabs.count() == 1
+assert w.current_document is not document
+assert w.current_document.is_pristine
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+    def test_closing_dirty_tab_asks(self):
+        r = _run_test_script(self._SETUP + """
+from unittest.mock import patch
+from PySide6.QtWidgets import QMessageBox
+w._new_file()
+w.editor.editor.insertPlainText("draft")
+with patch.object(QMessageBox, "question", return_value=QMessageBox.No):
+    assert not w._close_document(w.current_document)
+assert w.tabs.count() == 2
+with patch.object(QMessageBox, "question", return_value=QMessageBox.Yes):
+    assert w._close_document(w.current_document)
+assert w.tabs.count() == 1
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+
+class TestSession:
+    def test_session_restores_lazily(self):
+        r = _run_test_script("""
+import tempfile
+from pathlib import Path
+folder = Path(tempfile.mkdtemp())
+first, second = folder / "first.md", folder / "second.md"
+first.write_text("# First\\n" + "line\\n" * 50, encoding="utf-8")
+second.write_text("# Second\\n" + "line\\n" * 50, encoding="utf-8")
+w._load_file(str(first))
+w.editor.restore_view_state(30, 0)
+w._load_file(str(second))
+w.editor.restore_view_state(40, 0)
+w._set_layout("editor")
+w._new_file()  # untitled: not part of the session
+w.tabs.setCurrentIndex(1)
+w._save_session()
+restored = MainWindow(recovery_dir=tempfile.mkdtemp(), history_dir=tempfile.mkdtemp(),
+                      settings=w.settings)
+assert restored.tabs.count() == 2
+assert restored.current_file == second
+assert restored.editor.get_text().startswith("# Second")
+assert restored.editor.view_state()[0] == 40
+assert restored.editor_only_action.isChecked()
+background = restored.documents[0]
+assert background.is_deferred
+assert background.editor.get_text() == ""
+assert restored.tabs.tabText(0) == "first.md"
+restored.tabs.setCurrentIndex(0)
+assert not background.is_deferred
+assert restored.editor.get_text().startswith("# First")
+assert restored.editor.view_state()[0] == 30
+assert restored.split_view_action.isChecked()
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+
+class TestStartup:
+    def test_preview_waits_for_first_paint(self):
+        r = _run_test_script("""
+import time
+assert w.preview.web_view is None
+assert "markdown" not in sys.modules and "pygments" not in sys.modules
+w.editor.set_text("# Title")
+w.show()
+deadline = time.monotonic() + 5
+while not w.preview.is_initialized and time.monotonic() < deadline:
+    app.processEvents()
+assert isinstance(w.preview.web_view, FakeWebView)
+assert "markdown" in sys.modules
+print("OK")
 """)
         assert "OK" in r.stdout, r.stderr
 
@@ -278,10 +652,22 @@ class TestOutline:
     def test_outline_panel(self):
         r = _run_test_script("""
 w.outline.update_outline("# Title\\n## Sub")
-assert w.outline.tree.topLevelItemCount() == 1
-h1 = w.outline.tree.topLevelItem(0)
-assert h1.text(0) == "Title"
-assert h1.childCount() == 1
+assert w.outline.model.rowCount() == 1
+h1 = w.outline.model.index(0, 0)
+assert h1.data() == "Title"
+assert w.outline.model.rowCount(h1) == 1
+print("OK")
+""")
+        assert "OK" in r.stdout, r.stderr
+
+    def test_section_breadcrumb(self):
+        r = _run_test_script("""
+w.editor.editor.setPlainText("# Title\\n## Sub\\nbody")
+w.outline.update_outline(w.editor.get_text())
+w.editor.go_to_line(3)
+assert w.section_label.text() == "Title \\u203a Sub", w.section_label.text()
+w.editor.go_to_line(1)
+assert w.section_label.text() == "Title"
 print("OK")
 """)
         assert "OK" in r.stdout, r.stderr
@@ -1,10 +1,12 @@
 """Tests for OutlineWidget."""
+import random
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pytest
 from PySide6.QtCore import Qt
+from src.outline_model import LINE_ROLE, OutlineModel, parse_headings
 from src.outline_widget import OutlineWidget
 
 
@@ -16,63 +18,268 @@ class TestOutlineWidget:
 
     def test_empty_text(self, outline):
         outline.update_outline("")
-        assert outline.tree.topLevelItemCount() == 0
+        assert outline.model.rowCount() == 0
 
     def test_single_heading(self, outline):
         outline.update_outline("# Title")
-        assert outline.tree.topLevelItemCount() == 1
-        assert outline.tree.topLevelItem(0).text(0) == "Title"
+        assert outline.model.rowCount() == 1
+        assert outline.model.index(0, 0).data() == "Title"
 
     def test_multiple_headings(self, outline):
         text = "# H1\n## H2\n### H3"
         outline.update_outline(text)
-        assert outline.tree.topLevelItemCount() == 1  # H1 is top level
-        h1 = outline.tree.topLevelItem(0)
-        assert h1.childCount() == 1  # H2 under H1
-        h2 = h1.child(0)
-        assert h2.childCount() == 1  # H3 under H2
+        assert outline.model.rowCount() == 1  # H1 is top level
+        h1 = outline.model.index(0, 0)
+        assert outline.model.rowCount(h1) == 1  # H2 under H1
+        h2 = outline.model.index(0, 0, h1)
+        assert outline.model.rowCount(h2) == 1  # H3 under H2
 
     def test_sibling_headings(self, outline):
         text = "# First\n# Second\n# Third"
         outline.update_outline(text)
-        assert outline.tree.topLevelItemCount() == 3
+        assert outline.model.rowCount() == 3
 
     def test_heading_text(self, outline):
         outline.update_outline("## My Section")
-        assert outline.tree.topLevelItemCount() == 1
-        assert outline.tree.topLevelItem(0).text(0) == "My Section"
+        assert outline.model.rowCount() == 1
+        assert outline.model.index(0, 0).data() == "My Section"
 
     def test_line_number_stored(self, outline):
         text = "# Title\n\nSome text\n\n## Section"
         outline.update_outline(text)
-        h1 = outline.tree.topLevelItem(0)
-        assert h1.data(0, Qt.UserRole) == 1  # line 1
-        h2 = h1.child(0)
-        assert h2.data(0, Qt.UserRole) == 5  # line 5
+        h1 = outline.model.index(0, 0)
+        assert h1.data(Qt.UserRole) == 1  # line 1
+        h2 = outline.model.index(0, 0, h1)
+        assert h2.data(Qt.UserRole) == 5  # line 5
 
     def test_non_heading_lines_ignored(self, outline):
         text = "regular text\n**bold**\n- list item"
         outline.update_outline(text)
-        assert outline.tree.topLevelItemCount() == 0
+        assert outline.model.rowCount() == 0
 
     def test_mixed_content(self, outline):
         text = "intro\n# Main\nparagraph\n## Sub\nmore text"
         outline.update_outline(text)
-        assert outline.tree.topLevelItemCount() == 1
-        assert outline.tree.topLevelItem(0).text(0) == "Main"
+        assert outline.model.rowCount() == 1
+        assert outline.model.index(0, 0).data() == "Main"
 
     def test_update_clears_previous(self, outline):
         outline.update_outline("# First")
-        assert outline.tree.topLevelItemCount() == 1
+        assert outline.model.rowCount() == 1
         outline.update_outline("# New")
-        assert outline.tree.topLevelItemCount() == 1
-        assert outline.tree.topLevelItem(0).text(0) == "New"
+        assert outline.model.rowCount() == 1
+        assert outline.model.index(0, 0).data() == "New"
 
     def test_deep_nesting(self, outline):
         text = "# L1\n## L2\n### L3\n#### L4\n##### L5\n###### L6"
         outline.update_outline(text)
-        assert outline.tree.topLevelItemCount() == 1
-        item = outline.tree.topLevelItem(0)
+        assert outline.model.rowCount() == 1
+        item = outline.model.index(0, 0)
         for _ in range(5):
-            assert item.childCount() == 1
-            item = item.child(0)
+            assert outline.model.rowCount(item) == 1
+            item = outline.model.index(0, 0, item)
+
+
+def _tree(model, parent=None):
+    """The model as nested (title, line, children) tuples."""
+    from PySide6.QtCore import QModelIndex
+    parent = parent or QModelIndex()
+    rows = []
+    for row in range(model.rowCount(parent)):
+        index = model.index(row, 0, parent)
+        rows.append((index.data(), index.data(Qt.UserRole), _tree(model, index)))
+    return rows
+
+
+class TestIncrementalOutline:
+    @pytest.fixture
+    def outline(self, qapp):
+        w = OutlineWidget()
+        yield w
+
+    def _signals(self, model):
+        seen = []
+        for name in ("rowsInserted", "rowsRemoved", "dataChanged", "modelReset"):
+            getattr(model, name).connect(lambda *args, name=name: seen.append(name))
+        return seen
+
+    def test_unchanged_headings_do_nothing(self, outline):
+        text = "# A\ntext\n## B"
+        assert outline.update_outline(text)
+        seen = self._signals(outline.model)
+        assert not outline.update_outline(text + "\nmore text")
+        assert seen == []
+
+    def test_line_shift_updates_lines_only(self, outline):
+        outline.update_outline("# A\n## B")
+        seen = self._signals(outline.model)
+        assert outline.update_outline("intro\n# A\n## B")
+        assert seen == []
+        assert _tree(outline.model) == [("A", 2, [("B", 3, [])])]
+
+    def test_rename_emits_data_changed(self, outline):
+        outline.update_outline("# A\n## B\n## C")
+        b = outline.model.index(0, 0, outline.model.index(0, 0))
+        seen = self._signals(outline.model)
+        outline.update_outline("# A\n## Bee\n## C")
+        assert seen == ["dataChanged"]
+        assert b.data() == "Bee"  # same index, renamed in place
+
+    def test_insert_keeps_collapse_state(self, outline):
+        outline.update_outline("# A\n## a1\n# B\n## b1")
+        a = outline.model.index(0, 0)
+        outline.tree.collapse(a)
+        seen = self._signals(outline.model)
+        outline.update_outline("# A\n## a1\n# New\n## n1\n# B\n## b1")
+        assert seen == ["rowsInserted"]
+        assert not outline.tree.isExpanded(outline.model.index(0, 0))
+        assert outline.tree.isExpanded(outline.model.index(1, 0))  # new heading
+        assert outline.tree.isExpanded(outline.model.index(2, 0))
+
+    def test_remove(self, outline):
+        outline.update_outline("# A\n# B\n# C")
+        seen = self._signals(outline.model)
+        outline.update_outline("# A\n# C")
+        assert seen == ["rowsRemoved"]
+        assert _tree(outline.model) == [("A", 1, []), ("C", 2, [])]
+
+    @pytest.mark.parametrize("before, after", [
+        ("# A\n## b\n## c", "# A\n## b\n# X\n## c"),        # reparents c
+        ("# A\n## b\n# X\n## c", "# A\n## b\n## c"),        # c moves back under A
+        ("# A\n## b", "## A\n## b"),                        # level change
+        ("# A\n## b\n### c\n# D", "# D\n# A\n## b\n### c"),  # reorder
+        ("", "# A\n## b\n# C"),
+        ("# A\n## b\n# C", ""),
+        ("# B\n#### B\n# B\n### B\n# B\n# A",                 # pairs shift: B re-paired
+         "# B\n# B\n#### B\n# B\n### B\n# B\n# A"),
+    ])
+    def test_matches_fresh_build(self, qapp, outline, before, after):
+        outline.update_outline(before)
+        outline.update_outline(after)
+        fresh = OutlineWidget()
+        fresh.update_outline(after)
+        assert _tree(outline.model) == _tree(fresh.model)
+
+    def test_random_edits_match_fresh_build(self, qapp):
+        model = OutlineModel()
+        rng = random.Random(38)
+        headings = []
+        for _ in range(300):
+            position = rng.randint(0, len(headings))
+            heading = "#" * rng.randint(1, 4) + " " + rng.choice("AB")
+            if headings and rng.random() < 0.4:
+                del headings[min(position, len(headings) - 1)]
+            elif headings and rng.random() < 0.3:
+                headings[min(position, len(headings) - 1)] = heading
+            else:
+                headings.insert(position, heading)
+            text = "\n".join(headings)
+            model.set_headings(parse_headings(text))
+            fresh = OutlineModel()
+            fresh.set_headings(parse_headings(text))
+            assert _tree(model) == _tree(fresh), text
+
+    def test_model_contract(self, outline):
+        from PySide6.QtTest import QAbstractItemModelTester
+        tester = QAbstractItemModelTester(  # noqa: F841 - checks every change
+            outline.model, QAbstractItemModelTester.FailureReportingMode.Fatal
+        )
+        for text in ("# A\n## b\n## c", "# A\n## b\n# X\n## c", "## A", ""):
+            outline.update_outline(text)
+
+    def test_click_emits_line(self, outline):
+        outline.update_outline("text\n# A")
+        lines = []
+        outline.heading_clicked.connect(lines.append)
+        outline._on_item_clicked(outline.model.index(0, 0))
+        assert lines == [2]
+
+
+class TestCurrentSection:
+    @pytest.fixture
+    def outline(self, qapp):
+        w = OutlineWidget()
+        w.update_outline("intro\n# A\ntext\n## B\ntext\n# C\ntext")
+        yield w
+
+    def test_section_at(self, outline):
+        model = outline.model
+        assert not model.section_at(1).isValid()  # before the first heading
+        assert model.section_at(2).data() == "A"
+        assert model.section_at(3).data() == "A"
+        assert model.section_at(5).data() == "B"
+        assert model.section_at(100).data() == "C"
+
+    def test_section_at_after_incremental_update(self, outline):
+        outline.update_outline("# B\n#### B\n# B\n### B\n# B\n# A")
+        outline.update_outline("# B\n# B\n#### B\n# B\n### B\n# B\n# A")
+        outline.set_current_line(7)
+        assert outline.tree.currentIndex().data(LINE_ROLE) == 7
+        assert outline.current_section == ["A"]
+
+    def test_breadcrumb_and_current_item(self, outline):
+        paths = []
+        outline.section_changed.connect(paths.append)
+        outline.set_current_line(5)
+        assert paths == [["A", "B"]]
+        assert outline.tree.currentIndex().data() == "B"
+        outline.set_current_line(4)  # same section: no signal
+        assert paths == [["A", "B"]]
+        outline.set_current_line(1)
+        assert paths[-1] == []
+        assert not outline.tree.currentIndex().isValid()
+
+    def test_follows_outline_updates(self, outline):
+        outline.set_current_line(5)
+        paths = []
+        outline.section_changed.connect(paths.append)
+        outline.update_outline("intro\n# A\ntext\n## Renamed\ntext\n# C\ntext")
+        assert paths == [["A", "Renamed"]]
+        assert outline.current_section == ["A", "Renamed"]
+
+
+class TestOutlineFilter:
+    @pytest.fixture
+    def outline(self, qapp):
+        w = OutlineWidget()
+        w.update_outline("# Installation\ntext\n## Install Guide\n# 성능 측정\n## API")
+        yield w
+
+    def _results(self, outline):
+        model = outline.results_model
+        return [model.index(row).data() for row in range(model.rowCount())]
+
+    def test_filter_shows_ranked_results(self, outline):
+        outline.filter_input.setText("instgd")
+        assert self._results(outline) == ["Install Guide"]
+        assert outline.tree.isHidden() and not outline.results.isHidden()
+        assert outline.results.currentIndex().data() == "Install Guide"
+
+    def test_clearing_filter_restores_tree(self, outline):
+        outline.filter_input.setText("api")
+        outline.filter_input.clear()
+        assert not outline.tree.isHidden() and outline.results.isHidden()
+        assert outline.results_model.rowCount() == 0
+
+    def test_enter_jumps_to_selected_result(self, outline):
+        from PySide6.QtTest import QTest
+        lines = []
+        outline.heading_clicked.connect(lines.append)
+        outline.filter_input.setText("ㅅㄴ")
+        QTest.keyClick(outline.filter_input, Qt.Key_Return)
+        assert lines == [4]
+
+    def test_arrow_keys_move_selection(self, outline):
+        from PySide6.QtTest import QTest
+        outline.filter_input.setText("in")
+        assert outline.results.currentIndex().row() == 0
+        QTest.keyClick(outline.filter_input, Qt.Key_Down)
+        assert outline.results.currentIndex().row() == 1
+        QTest.keyClick(outline.filter_input, Qt.Key_Escape)
+        assert outline.filter_input.text() == ""
+
+    def test_results_follow_outline_updates(self, outline):
+        outline.filter_input.setText("api")
+        outline.update_outline("# Installation\n## API\n## API keys")
+        assert self._results(outline) == ["API", "API keys"]
+        assert outline.results_model.index(0).data(LINE_ROLE) == 2
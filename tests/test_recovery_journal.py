@@ -0,0 +1,154 @@
+"""Tests for the crash-recovery journal."""
+import subprocess
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QPlainTextEdit
+
+import src.recovery_journal as recovery_journal
+from src.editor.folding import FoldRegistry
+from src.file_writer import content_digest
+from src.recovery_journal import (
+    DocumentJournal, find_orphaned_journals, recover, discard_journal
+)
+
+
+def _edit(editor, position, removed, text):
+    cursor = QTextCursor(editor.document())
+    cursor.setPosition(position)
+    cursor.setPosition(position + removed, QTextCursor.KeepAnchor)
+    cursor.insertText(text)
+
+
+class TestDocumentJournal:
+    @pytest.fixture
+    def editor(self, qapp):
+        return QPlainTextEdit()
+
+    @pytest.fixture
+    def journal(self, editor, tmp_path):
+        journal = DocumentJournal(editor.document(), FoldRegistry(), tmp_path / "recovery")
+        journal.reset()
+        yield journal
+        journal.discard()
+
+    def test_no_file_until_first_edit(self, editor, journal):
+        journal.flush()
+        assert journal.path is None
+        editor.insertPlainText("a")
+        journal.flush()
+        assert journal.path.exists()
+
+    def test_replays_untitled_edits(self, editor, journal):
+        editor.insertPlainText("Hello world\nsecond line")
+        _edit(editor, 6, 5, "there")
+        _edit(editor, 0, 0, "😀 ")   # two UTF-16 units
+        _edit(editor, 12, 1, "")    # line break removed
+        journal.flush()
+        recovered = recover(journal.path)
+        assert recovered.file is None
+        assert recovered.text == editor.toPlainText()
+
+    def test_replays_onto_saved_file(self, editor, journal, tmp_path):
+        path = tmp_path / "doc.md"
+        path.write_text("# Title\n\nbody", encoding="utf-8")
+        journal.pause()
+        editor.setPlainText("# Title\n\nbody")
+        journal.reset(path, content_digest("# Title\n\nbody"))
+        _edit(editor, 2, 5, "Changed")
+        journal.flush()
+        recovered = recover(journal.path)
+        assert recovered.file == path
+        assert recovered.text == "# Changed\n\nbody"
+
+    def test_changed_base_file_is_reported(self, editor, journal, tmp_path):
+        path = tmp_path / "doc.md"
+        path.write_text("base", encoding="utf-8")
+        journal.pause()
+        editor.setPlainText("base")
+        journal.reset(path, content_digest("base"))
+        editor.insertPlainText("!")
+        journal.flush()
+        path.write_text("edited elsewhere", encoding="utf-8")
+        recovered = recover(journal.path)
+        assert recovered.text is None
+        assert "changed" in recovered.error
+
+    def test_save_deletes_journal(self, editor, journal, tmp_path):
+        editor.insertPlainText("text")
+        journal.flush()
+        path = journal.path
+        journal.reset(tmp_path / "doc.md", content_digest("text"))
+        assert not path.exists()
+
+    def test_dirty_reset_snapshots(self, editor, journal, tmp_path):
+        editor.insertPlainText("saved and more")
+        journal.reset(tmp_path / "doc.md", content_digest("saved"), dirty=True)
+        assert recover(journal.path).text == "saved and more"
+
+    def test_checkpoint_compacts(self, editor, journal, monkeypatch):
+        monkeypatch.setattr(recovery_journal, "JOURNAL_CHECKPOINT_EDITS", 3)
+        for char in "abcdefgh":
+            editor.insertPlainText(char)
+            journal.flush()
+        lines = journal.path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) < 5  # header, snapshot and at most a couple of deltas
+        assert recover(journal.path).text == "abcdefgh"
+
+    def test_torn_last_record_is_ignored(self, editor, journal):
+        editor.insertPlainText("kept")
+        journal.flush()
+        with open(journal.path, "a", encoding="utf-8") as f:
+            f.write('[4,0,"lo')
+        assert recover(journal.path).text == "kept"
+
+    def test_folded_payloads_are_recovered(self, editor_widget, tmp_path):
+        uri = "data:image/png;base64," + "A" * 2000
+        text = f"![img]({uri})\n"
+        editor_widget.set_text(text)
+        assert uri not in editor_widget.editor.toPlainText()  # folded
+        journal = DocumentJournal(editor_widget.editor.document(), editor_widget.folds,
+                                  tmp_path)
+        journal.reset(tmp_path / "doc.md", content_digest(text))
+        editor_widget.editor.moveCursor(QTextCursor.End)
+        editor_widget.editor.insertPlainText("more")
+        journal.flush()
+        assert recover(journal.path).text == text + "more"
+        journal.discard()
+
+
+class TestOrphanedJournals:
+    def test_live_journal_is_not_orphaned(self, qapp, tmp_path):
+        editor = QPlainTextEdit()
+        journal = DocumentJournal(editor.document(), FoldRegistry(), tmp_path)
+        journal.reset()
+        editor.insertPlainText("x")
+        journal.flush()
+        assert find_orphaned_journals(tmp_path) == []
+        journal.discard()
+        assert list(tmp_path.iterdir()) == []
+
+    def test_journal_of_dead_process_is_orphaned(self, qapp, tmp_path):
+        script = (
+            "import os, sys\n"
+            f"sys.path.insert(0, {str(Path(__file__).parent.parent)!r})\n"
+            "from PySide6.QtWidgets import QApplication, QPlainTextEdit\n"
+            "app = QApplication([])\n"
+            "from src.editor.folding import FoldRegistry\n"
+            "from src.recovery_journal import DocumentJournal\n"
+            "editor = QPlainTextEdit()\n"
+            f"journal = DocumentJournal(editor.document(), FoldRegistry(), {str(tmp_path)!r})\n"
+            "journal.reset()\n"
+            "editor.insertPlainText('lost work')\n"
+            "journal.flush()\n"
+            "os._exit(0)  # crash: no cleanup\n"
+        )
+        subprocess.run([sys.executable, "-c", script], check=True, timeout=30)
+        orphans = find_orphaned_journals(tmp_path)
+        assert len(orphans) == 1
+        assert recover(orphans[0]).text == "lost work"
+        discard_journal(orphans[0])
+        assert list(tmp_path.iterdir()) == []
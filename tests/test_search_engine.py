@@ -0,0 +1,217 @@
+"""Tests for the find/replace search engine."""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from PySide6.QtWidgets import QPlainTextEdit
+from src.editor import search_engine
+from src.editor.search_engine import (
+    DocumentTextCache, MatchCountJob, MatchIndex, MatchIndexJob, SearchQuery, compile_pattern,
+    parse_replacement, has_group_references, collect_replacements
+)
+
+
+def _run(qapp, job):
+    results = []
+    job.finished.connect(results.append)
+    job.start()
+    for _ in range(1000):
+        if results:
+            break
+        qapp.processEvents()
+    return results
+
+
+class TestDocumentTextCache:
+    def test_lowered_copy_reused_within_revision(self, qapp):
+        editor = QPlainTextEdit()
+        editor.setPlainText("Hello World")
+        cache = DocumentTextCache(editor.document())
+        lowered = cache.lowered()
+        assert lowered == "hello world"
+        assert cache.lowered() is lowered
+
+    def test_edit_invalidates(self, qapp):
+        editor = QPlainTextEdit()
+        editor.setPlainText("abc")
+        cache = DocumentTextCache(editor.document())
+        before = cache.revision
+        assert cache.text() == "abc"
+        editor.insertPlainText("d")
+        assert cache.revision == before + 1
+        assert cache.text() == "dabc"
+
+
+class TestMatchCountJob:
+    def test_small_document_finishes_synchronously(self, qapp):
+        job = MatchCountJob("a b a c a", "a")
+        finished = []
+        job.finished.connect(finished.append)
+        job.start()
+        assert finished == [3]
+        assert not job.is_running
+        assert job.positions == [0, 4, 8]
+
+    def test_sliced_count_matches_str_count(self, qapp, monkeypatch):
+        monkeypatch.setattr(search_engine, "SEARCH_SLICE", 16)
+        haystack = "foo bar foo\n" * 40 + "foofoo"
+        job = MatchCountJob(haystack, "foo")
+        partial = []
+        job.progress.connect(partial.append)
+        assert _run(qapp, job) == [haystack.count("foo")]
+        assert partial and partial == sorted(partial)
+
+    @pytest.mark.parametrize("haystack, prefix, needle", [
+        ("abc abd abc", "ab", "abc"),
+        ("aaaa aaa", "a", "aa"),        # self-overlapping needle
+        ("xaab aab", "aa", "aab"),
+    ])
+    def test_narrowing_matches_full_scan(self, qapp, haystack, prefix, needle):
+        first = MatchCountJob(haystack, prefix)
+        _run(qapp, first)
+        narrowed = MatchCountJob(haystack, needle, candidates=first.positions)
+        assert _run(qapp, narrowed) == [haystack.count(needle)]
+        assert narrowed.positions == [i for i in range(len(haystack))
+                                      if haystack.startswith(needle, i)]
+
+    def test_too_many_positions_are_not_indexed(self, qapp, monkeypatch):
+        monkeypatch.setattr(search_engine, "MATCH_POSITIONS_LIMIT", 2)
+        job = MatchCountJob("x x x", "x")
+        assert _run(qapp, job) == [3]
+        assert job.positions is None
+
+    def test_cancel_stops_counting(self, qapp, monkeypatch):
+        monkeypatch.setattr(search_engine, "SEARCH_SLICE", 4)
+        job = MatchCountJob("ab\n" * 100, "ab")
+        job.progress.connect(lambda count: job.cancel())
+        finished = []
+        job.finished.connect(finished.append)
+        job.start()
+        for _ in range(20):
+            qapp.processEvents()
+        assert finished == []
+        assert not job.is_running
+
+
+class TestCompilePattern:
+    def test_cached_per_query(self):
+        query = SearchQuery("fo+", regex=True)
+        assert compile_pattern(query) is compile_pattern(SearchQuery("fo+", regex=True))
+        assert compile_pattern(query) is not compile_pattern(SearchQuery("fo+"))
+
+    def test_literal_is_escaped(self):
+        pattern = compile_pattern(SearchQuery("a.b"))
+        assert pattern.match("a.b").hasMatch()
+        assert not pattern.match("axb").hasMatch()
+
+    def test_whole_word(self):
+        pattern = compile_pattern(SearchQuery("cat", whole_word=True))
+        assert not pattern.match("concatenate").hasMatch()
+        assert pattern.match("a cat sat").capturedStart() == 2
+
+    def test_invalid_regex(self):
+        assert not compile_pattern(SearchQuery("(a", regex=True)).isValid()
+
+
+class TestMatchIndex:
+    @pytest.fixture
+    def index(self):
+        index = MatchIndex(None)
+        for start in (2, 10, 20):
+            index.add(start, start + 3)
+        index.complete = True
+        return index
+
+    def test_next_match(self, index):
+        assert index.next_match(0) == (2, 5)
+        assert index.next_match(10) == (10, 13)
+        assert index.next_match(11) == (20, 23)
+        assert index.next_match(21) == (2, 5)  # wraps
+        assert index.next_match(21, wrap=False) is None
+
+    def test_previous_match(self, index):
+        assert index.previous_match(20) == (10, 13)
+        assert index.previous_match(2) == (20, 23)  # wraps
+        assert index.previous_match(2, wrap=False) is None
+
+    def test_contains_and_spans_between(self, index):
+        assert index.contains(10, 13)
+        assert not index.contains(10, 12)
+        assert list(index.spans_between(3, 21)) == [(10, 13), (20, 23)]
+
+
+class TestMatchIndexJob:
+    def _index(self, qapp, text, query, scope=None):
+        index = MatchIndex(query)
+        job = MatchIndexJob(compile_pattern(query), text, index, scope)
+        return index, job
+
+    def test_regex_spans(self, qapp):
+        index, job = self._index(qapp, "a1 b22 c333", SearchQuery(r"\d+", regex=True))
+        assert _run(qapp, job) == [True]
+        assert list(zip(index.starts, index.ends)) == [(1, 2), (4, 6), (8, 11)]
+
+    def test_empty_matches_skipped(self, qapp):
+        index, job = self._index(qapp, "ab\n\ncd", SearchQuery("^", regex=True))
+        assert _run(qapp, job) == [True]
+        assert len(index) == 0
+
+    def test_scope(self, qapp):
+        index, job = self._index(qapp, "x x x x", SearchQuery("x"), scope=(2, 5))
+        assert _run(qapp, job) == [True]
+        assert list(index.starts) == [2, 4]
+
+    def test_sliced(self, qapp, monkeypatch):
+        monkeypatch.setattr(search_engine, "SEARCH_TICK_BUDGET", -1)
+        index, job = self._index(qapp, "ab " * 50, SearchQuery("ab"))
+        partial = []
+        job.progress.connect(partial.append)
+        assert _run(qapp, job) == [True]
+        assert len(index) == 50
+        assert partial
+
+    def test_timeout(self, qapp, monkeypatch):
+        monkeypatch.setattr(search_engine, "SEARCH_TICK_BUDGET", -1)
+        monkeypatch.setattr(search_engine, "SEARCH_TIMEOUT", -1)
+        index, job = self._index(qapp, "ab " * 50, SearchQuery("ab"))
+        assert _run(qapp, job) == [False]
+        assert job.timed_out
+        assert not index.complete
+
+    def test_run_finishes_synchronously(self, qapp, monkeypatch):
+        monkeypatch.setattr(search_engine, "SEARCH_TICK_BUDGET", -1)
+        index, job = self._index(qapp, "ab " * 50, SearchQuery("ab"))
+        job.start()
+        assert job.is_running
+        assert job.run()
+        assert len(index) == 50
+
+
+class TestReplacements:
+    def test_parse_literal(self):
+        assert parse_replacement("plain") == ("plain",)
+        assert parse_replacement("") == ()
+        assert not has_group_references(parse_replacement("cost $$5"))
+        assert parse_replacement("cost $$5") == ("cost $5",)
+
+    def test_parse_groups_and_escapes(self):
+        parts = parse_replacement(r"<$1|${name}|${12}>\n\t\\")
+        assert parts == ("<", (1,), "|", ("name",), "|", (12,), ">\n\t\\")
+        assert has_group_references(parts)
+
+    def test_collect_with_groups(self):
+        pattern = compile_pattern(SearchQuery(r"(?<key>\w+)=(\d+)", regex=True))
+        parts = parse_replacement("$2:${key}")
+        edits = collect_replacements(pattern, "a=1, bb=22", parts)
+        assert edits == [(0, 3, "1:a"), (5, 10, "22:bb")]
+
+    def test_collect_in_scope(self):
+        pattern = compile_pattern(SearchQuery(r"(\d)", regex=True))
+        edits = collect_replacements(pattern, "1 2 3 4", parse_replacement("[$1]"), scope=(2, 5))
+        assert edits == [(2, 3, "[2]"), (4, 5, "[3]")]
+
+    def test_collect_timeout(self, monkeypatch):
+        monkeypatch.setattr(search_engine, "SEARCH_TIMEOUT", -1)
+        pattern = compile_pattern(SearchQuery(r"(a)", regex=True))
+        assert collect_replacements(pattern, "aaa", parse_replacement("$1")) is None
@@ -0,0 +1,77 @@
+"""Tests for handing files from a second launch to the running instance."""
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from src.single_instance import InstanceServer, forward_to_running_instance
+
+PROJECT_ROOT = str(Path(__file__).parent.parent)
+
+
+def _forward_in_subprocess(name, files):
+    """Run forward_to_running_instance() like a second launch would: in its own process."""
+    script = (
+        "import sys; sys.path.insert(0, {root!r})\n"
+        "from src.single_instance import forward_to_running_instance\n"
+        "print(forward_to_running_instance({files!r}, {name!r}))\n"
+    ).format(root=PROJECT_ROOT, files=files, name=name)
+    return subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE,
+                            text=True, cwd=PROJECT_ROOT)
+
+
+def _wait(qapp, process, timeout=10):
+    deadline = time.monotonic() + timeout
+    while process.poll() is None and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.01)
+    qapp.processEvents()
+    return process.communicate(timeout=1)[0].strip()
+
+
+@pytest.fixture
+def server(qapp):
+    server = InstanceServer(f"markdown-editor-test-{uuid.uuid4().hex[:8]}")
+    assert server.listen()
+    yield server
+    server.close()
+
+
+class TestSingleInstance:
+    def test_files_are_handed_over(self, qapp, server):
+        received = []
+        server.files_received.connect(received.append)
+        files = ["/tmp/a.md", "/tmp/문서.md"]
+        output = _wait(qapp, _forward_in_subprocess(server.name, files))
+        assert output == "True"
+        assert received == [files]
+
+    def test_launch_without_files_still_reaches_instance(self, qapp, server):
+        received = []
+        server.files_received.connect(received.append)
+        assert _wait(qapp, _forward_in_subprocess(server.name, [])) == "True"
+        assert received == [[]]
+
+    def test_no_running_instance(self, qapp):
+        assert forward_to_running_instance([], f"markdown-editor-none-{uuid.uuid4().hex[:8]}",
+                                           timeout=200) is False
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="named pipes leave nothing behind")
+    def test_socket_of_crashed_instance_is_replaced(self, qapp):
+        import socket
+        import tempfile
+        name = f"markdown-editor-test-{uuid.uuid4().hex[:8]}"
+        stale = socket.socket(socket.AF_UNIX)
+        stale.bind(str(Path(tempfile.gettempdir()) / name))
+        stale.close()  # the socket file stays, with nobody listening
+        assert forward_to_running_instance([], name, timeout=200) is False
+        server = InstanceServer(name)
+        try:
+            assert server.listen()
+        finally:
+            server.close()
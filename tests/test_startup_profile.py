@@ -0,0 +1,46 @@
+"""Tests for the --profile-startup report."""
+import builtins
+import io
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.startup_profile import StartupProfile, REPORT_FILE_NAME
+
+
+class TestStartupProfile:
+    def test_disabled_does_nothing(self):
+        profile = StartupProfile()
+        profile.mark("phase")
+        stream = io.StringIO()
+        profile.report(stream)
+        assert stream.getvalue() == ""
+
+    def test_reports_phases_and_imports(self, tmp_path, monkeypatch):
+        (tmp_path / "profiled_module.py").write_text("VALUE = 1\n", encoding="utf-8")
+        monkeypatch.syspath_prepend(str(tmp_path))
+        original_import = builtins.__import__
+        profile = StartupProfile()
+        profile.enable()
+        try:
+            import profiled_module  # noqa: F401
+            profile.mark("window shown")
+        finally:
+            stream = io.StringIO()
+            profile.report(stream)
+            sys.modules.pop("profiled_module", None)
+        assert builtins.__import__ is original_import
+        report = stream.getvalue()
+        assert "window shown" in report
+        assert "profiled_module" in report
+
+    def test_report_without_stderr_goes_to_file(self, tmp_path, monkeypatch):
+        import tempfile
+        monkeypatch.setattr(sys, "stderr", None)  # windowed build
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+        profile = StartupProfile()
+        profile.enable()
+        profile.mark("window shown")
+        profile.report()
+        assert "window shown" in (tmp_path / REPORT_FILE_NAME).read_text(encoding="utf-8")
@@ -0,0 +1,128 @@
+"""Tests for minimal-span document edits."""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from PySide6.QtWidgets import QPlainTextEdit
+from src.editor import text_diff
+from src.editor.text_diff import (
+    common_affixes, replace_changed_lines, replace_changed_span, replace_spans, utf16_len
+)
+from src.utils.text_merge import split_lines
+
+
+class TestCommonAffixes:
+    def test_identical(self):
+        assert common_affixes("abc", "abc") == (3, 0)
+
+    def test_middle_change(self):
+        assert common_affixes("abcXdef", "abcYYdef") == (3, 3)
+
+    def test_affixes_do_not_overlap(self):
+        # "aa" -> "aaa": the shared parts may not cover more than the shorter text
+        prefix, suffix = common_affixes("aa", "aaa")
+        assert prefix + suffix == 2
+
+    def test_spans_scan_blocks(self, monkeypatch):
+        monkeypatch.setattr(text_diff, "_SCAN_BLOCK", 4)
+        old = "x" * 37 + "A" + "y" * 23
+        new = "x" * 37 + "BC" + "y" * 23
+        assert common_affixes(old, new) == (37, 23)
+
+
+class TestReplaceChangedSpan:
+    def test_no_change(self, qapp):
+        editor = QPlainTextEdit()
+        editor.setPlainText("same")
+        assert not replace_changed_span(editor.document(), "same", "same")
+
+    def test_replaces_only_the_difference(self, qapp):
+        editor = QPlainTextEdit()
+        editor.setPlainText("one two three")
+        changes = []
+        editor.document().contentsChange.connect(
+            lambda pos, removed, added: changes.append((pos, removed, added))
+        )
+        assert replace_changed_span(editor.document(), "one two three", "one 2 three")
+        assert editor.toPlainText() == "one 2 three"
+        assert changes == [(4, 3, 1)]
+
+    def test_positions_count_utf16_units(self, qapp):
+        editor = QPlainTextEdit()
+        old = "\U0001F600 old"
+        editor.setPlainText(old)
+        replace_changed_span(editor.document(), old, "\U0001F600 new")
+        assert editor.toPlainText() == "\U0001F600 new"
+        assert utf16_len("\U0001F600") == 2
+
+
+class TestReplaceSpans:
+    def test_applies_back_to_front_as_one_undo_step(self, qapp):
+        editor = QPlainTextEdit()
+        editor.setPlainText("a1 b2 c3")
+        document = editor.document()
+        assert replace_spans(document, [(0, 2, "x"), (3, 5, "yyy"), (6, 8, "")]) == 3
+        assert editor.toPlainText() == "x yyy "
+        document.undo()
+        assert editor.toPlainText() == "a1 b2 c3"
+
+    def test_cursor_keeps_its_place(self, qapp):
+        editor = QPlainTextEdit()
+        editor.setPlainText("foo bar foo")
+        cursor = editor.textCursor()
+        cursor.setPosition(5)  # inside "bar"
+        editor.setTextCursor(cursor)
+        replace_spans(editor.document(), [(0, 3, "f"), (8, 11, "f")])
+        assert editor.textCursor().position() == 3
+
+    def test_nothing_to_do(self, qapp):
+        editor = QPlainTextEdit()
+        editor.setPlainText("abc")
+        assert replace_spans(editor.document(), []) == 0
+        assert not editor.document().isUndoAvailable()
+
+    def test_distant_edits_report_separate_changes(self, qapp, monkeypatch):
+        monkeypatch.setattr(text_diff, "_GROUP_GAP", 4)
+        editor = QPlainTextEdit()
+        editor.setPlainText("ab" + "-" * 20 + "ab")
+        changes = []
+        editor.document().contentsChange.connect(
+            lambda pos, removed, added: changes.append((pos, removed, added))
+        )
+        replace_spans(editor.document(), [(0, 2, "X"), (22, 24, "X")])
+        assert changes == [(22, 2, 1), (0, 2, 1)]
+        editor.document().undo()
+        assert editor.toPlainText() == "ab" + "-" * 20 + "ab"
+
+
+class TestReplaceChangedLines:
+    def _replace(self, editor, new, **kwargs):
+        return replace_changed_lines(editor.document(), split_lines(editor.toPlainText()),
+                                     split_lines(new), **kwargs)
+
+    def test_rewrites_only_changed_runs(self, qapp):
+        editor = QPlainTextEdit()
+        editor.setPlainText("a\nb\nc\nd\ne")
+        assert self._replace(editor, "a\nB\nc\nd\ne\nf") == 2
+        assert editor.toPlainText() == "a\nB\nc\nd\ne\nf"
+        editor.document().undo()
+        assert editor.toPlainText() == "a\nb\nc\nd\ne"
+
+    def test_positions_count_utf16_units(self, qapp):
+        editor = QPlainTextEdit()
+        editor.setPlainText("😀\nold\n")
+        self._replace(editor, "😀\nnew\n")
+        assert editor.toPlainText() == "😀\nnew\n"
+
+    def test_compare_and_render(self, qapp):
+        editor = QPlainTextEdit()
+        editor.setPlainText("<1>\nx\n")
+        assert self._replace(editor, "one\ny\n", compare=lambda line: line.replace("<1>", "one"),
+                             render=str.upper) == 1
+        assert editor.toPlainText() == "<1>\nY\n"
+
+    def test_no_change(self, qapp):
+        editor = QPlainTextEdit()
+        editor.setPlainText("same\n")
+        assert self._replace(editor, "same\n") == 0
+        assert not editor.document().isUndoAvailable()
@@ -0,0 +1,46 @@
+"""Tests for the three-way text merge."""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.text_merge import merge3, split_lines
+
+BASE = "# Title\n\nintro\n\n## A\n\nalpha\n\n## B\n\nbeta\n"
+
+
+class TestSplitLines:
+    def test_keeps_line_ends(self):
+        assert split_lines("a\nb\n") == ["a\n", "b\n"]
+        assert split_lines("a\nb") == ["a\n", "b"]
+        assert split_lines("") == []
+
+
+class TestMerge3:
+    def test_changes_to_different_lines(self):
+        mine = BASE.replace("alpha", "alpha, edited here")
+        theirs = BASE.replace("beta", "beta, edited on disk")
+        result = merge3(BASE, mine, theirs)
+        assert result.conflicts == 0
+        assert result.text == BASE.replace("alpha", "alpha, edited here").replace(
+            "beta", "beta, edited on disk")
+
+    def test_same_change_on_both_sides(self):
+        changed = BASE.replace("intro", "introduction")
+        assert merge3(BASE, changed, changed) == (changed, 0)
+
+    def test_insertions_and_deletions(self):
+        mine = BASE.replace("## A\n\nalpha\n\n", "")
+        theirs = BASE + "\n## C\n\ngamma\n"
+        assert merge3(BASE, mine, theirs) == (mine + "\n## C\n\ngamma\n", 0)
+
+    def test_conflict_keeps_both_versions(self):
+        mine = BASE.replace("alpha", "mine")
+        theirs = BASE.replace("alpha", "theirs")
+        result = merge3(BASE, mine, theirs)
+        assert result.conflicts == 1
+        assert "<<<<<<< Editor\nmine\n=======\ntheirs\n>>>>>>> On disk\n" in result.text
+        assert result.text.startswith("# Title\n") and result.text.endswith("beta\n")
+
+    def test_conflict_at_end_without_newline(self):
+        result = merge3("x", "mine", "theirs")
+        assert result == ("<<<<<<< Editor\nmine\n=======\ntheirs\n>>>>>>> On disk\n", 1)
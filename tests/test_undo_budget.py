@@ -0,0 +1,84 @@
+"""Tests for UndoMemoryMonitor."""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from PySide6.QtWidgets import QPlainTextEdit
+from PySide6.QtGui import QTextCursor
+from src.editor.undo_budget import UndoMemoryMonitor
+
+
+class TestUndoMemoryMonitor:
+    @pytest.fixture
+    def setup(self, qapp):
+        editor = QPlainTextEdit()
+        editor.setPlainText("hello")
+        monitor = UndoMemoryMonitor(editor.document())
+        return editor, monitor
+
+    def _insert_at_end(self, editor, text):
+        cursor = editor.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+
+    def test_step_sizes_estimated(self, setup):
+        editor, monitor = setup
+        self._insert_at_end(editor, "abcd")
+        assert monitor.undo_steps == 1
+        assert monitor.estimated_bytes == 8
+
+    def test_undo_and_redo_move_steps(self, setup):
+        editor, monitor = setup
+        self._insert_at_end(editor, "abcd")
+        editor.document().undo()
+        assert (monitor.undo_steps, monitor.redo_steps) == (0, 1)
+        editor.document().redo()
+        assert (monitor.undo_steps, monitor.redo_steps) == (1, 0)
+        assert monitor.estimated_bytes == 8
+
+    def test_new_edit_discards_redo(self, setup):
+        editor, monitor = setup
+        self._insert_at_end(editor, "abcd")
+        editor.document().undo()
+        self._insert_at_end(editor, "x")
+        assert monitor.redo_steps == 0
+        assert monitor.estimated_bytes == 2
+
+    def test_set_plain_text_resets(self, setup):
+        editor, monitor = setup
+        self._insert_at_end(editor, "abcd")
+        editor.setPlainText("fresh")
+        assert monitor.undo_steps == 0
+        assert monitor.estimated_bytes == 0
+
+    def test_over_budget_clears_history_on_next_step(self, setup, qapp):
+        editor, monitor = setup
+        monitor.budget = 100
+        released = []
+        monitor.history_trimmed.connect(released.append)
+        self._insert_at_end(editor, "x" * 80)
+        qapp.processEvents()
+        assert monitor.over_budget
+        assert editor.document().isUndoAvailable()
+        QTextCursor(editor.document()).insertText("y")  # a step of its own
+        qapp.processEvents()
+        assert not editor.document().isUndoAvailable()
+        assert monitor.estimated_bytes == 0
+        assert released == [162]
+        assert editor.toPlainText() == "yhello" + "x" * 80
+
+    def test_step_that_crossed_budget_can_be_undone(self, setup, qapp):
+        editor, monitor = setup
+        monitor.budget = 100
+        QTextCursor(editor.document()).insertText("a")
+        self._insert_at_end(editor, "x" * 80)
+        qapp.processEvents()
+        editor.document().undo()
+        assert editor.toPlainText() == "ahello"
+        # Undone, the step no longer counts: a new step keeps the history
+        self._insert_at_end(editor, "b")
+        qapp.processEvents()
+        editor.document().undo()
+        editor.document().undo()
+        assert editor.toPlainText() == "hello"